@@ -0,0 +1 @@
+"""Local stand-ins and benchmark harnesses for the names pipelines."""
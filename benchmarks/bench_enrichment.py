@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for the phase-4 enrichment engine.
+
+Starts ``benchmarks/mock_llm_server.py`` in a child process, drives
+``process_file_ultra_fast`` against it for synthetic inputs of increasing
+size and reports names/sec, effective RPM, peak RSS, latency percentiles and
+output correctness. Client-side latency percentiles come from the phase-4
+telemetry report; server-side ones from the mock's own timings.
+
+Examples
+--------
+    python -m benchmarks.bench_enrichment --sizes 1000 10000 100000
+    python -m benchmarks.bench_enrichment --provider gemini --max-concurrent 100 --latency-ms 800
+    python -m benchmarks.bench_enrichment --rate-limit-rate 0.05 --malformed-rate 0.01 --output bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import importlib.util
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional
+
+from benchmarks.mock_llm_server import add_config_arguments, expected_origin
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+ENRICH_SCRIPT = REPO_ROOT / "names_data_sources" / "Spain_names_ine" / "4_enrich_names.py"
+
+_SYLLABLES = [
+    "A", "BA", "BE", "BI", "CA", "CE", "CI", "DA", "DE", "DO", "E", "FA", "FE", "GA", "GO", "I", "JA",
+    "JO", "LA", "LE", "LI", "LU", "MA", "ME", "MI", "NA", "NE", "NI", "O", "PA", "PE", "RA", "RE",
+    "RI", "RO", "SA", "SE", "SI", "TA", "TE", "TI", "TO", "U", "VA", "VE", "VI", "XA", "YA", "ZA", "ZO",
+]
+
+
+def load_phase_module(script_path: Path) -> ModuleType:
+    """Import a numbered phase script (not importable by name) as a module."""
+    script_dir = str(script_path.parent)
+    if script_dir not in sys.path:
+        # Phase scripts import their siblings (``utils``) as top-level modules.
+        sys.path.insert(0, script_dir)
+    module_name = f"phase_{script_path.stem}"
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_names(count: int) -> List[str]:
+    """Return ``count`` unique pronounceable upper-case pseudo-names."""
+    names: List[str] = []
+    for length in itertools.count(2):
+        for parts in itertools.product(_SYLLABLES, repeat=length):
+            names.append("".join(parts))
+            if len(names) >= count:
+                return names
+    return names
+
+
+def write_input_csv(path: Path, count: int) -> None:
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["Nombre", "Frecuencia", "Edad Media (*)", "Gender"])
+        for index, name in enumerate(synthetic_names(count)):
+            gender = "Male" if index % 2 == 0 else "Female"
+            writer.writerow([name, max(20, 100000 // (index + 1)), 30 + index % 40, gender])
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+@contextlib.contextmanager
+def mock_server_process(server_args: List[str]):
+    """Start the mock server in a child process and yield its base URL."""
+    command = [sys.executable, "-m", "benchmarks.mock_llm_server", "--port", "0", *server_args]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        first_line = process.stdout.readline().strip()
+        if not first_line.startswith("Mock LLM server listening on "):
+            raise RuntimeError(f"Mock server failed to start: {first_line!r}")
+        yield first_line.rsplit(" ", 1)[-1]
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def _server_request(url: str, method: str = "GET") -> dict:
+    request = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def check_output(output_file: Path, expected_rows: int) -> Dict[str, float]:
+    rows = 0
+    correct = 0
+    with output_file.open(encoding="utf-8", newline="") as handle:
+        for row in csv.DictReader(handle):
+            rows += 1
+            correct += row["Family_Origin"] == expected_origin(row["Nombre"])
+    return {
+        "rows_written": rows,
+        "rows_expected": expected_rows,
+        "origin_accuracy": correct / rows if rows else 0.0,
+    }
+
+
+def run_size(
+    enrich_module: ModuleType,
+    server_url: str,
+    size: int,
+    work_dir: Path,
+    *,
+    provider: str,
+    max_concurrent: Optional[int],
+) -> Dict[str, object]:
+    input_file = work_dir / f"names_{size}.csv"
+    output_file = work_dir / f"enriched_{size}.csv"
+    write_input_csv(input_file, size)
+
+    base_url = f"{server_url}/v1" if provider == "openai" else server_url
+    model_name = "gpt-4o-mini" if provider == "openai" else "gemini-2.5-flash"
+    _server_request(f"{server_url}/stats/reset", method="POST")
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(
+            enrich_module.process_file_ultra_fast(
+                input_file=str(input_file),
+                output_file=str(output_file),
+                max_names=None,
+                model_name=model_name,
+                provider=provider,
+                max_concurrent=max_concurrent,
+                base_url=base_url,
+            )
+        )
+    elapsed = time.perf_counter() - start
+
+    telemetry = json.loads(output_file.with_suffix(".telemetry.json").read_text(encoding="utf-8"))
+    client_latency = telemetry["overall"]["latency"]
+    stats = _server_request(f"{server_url}/stats")
+    successes = stats["by_status"].get("200", 0)
+    latencies = stats.pop("latencies_ms")
+    # ru_maxrss is the process high-water mark in KiB on Linux; sizes run in
+    # ascending order so it reflects the largest run so far.
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    result: Dict[str, object] = {
+        "size": size,
+        "provider": provider,
+        "elapsed_s": round(elapsed, 3),
+        "names_per_s": round(size / elapsed, 1) if elapsed else None,
+        "effective_rpm": round(successes / elapsed * 60) if elapsed else None,
+        "requests_rpm": round(stats["requests"] / elapsed * 60) if elapsed else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "client_latency_ms": {
+            f"p{pct}": round((client_latency[f"p{pct}_s"] or 0.0) * 1000, 1) for pct in (50, 95, 99)
+        },
+        "retries": telemetry["overall"]["retries"],
+        "parse_failures": telemetry["overall"]["parse_failures"],
+        "server_latency_ms": {
+            f"p{pct}": round(percentile(latencies, pct) or 0.0, 1) for pct in (50, 95, 99)
+        },
+        "server": stats,
+    }
+    result.update(check_output(output_file, size))
+    return result
+
+
+def print_summary(results: List[Dict[str, object]]) -> None:
+    header = f"{'names':>8} {'secs':>8} {'names/s':>9} {'RPM':>8} {'RSS MB':>8} {'p50 ms':>8} {'p99 ms':>8} {'accuracy':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        latency = result["client_latency_ms"]
+        print(
+            f"{result['size']:>8} {result['elapsed_s']:>8.1f} {result['names_per_s']:>9.1f} "
+            f"{result['effective_rpm']:>8} {result['peak_rss_mb']:>8.1f} {latency['p50']:>8.1f} "
+            f"{latency['p99']:>8.1f} {result['origin_accuracy']:>9.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark UltraFastEnricher against a local mock LLM server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Input sizes to run")
+    parser.add_argument("--provider", choices=["gemini", "openai"], default="openai", help="Wire format to exercise")
+    parser.add_argument("--max-concurrent", type=int, help="Override max concurrent requests")
+    parser.add_argument("--output", type=Path, help="Optional JSON file for the results")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server_args = [
+        "--latency", args.latency,
+        "--latency-ms", str(args.latency_ms),
+        "--latency-sigma", str(args.latency_sigma),
+        "--error-rate", str(args.error_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate),
+        "--malformed-rate", str(args.malformed_rate),
+        "--retry-after", str(args.retry_after),
+    ]
+    if args.seed is not None:
+        server_args.extend(["--seed", str(args.seed)])
+
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+    os.environ.setdefault("GEMINI_API_KEY", "mock-key")
+    enrich_module = load_phase_module(ENRICH_SCRIPT)
+
+    results: List[Dict[str, object]] = []
+    with mock_server_process(server_args) as server_url, tempfile.TemporaryDirectory() as tmp:
+        for size in sorted(args.sizes):
+            print(f"Running {size} names against {server_url} ({args.provider})...", flush=True)
+            results.append(
+                run_size(
+                    enrich_module,
+                    server_url,
+                    size,
+                    Path(tmp),
+                    provider=args.provider,
+                    max_concurrent=args.max_concurrent,
+                )
+            )
+
+    print()
+    print_summary(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
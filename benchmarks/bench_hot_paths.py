@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the pipeline hot paths, with JSON results.
+
+Every benchmark builds its own synthetic fixture in a temporary directory (no
+network, no API keys, nothing written under ``output_data``) and times one
+operation:
+
+- ``population_lookup``: building the province/municipality maps and
+  resolving municipality populations
+- ``ine_fetchers``: ``fetch_region_records`` on a municipality payload shaped
+  like the INE map widget response
+- ``phase3``: ``download_name_details`` end to end against ``mock_ine_server``
+- ``svg_maps``: ``_parse_svg_ids`` on the tracked ``provincias.svg`` and on a
+  synthetic municipality map
+- ``phase2``: each transform of ``2_process_INE_names.py``
+- ``convert_to_parquet``: a full and a no-op refresh of the national dataset
+  from synthetic yob files
+- ``enrichment``: ``UltraFastEnricher.process_all_names`` against an
+  in-process fake OpenAI client (answers from ``mock_llm_server``)
+
+Each benchmark runs ``--repeat`` rounds of an auto-calibrated number of calls
+(timeit style); min/median/mean per call are reported. ``--output`` stores the
+results with the git commit and package versions, ``--compare`` reports the
+ratio against an earlier file and ``--fail-on-regression`` turns slowdowns
+beyond ``--threshold`` into a non-zero exit, for CI.
+
+Examples
+--------
+    python -m benchmarks.bench_hot_paths --output bench_main.json
+    python -m benchmarks.bench_hot_paths --filter phase2 --repeat 3
+    python -m benchmarks.bench_hot_paths --compare bench_main.json --fail-on-regression
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.bench_enrichment import load_phase_module, synthetic_names
+from benchmarks.mock_ine_server import MockINEConfig, MockINEServer, PayloadStore
+from benchmarks.mock_llm_server import build_completion
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SPAIN_DIR = REPO_ROOT / "names_data_sources" / "Spain_names_ine"
+USA_DIR = REPO_ROOT / "names_data_sources" / "USA_names_ssa"
+PACKAGES = ["polars", "pandas", "numpy", "openai"]
+
+PROVINCES = ["Madrid", "Barcelona", "Valencia", "Sevilla", "Zaragoza", "Málaga", "Murcia", "Asturias"]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[Path], Callable[[], object]]
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str):
+    """Register ``setup(work_dir) -> fn``; only ``fn()`` is timed."""
+
+    def register(setup: Callable[[Path], Callable[[], object]]):
+        BENCHMARKS.append(Benchmark(name, setup))
+        return setup
+
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+
+def _spain_module(relative: str) -> ModuleType:
+    return load_phase_module(SPAIN_DIR / relative)
+
+
+def _utils_module(name: str) -> ModuleType:
+    if str(SPAIN_DIR) not in sys.path:
+        sys.path.insert(0, str(SPAIN_DIR))
+    return __import__(f"utils.{name}", fromlist=[name])
+
+
+def _municipalities(count: int) -> List[tuple[int, str, int]]:
+    """``(municipality_id, name, province_index)`` with a few names repeated across provinces."""
+    names = synthetic_names(count)
+    municipalities = []
+    for index, name in enumerate(names):
+        province = index % len(PROVINCES)
+        municipalities.append(((province + 1) * 1000 + index, name.title(), province))
+        if index % 50 == 0:
+            other = (province + 1) % len(PROVINCES)
+            municipalities.append(((other + 1) * 1000 + index, name.title(), other))
+    return municipalities
+
+
+def write_population_csv(path: Path, municipalities: List[tuple[int, str, int]]) -> None:
+    """Population table in the INE padrón export layout read by ``population_lookup``."""
+    rows = []
+    for gender in ("Total", "Hombres", "Mujeres"):
+        for province_index, province in enumerate(PROVINCES):
+            rows.append(["Total", f"{province_index + 1:02d} {province}", "", gender, "Total", "2024", "1.234.567"])
+        for municipality_id, name, province_index in municipalities:
+            province = f"{province_index + 1:02d} {PROVINCES[province_index]}"
+            population = f"{(municipality_id * 37) % 90_000 + 100:,}".replace(",", ".")
+            rows.append(["Total", province, f"{municipality_id} {name}", gender, "Total", "2024", population])
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle, delimiter=";")
+        writer.writerow(["Total Nacional", "Provincias", "Municipios", "Sexo", "Nacionalidad", "Periodo", "Total"])
+        writer.writerows(rows)
+
+
+def write_svg(path: Path, regions: List[tuple[int, str]]) -> None:
+    paths = "\n".join(
+        f'  <path class="region id_{region_id}" title="{name}" d="M0 0L{index % 97} {index % 89}Z"/>'
+        for index, (region_id, name) in enumerate(regions)
+    )
+    path.write_text(f'<svg xmlns="http://www.w3.org/2000/svg">\n{paths}\n</svg>\n', encoding="utf-8")
+
+
+@contextlib.contextmanager
+def _patched(module: ModuleType, **attributes):
+    previous = {name: getattr(module, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(module, name, value)
+
+
+_active_patches = contextlib.ExitStack()
+
+
+def _use_spain_fixtures(work_dir: Path, municipality_count: int = 8000) -> List[tuple[int, str, int]]:
+    """Point ``population_lookup`` and ``svg_maps`` at synthetic files in ``work_dir``."""
+    population_lookup = _utils_module("population_lookup")
+    svg_maps = _utils_module("svg_maps")
+    municipalities = _municipalities(municipality_count)
+    write_population_csv(work_dir / "poblacion.csv", municipalities)
+    shutil.copy(svg_maps.RAW_DATA_DIR / "provincias.svg", work_dir / "provincias.svg")
+    write_svg(work_dir / "municipios.svg", [(municipality_id, name) for municipality_id, name, _ in municipalities])
+
+    _active_patches.enter_context(_patched(population_lookup, DATA_PATH=work_dir / "poblacion.csv"))
+    _active_patches.enter_context(_patched(svg_maps, RAW_DATA_DIR=work_dir))
+    for cached in (
+        population_lookup._load_population_table,
+        population_lookup._build_population_maps,
+        svg_maps.get_municipality_map,
+        svg_maps.get_province_map,
+    ):
+        cached.cache_clear()
+    return municipalities
+
+
+def write_base_csv(path: Path, count: int) -> None:
+    """Phase 1 style base table (``Nombre``, ``Frecuencia``, ``Edad Media (*)``, ``Gender``)."""
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["Nombre", "Frecuencia", "Edad Media (*)", "Gender"])
+        for index, name in enumerate(synthetic_names(count)):
+            if index % 20 == 0:
+                name = f"{name} {synthetic_names(index % 400 + 1)[-1]}"
+            writer.writerow([name, max(20, 1_000_000 // (index + 1)), 20 + index % 60, "Male" if index % 2 else "Female"])
+
+
+def write_yob_files(directory: Path, years: range, names_per_year: int) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    names = [name.title() for name in synthetic_names(names_per_year)]
+    for year in years:
+        rng = random.Random(year)
+        lines = [f"{name},{'F' if index % 2 else 'M'},{rng.randint(5, 5000)}" for index, name in enumerate(names)]
+        (directory / f"yob{year}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class _FakeCompletions:
+    """Stands in for ``OpenAI().chat.completions`` without any I/O."""
+
+    def create(self, model: str, messages: List[dict], response_format: Optional[dict] = None):
+        prompt = messages[-1]["content"]
+        _, text = build_completion(prompt, malformed=False)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+            usage=SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(text) // 4),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+@benchmark("population_lookup.build_maps")
+def bench_population_build(work_dir: Path):
+    _use_spain_fixtures(work_dir)
+    population_lookup = _utils_module("population_lookup")
+
+    def run():
+        population_lookup._load_population_table.cache_clear()
+        population_lookup._build_population_maps.cache_clear()
+        return population_lookup._build_population_maps()
+
+    return run
+
+
+@benchmark("population_lookup.lookup_1000_municipalities")
+def bench_population_lookups(work_dir: Path):
+    municipalities = _use_spain_fixtures(work_dir)
+    population_lookup = _utils_module("population_lookup")
+    population_lookup._build_population_maps()
+    queries = [(name, PROVINCES[province]) for _, name, province in municipalities[:1000]]
+
+    def run():
+        for name, province in queries:
+            population_lookup.get_population_by_name(gender="Female", province_name=province, municipality_name=name)
+
+    return run
+
+
+@benchmark("ine_fetchers.fetch_region_records_muni")
+def bench_fetch_region_records(work_dir: Path):
+    municipalities = _use_spain_fixtures(work_dir)
+    ine_fetchers = _utils_module("ine_fetchers")
+    _utils_module("population_lookup")._build_population_maps()
+    _utils_module("svg_maps").get_municipality_map()
+    payload = {
+        "unidad": "‰",
+        "regiones": [
+            {"id": str(municipality_id), "val": f"{(municipality_id % 900) / 100:.2f}".replace(".", ",")}
+            for municipality_id, _, _ in municipalities
+        ],
+    }
+    client = SimpleNamespace(mapa_widget=lambda **_: payload)
+
+    def run():
+        return ine_fetchers.fetch_region_records(
+            client, nombre="VICTORIANO", gender="Male", total_frequency=10_000, vista="muni"
+        )
+
+    return run
+
+
+@benchmark("phase3.download_name_details_5")
+def bench_download_name_details(work_dir: Path):
+    municipalities = _use_spain_fixtures(work_dir)
+    base_csv = work_dir / "base.csv"
+    write_base_csv(base_csv, 200)
+    with base_csv.open(encoding="utf-8", newline="") as handle:
+        names = [(row["Nombre"], row["Gender"]) for row, _ in zip(csv.DictReader(handle), range(5))]
+    phase3 = _spain_module("3_download_INE_names_details.py")
+    store = PayloadStore(region_ids={"prov": list(range(1, 53)), "muni": [municipality_id for municipality_id, _, _ in municipalities]})
+    server = _active_patches.enter_context(MockINEServer(MockINEConfig(latency="constant", latency_ms=0), store))
+
+    def run():
+        phase3.download_name_details(base_csv, names=names, output_dir=work_dir / "details", base_url=server.url, fuzzy=False)
+
+    return run
+
+
+@benchmark("svg_maps.parse_provincias")
+def bench_parse_provinces(work_dir: Path):
+    svg_maps = _utils_module("svg_maps")
+    svg_path = svg_maps.RAW_DATA_DIR / "provincias.svg"
+    return lambda: svg_maps._parse_svg_ids(svg_path)
+
+
+@benchmark("svg_maps.parse_municipios")
+def bench_parse_municipalities(work_dir: Path):
+    svg_maps = _utils_module("svg_maps")
+    write_svg(work_dir / "municipios.svg", [(municipality_id, name) for municipality_id, name, _ in _municipalities(8000)])
+    return lambda: svg_maps._parse_svg_ids(work_dir / "municipios.svg")
+
+
+def _phase2_benchmark(transform: str):
+    def setup(work_dir: Path):
+        phase2 = _spain_module("2_process_INE_names.py")
+        tables = _utils_module("tables")
+        source = work_dir / "base.csv"
+        write_base_csv(source, 50_000)
+        # Later transforms expect the columns added by the earlier ones.
+        prepared = tables.write_table(tables.read_table(source, tables.BASE_SCHEMA), work_dir / "prepared.parquet", csv_export=False)
+        for step in ("identify_compound_names", "calculate_name_percentage", "add_name_popularity_rank"):
+            if step == transform:
+                break
+            getattr(phase2, step)(prepared)
+        target = work_dir / "target.parquet"
+        return lambda: getattr(phase2, transform)(shutil.copy(prepared, target))
+
+    return setup
+
+
+for _transform in (
+    "identify_compound_names",
+    "calculate_name_percentage",
+    "add_name_popularity_rank",
+    "add_syllable_and_character_counts",
+    "add_phonetic_keys",
+):
+    benchmark(f"phase2.{_transform}")(_phase2_benchmark(_transform))
+
+
+def _convert_module(work_dir: Path) -> ModuleType:
+    convert = load_phase_module(USA_DIR / "convert_to_parquet.py")
+    _active_patches.enter_context(
+        _patched(
+            convert,
+            NATIONAL_LOOKUP_FILE=work_dir / "names_by_name.parquet",
+            STATE_LOOKUP_FILE=work_dir / "state_names_by_name.parquet",
+        )
+    )
+    return convert
+
+
+@benchmark("convert_to_parquet.national_full")
+def bench_convert_full(work_dir: Path):
+    convert = _convert_module(work_dir)
+    write_yob_files(work_dir / "national", range(1990, 2020), 5000)
+    dataset_dir = work_dir / "names_database"
+
+    def run():
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        return convert.process_names_data(work_dir / "national", dataset_dir=dataset_dir)
+
+    return run
+
+
+@benchmark("convert_to_parquet.national_noop_refresh")
+def bench_convert_noop(work_dir: Path):
+    convert = _convert_module(work_dir)
+    write_yob_files(work_dir / "national", range(1990, 2020), 5000)
+    dataset_dir = work_dir / "names_database"
+    convert.process_names_data(work_dir / "national", dataset_dir=dataset_dir)
+    return lambda: convert.process_names_data(work_dir / "national", dataset_dir=dataset_dir)
+
+
+@benchmark("enrichment.process_all_names_500")
+def bench_enrichment(work_dir: Path):
+    enrich = _spain_module("4_enrich_names.py")
+    enricher = enrich.UltraFastEnricher(provider="openai", model_name="gpt-4o-mini", api_key="fake-key", max_concurrent=50)
+    enricher.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions()))
+    names = synthetic_names(500)
+
+    return lambda: asyncio.run(enricher.process_all_names(names))
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+
+def time_function(fn: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """Calibrate calls per round so a round lasts ``min_time``; report per-call seconds."""
+    started = time.perf_counter()
+    fn()
+    single = time.perf_counter() - started
+    number = max(1, int(min_time / single)) if single > 0 else 1000
+
+    rounds: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - started) / number)
+    return {
+        "min_s": min(rounds),
+        "median_s": statistics.median(rounds),
+        "mean_s": statistics.fmean(rounds),
+        "stdev_s": statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": versions,
+    }
+
+
+def run_benchmarks(selected: List[Benchmark], repeat: int, min_time: float) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    for bench in selected:
+        print(f"{bench.name} ...", end=" ", flush=True)
+        with tempfile.TemporaryDirectory() as tmp, _active_patches:
+            try:
+                # The code under test prints progress; keep it out of the report.
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    fn = bench.setup(Path(tmp))
+                    results[bench.name] = time_function(fn, repeat, min_time)
+            except Exception as exc:  # a broken benchmark should not hide the others
+                results[bench.name] = {"error": f"{type(exc).__name__}: {exc}"}
+                print(f"failed ({results[bench.name]['error']})")
+                continue
+        print(f"{results[bench.name]['median_s'] * 1000:.3f} ms")
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Print median ratios against ``baseline``; return the names slower than ``threshold``."""
+    regressions = []
+    print(f"\n{'benchmark':<48} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or "median_s" not in previous or "median_s" not in result:
+            print(f"{name:<48} {'-':>12} {result.get('median_s', 0) * 1000:>12.3f} {'-':>7}")
+            continue
+        ratio = result["median_s"] / previous["median_s"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:<48} {previous['median_s'] * 1000:>12.3f} {result['median_s'] * 1000:>12.3f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline hot paths")
+    parser.add_argument("--filter", action="append", default=[], help="Only run benchmarks containing this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Target seconds per round")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Median ratio counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 when --compare finds regressions")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(bench.name for bench in BENCHMARKS))
+        return
+
+    os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+    selected = [bench for bench in BENCHMARKS if not args.filter or any(text in bench.name for text in args.filter)]
+    results = run_benchmarks(selected, args.repeat, args.min_time)
+    report = {**environment(), "benchmarks": results}
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"Baseline: commit {baseline.get('commit')} ({baseline.get('created_at')})")
+        regressions = compare(results, baseline.get("benchmarks", {}), args.threshold)
+        if regressions and args.fail_on_regression:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.2f}x: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
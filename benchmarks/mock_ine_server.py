@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""Local stand-in for the INE name widgets used by phase 3.
+
+Lets ``download_name_details`` run offline (``--base-url``) at any scale
+without hitting ``www.ine.es``. Supported endpoints:
+
+- ``GET /widgets/nombApell/nombApell.shtml`` starts a session (``JSESSIONID`` cookie)
+- ``POST /tnombres/graficoWidget?nombre=&sexo=`` decade series
+- ``POST /tnombres/mapaWidget?nombre=&sexo=&vista=prov|muni`` regional per-mille values
+- ``GET /stats`` and ``POST /stats/reset`` for the benchmark harness
+
+Payloads are replayed from phase 3 detail CSVs (``--replay-dir``, e.g. the
+tracked ``output_data/3_data_download_INE_names_details/details``). Names
+that were not recorded get a deterministic synthetic payload sized from the
+name's ``Frecuencia`` in ``--base-csv``. Latency, HTTP 500s, 429 throttling
+(random or a requests-per-second cap) and session expiry are configurable;
+requests on an expired or unknown session get HTTP 403.
+
+Examples
+--------
+    python -m benchmarks.mock_ine_server --port 8090 --replay-dir \\
+        names_data_sources/Spain_names_ine/output_data/3_data_download_INE_names_details/details
+    python -m benchmarks.mock_ine_server --latency-ms 150 --max-rps 20 --session-ttl 300 --error-rate 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import random
+import re
+import secrets
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.mock_llm_server import LATENCY_DISTRIBUTIONS, sample_latency
+
+SPAIN_DIR = Path(__file__).resolve().parents[1] / "names_data_sources" / "Spain_names_ine"
+DEFAULT_SVG_DIR = SPAIN_DIR / "utils" / "raw_data"
+
+SESSION_COOKIE = "JSESSIONID"
+SEX_PARAMS = {"Male": "1", "Female": "6"}
+DECADE_TICKS = [
+    "< 1930", "1930-1940", "1940-1950", "1950-1960", "1960-1970", "1970-1980",
+    "1980-1990", "1990-2000", "2000-2010", "2010-2019", "2020-2029",
+]
+# Fallback region ids when no SVG map is available.
+DEFAULT_REGION_IDS = {"prov": list(range(1, 53)), "muni": list(range(1, 8132))}
+SPAIN_POPULATION = 48_000_000
+
+_SVG_ID_RE = re.compile(r'class="[^"]*\bid_(\d+)')
+
+Key = Tuple[str, str]
+
+
+def _name_rng(*parts: str) -> random.Random:
+    digest = hashlib.md5("|".join(parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "little"))
+
+
+def _format_val(value: float) -> str:
+    # The widget sends Spanish decimal commas.
+    return f"{value:.3f}".replace(".", ",")
+
+
+@dataclass(slots=True)
+class MockINEConfig:
+    latency: str = "lognormal"
+    latency_ms: float = 120.0
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    max_rps: float = 0.0
+    retry_after_s: float = 1.0
+    session_ttl_s: float = 0.0
+    session_max_requests: int = 0
+    require_session: bool = True
+    seed: Optional[int] = None
+
+    def sample_latency(self, rng: random.Random) -> float:
+        return sample_latency(rng, self.latency, self.latency_ms, self.latency_sigma)
+
+
+@dataclass(slots=True)
+class MockINEStats:
+    requests: int = 0
+    by_status: Dict[str, int] = field(default_factory=dict)
+    by_endpoint: Dict[str, int] = field(default_factory=dict)
+    sessions_started: int = 0
+    sessions_expired: int = 0
+    replayed: int = 0
+    synthetic: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+
+
+class PayloadStore:
+    """Recorded payloads keyed by ``(NOMBRE, sexo)`` plus the synthetic fallback."""
+
+    def __init__(self, region_ids: Optional[Dict[str, List[int]]] = None) -> None:
+        self.region_ids = region_ids or DEFAULT_REGION_IDS
+        self.frequencies: Dict[Key, int] = {}
+        self.decades: Dict[Key, dict] = {}
+        self.regions: Dict[str, Dict[Key, dict]] = {"prov": {}, "muni": {}}
+
+    @classmethod
+    def from_paths(
+        cls,
+        replay_dir: Optional[Path] = None,
+        base_csv: Optional[Path] = None,
+        svg_dir: Optional[Path] = DEFAULT_SVG_DIR,
+    ) -> "PayloadStore":
+        store = cls(region_ids=load_region_ids(svg_dir))
+        if base_csv is not None:
+            store.load_frequencies(base_csv)
+        if replay_dir is not None:
+            store.load_details(replay_dir)
+        return store
+
+    def load_frequencies(self, base_csv: Path) -> None:
+        with base_csv.open(encoding="utf-8", newline="") as handle:
+            for row in csv.DictReader(handle):
+                sexo = SEX_PARAMS.get(row.get("Gender", ""))
+                if sexo and row.get("Frecuencia"):
+                    self.frequencies[(row["Nombre"].upper(), sexo)] = int(float(row["Frecuencia"]))
+
+    def load_details(self, details_dir: Path) -> None:
+        """Read ``*_decades.csv``, ``*_municipios.csv`` and ``*_provincias.csv`` written by phase 3."""
+        series: Dict[Key, Dict[str, int]] = {}
+        for path in sorted(details_dir.glob("*_decades.csv")):
+            with path.open(encoding="utf-8", newline="") as handle:
+                for row in csv.DictReader(handle):
+                    key = (row["nombre"].upper(), SEX_PARAMS[row["gender"]])
+                    series.setdefault(key, {})[row["decade"]] = int(float(row["persons"]))
+        for key, by_decade in series.items():
+            ticks = [tick for tick in DECADE_TICKS if tick in by_decade] + sorted(set(by_decade) - set(DECADE_TICKS))
+            self.decades[key] = {"ticks": ticks, "values": [[by_decade[tick] for tick in ticks]]}
+
+        for vista, suffix in (("muni", "municipios"), ("prov", "provincias")):
+            for path in sorted(details_dir.glob(f"*_{suffix}.csv")):
+                with path.open(encoding="utf-8", newline="") as handle:
+                    for row in csv.DictReader(handle):
+                        key = (row["nombre"].upper(), SEX_PARAMS[row["gender"]])
+                        payload = self.regions[vista].setdefault(key, {"unidad": row["unidad"] or "‰", "regiones": []})
+                        payload["regiones"].append({"id": row["region_id"], "val": _format_val(float(row["percentage"]))})
+
+    def _frequency(self, nombre: str, sexo: str) -> int:
+        known = self.frequencies.get((nombre, sexo))
+        if known is not None:
+            return known
+        # Zipf-like spread: most unknown names are rare.
+        return int(20 * 10 ** (_name_rng(nombre, sexo, "freq").random() * 4))
+
+    def grafico(self, nombre: str, sexo: str) -> Tuple[dict, bool]:
+        recorded = self.decades.get((nombre, sexo))
+        if recorded is not None:
+            return recorded, True
+        rng = _name_rng(nombre, sexo, "grafico")
+        total = self._frequency(nombre, sexo)
+        peak = rng.uniform(0, len(DECADE_TICKS) - 1)
+        width = rng.uniform(0.8, 2.5)
+        weights = [math.exp(-((index - peak) / width) ** 2) for index in range(len(DECADE_TICKS))]
+        scale = total / sum(weights)
+        values = [round(weight * scale) or None for weight in weights]
+        return {"ticks": DECADE_TICKS, "values": [values]}, False
+
+    def mapa(self, nombre: str, sexo: str, vista: str) -> Tuple[dict, bool]:
+        recorded = self.regions[vista].get((nombre, sexo))
+        if recorded is not None:
+            return recorded, True
+        rng = _name_rng(nombre, sexo, vista)
+        total = self._frequency(nombre, sexo)
+        region_ids = self.region_ids[vista]
+        # Common names appear almost everywhere, rare ones in a few municipalities.
+        coverage = 1.0 if vista == "prov" else min(1.0, 0.02 + math.log10(max(total, 10)) / 6)
+        chosen = sorted(rng.sample(region_ids, max(1, int(len(region_ids) * coverage))))
+        per_mille = total / (SPAIN_POPULATION / 2) * 1000
+        regiones = [
+            {"id": str(region_id), "val": _format_val(per_mille * rng.lognormvariate(0.0, 0.6))}
+            for region_id in chosen
+        ]
+        return {"unidad": "‰", "regiones": regiones}, False
+
+
+def load_region_ids(svg_dir: Optional[Path]) -> Dict[str, List[int]]:
+    """Region ids from the INE SVG maps, falling back to ``DEFAULT_REGION_IDS``."""
+    region_ids = dict(DEFAULT_REGION_IDS)
+    if svg_dir is None:
+        return region_ids
+    for vista, filename in (("prov", "provincias.svg"), ("muni", "municipios.svg")):
+        path = svg_dir / filename
+        if path.exists():
+            ids = sorted({int(match) for match in _SVG_ID_RE.findall(path.read_text(encoding="utf-8"))})
+            if ids:
+                region_ids[vista] = ids
+    return region_ids
+
+
+class _MockINEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_MockHTTPServer"
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _session_token(self) -> Optional[str]:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get(SESSION_COOKIE)
+        return morsel.value if morsel else None
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        path = urlsplit(self.path).path
+        if path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.snapshot())
+            return
+        if path.startswith("/widgets/"):
+            token = self.server.start_session()
+            body = b"<html><body>mock INE widget</body></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Set-Cookie", f"{SESSION_COOKIE}={token}; Path=/")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") == "/stats/reset":
+            self.server.reset()
+            self._send_json(200, {"ok": True})
+            return
+
+        endpoint = url.path.rsplit("/", 1)[-1]
+        if endpoint not in ("graficoWidget", "mapaWidget"):
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        nombre = params.get("nombre", "").strip().upper()
+        sexo = params.get("sexo", "")
+        vista = params.get("vista", "")
+        if not nombre or sexo not in SEX_PARAMS.values() or (endpoint == "mapaWidget" and vista not in ("prov", "muni")):
+            self._finish(started, 400, endpoint)
+            self._send_json(400, {"error": "Invalid parameters"})
+            return
+
+        config = self.server.config
+        rng = self.server.rng()
+        time.sleep(config.sample_latency(rng))
+
+        if config.require_session and not self.server.use_session(self._session_token()):
+            self._finish(started, 403, endpoint)
+            self._send_json(403, {"error": "Session expired"})
+            return
+        retry_after = {"Retry-After": f"{config.retry_after_s:g}"}
+        roll = rng.random()
+        if not self.server.take_token() or roll < config.rate_limit_rate:
+            self._finish(started, 429, endpoint)
+            self._send_json(429, {"error": "Too many requests"}, headers=retry_after)
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            self._finish(started, 500, endpoint)
+            self._send_json(500, {"error": "Internal error"})
+            return
+
+        store = self.server.store
+        if endpoint == "graficoWidget":
+            payload, replayed = store.grafico(nombre, sexo)
+        else:
+            payload, replayed = store.mapa(nombre, sexo, vista)
+        self._finish(started, 200, endpoint, replayed)
+        self._send_json(200, payload)
+
+    def _finish(self, started: float, status: int, endpoint: str, replayed: Optional[bool] = None) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        with self.server.lock:
+            stats = self.server.stats
+            stats.requests += 1
+            stats.by_status[str(status)] = stats.by_status.get(str(status), 0) + 1
+            stats.by_endpoint[endpoint] = stats.by_endpoint.get(endpoint, 0) + 1
+            if replayed is not None:
+                stats.replayed += int(replayed)
+                stats.synthetic += int(not replayed)
+            stats.latencies_ms.append(elapsed_ms)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address: Tuple[str, int], config: MockINEConfig, store: PayloadStore) -> None:
+        super().__init__(address, _MockINEHandler)
+        self.config = config
+        self.store = store
+        self.lock = threading.Lock()
+        self.stats = MockINEStats()
+        self.sessions: Dict[str, Tuple[float, int]] = {}
+        self._tokens = max(1.0, config.max_rps)
+        self._refilled = time.monotonic()
+        self._seed_rng = random.Random(config.seed)
+        self._local = threading.local()
+
+    def rng(self) -> random.Random:
+        # One generator per handler thread keeps sampling lock-free.
+        rng = getattr(self._local, "rng", None)
+        if rng is None:
+            with self.lock:
+                rng = random.Random(self._seed_rng.getrandbits(64))
+            self._local.rng = rng
+        return rng
+
+    def start_session(self) -> str:
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[token] = (time.monotonic(), 0)
+            self.stats.sessions_started += 1
+        return token
+
+    def use_session(self, token: Optional[str]) -> bool:
+        """Count a request against ``token``; False once it is unknown or expired."""
+        config = self.config
+        with self.lock:
+            session = self.sessions.get(token or "")
+            if session is None:
+                return False
+            created, used = session
+            expired = (config.session_ttl_s and time.monotonic() - created > config.session_ttl_s) or (
+                config.session_max_requests and used >= config.session_max_requests
+            )
+            if expired:
+                del self.sessions[token]
+                self.stats.sessions_expired += 1
+                return False
+            self.sessions[token] = (created, used + 1)
+            return True
+
+    def take_token(self) -> bool:
+        """Token bucket for ``max_rps`` (burst of one second's worth)."""
+        rate = self.config.max_rps
+        if rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self._tokens = min(max(1.0, rate), self._tokens + (now - self._refilled) * rate)
+            self._refilled = now
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def reset(self) -> None:
+        with self.lock:
+            self.stats = MockINEStats()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return asdict(self.stats)
+
+
+class MockINEServer:
+    """Run the mock INE server on a background thread.
+
+    Example:
+        with MockINEServer(MockINEConfig(latency_ms=0)) as server:
+            download_name_details(base_csv, names=[...], base_url=server.url)
+    """
+
+    def __init__(
+        self,
+        config: Optional[MockINEConfig] = None,
+        store: Optional[PayloadStore] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.config = config or MockINEConfig()
+        self.store = store or PayloadStore()
+        self._server = _MockHTTPServer((host, port), self.config, self.store)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> dict:
+        return self._server.snapshot()
+
+    def reset_stats(self) -> None:
+        self._server.reset()
+
+    def start(self) -> "MockINEServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockINEServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal", help="Latency distribution")
+    parser.add_argument("--latency-ms", type=float, default=120.0, help="Mean (median for lognormal) latency in ms")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Sigma for the lognormal distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Answer 429 above this many requests/second (0: no cap)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--session-ttl", type=float, default=0.0, help="Seconds before a session expires (0: never)")
+    parser.add_argument("--session-max-requests", type=int, default=0, help="Requests before a session expires (0: no limit)")
+    parser.add_argument("--no-session-check", action="store_true", help="Accept requests without a widget session")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+
+
+def config_from_args(args: argparse.Namespace) -> MockINEConfig:
+    return MockINEConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_rps=args.max_rps,
+        retry_after_s=args.retry_after,
+        session_ttl_s=args.session_ttl,
+        session_max_requests=args.session_max_requests,
+        require_session=not args.no_session_check,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local mock of the INE name widget endpoints")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8090, help="Port to listen on (0 picks a free port)")
+    parser.add_argument("--replay-dir", type=Path, help="Phase 3 details directory whose payloads are replayed")
+    parser.add_argument("--base-csv", type=Path, help="Base CSV whose Frecuencia sizes synthetic payloads")
+    parser.add_argument("--svg-dir", type=Path, default=DEFAULT_SVG_DIR, help="Directory with provincias.svg/municipios.svg")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    store = PayloadStore.from_paths(replay_dir=args.replay_dir, base_csv=args.base_csv, svg_dir=args.svg_dir)
+    server = MockINEServer(config_from_args(args), store, host=args.host, port=args.port)
+    print(f"Mock INE server listening on {server.url}", flush=True)
+    print(
+        f"  {len(store.decades)} recorded names, {len(store.region_ids['prov'])} provinces, "
+        f"{len(store.region_ids['muni'])} municipalities",
+        flush=True,
+    )
+    print(f"  Phase 3: 3_download_INE_names_details.py --base-url {server.url} ...", flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping mock INE server.")
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
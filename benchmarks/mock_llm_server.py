@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""Local mock LLM server speaking the OpenAI and Gemini wire formats.
+
+Used to load-test ``UltraFastEnricher`` without spending API quota. Supported
+endpoints:
+
+- ``POST /v1/chat/completions`` (OpenAI, point ``base_url`` at ``<url>/v1``)
+- ``POST /v1beta/models/<model>:generateContent`` (Gemini REST transport)
+- ``GET /stats`` and ``POST /stats/reset`` for the benchmark harness
+
+Examples
+--------
+    python -m benchmarks.mock_llm_server --port 8089 --latency lognormal --latency-ms 400
+    python -m benchmarks.mock_llm_server --error-rate 0.01 --rate-limit-rate 0.05 --malformed-rate 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+MOCK_ORIGINS = ["Español", "Español", "Español", "Anglosajón", "Árabe", "Vasco", "Italiano", "Francés"]
+MOCK_DIFFICULTIES = ["muy fácil", "fácil", "difícil", "muy difícil"]
+
+_ORIGIN_NAME_RE = re.compile(r"Nombre a clasificar:\s*(.+?)\s*$", re.MULTILINE)
+_QUOTED_NAME_RE = re.compile(r'nombre "([^"]+)"')
+
+
+def expected_origin(name: str) -> str:
+    """Deterministic origin the mock assigns to ``name``."""
+    digest = hashlib.md5(name.strip().upper().encode("utf-8")).digest()
+    return MOCK_ORIGINS[digest[0] % len(MOCK_ORIGINS)]
+
+
+def sample_latency(rng: random.Random, distribution: str, latency_ms: float, sigma: float = 0.5) -> float:
+    """Latency in seconds; ``latency_ms`` is the mean (the median for lognormal)."""
+    mean = latency_ms / 1000.0
+    if distribution == "constant":
+        return mean
+    if distribution == "uniform":
+        return rng.uniform(0.0, 2 * mean)
+    if distribution == "exponential":
+        return rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+    if distribution == "lognormal":
+        return rng.lognormvariate(0.0, sigma) * mean
+    raise ValueError(f"Unsupported latency distribution: {distribution}")
+
+
+@dataclass(slots=True)
+class MockLLMConfig:
+    latency: str = "lognormal"
+    latency_ms: float = 300.0
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    malformed_rate: float = 0.0
+    retry_after_s: float = 1.0
+    seed: Optional[int] = None
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Return a latency in seconds drawn from the configured distribution."""
+        return sample_latency(rng, self.latency, self.latency_ms, self.latency_sigma)
+
+
+@dataclass(slots=True)
+class MockLLMStats:
+    requests: int = 0
+    by_status: Dict[str, int] = field(default_factory=dict)
+    by_kind: Dict[str, int] = field(default_factory=dict)
+    malformed: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+
+
+def _classify_prompt(prompt: str) -> str:
+    if "Nombre a clasificar" in prompt:
+        return "origin"
+    if "dificultad de pronunciación" in prompt:
+        return "pronunciation"
+    return "description"
+
+
+def _extract_name(prompt: str, kind: str) -> str:
+    pattern = _ORIGIN_NAME_RE if kind == "origin" else _QUOTED_NAME_RE
+    match = pattern.search(prompt)
+    return match.group(1).strip() if match else "DESCONOCIDO"
+
+
+def _count_tokens(text: str) -> int:
+    # Rough heuristic (~4 characters per token), good enough for cost estimates.
+    return max(1, len(text) // 4)
+
+
+def build_completion(prompt: str, malformed: bool) -> Tuple[str, str]:
+    """Return ``(kind, text)`` for a prompt produced by ``UltraFastEnricher``."""
+    kind = _classify_prompt(prompt)
+    name = _extract_name(prompt, kind)
+
+    if kind == "origin":
+        text = json.dumps({"origin": expected_origin(name)}, ensure_ascii=False)
+    elif kind == "pronunciation":
+        digest = hashlib.md5(name.encode("utf-8")).digest()
+        text = json.dumps(
+            {
+                "spanish": MOCK_DIFFICULTIES[digest[1] % len(MOCK_DIFFICULTIES)],
+                "foreign": MOCK_DIFFICULTIES[digest[2] % len(MOCK_DIFFICULTIES)],
+                "explanation": f"El nombre {name.title()} no presenta sonidos especialmente problemáticos.",
+            },
+            ensure_ascii=False,
+        )
+    else:
+        text = (
+            f"{name.title()} es un nombre de uso frecuente. Esta descripción la genera el servidor "
+            "simulado para pruebas de rendimiento y no contiene información real."
+        )
+
+    if malformed and kind != "description":
+        text = text[: len(text) // 2]
+    return kind, text
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_MockHTTPServer"
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.snapshot())
+            return
+        self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        path = self.path.split("?", 1)[0]
+        if path.rstrip("/") == "/stats/reset":
+            self.server.reset()
+            self._send_json(200, {"ok": True})
+            return
+
+        if path.endswith("/chat/completions"):
+            provider = "openai"
+        elif path.endswith(":generateContent"):
+            provider = "gemini"
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        try:
+            request = json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+
+        config = self.server.config
+        rng = self.server.rng()
+        time.sleep(config.sample_latency(rng))
+
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            self._finish(started, 429, provider, "rate_limited")
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit exceeded", "code": 429, "status": "RESOURCE_EXHAUSTED"}},
+                headers={"Retry-After": f"{config.retry_after_s:g}"},
+            )
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            self._finish(started, 500, provider, "error")
+            self._send_json(500, {"error": {"message": "Internal error", "code": 500, "status": "INTERNAL"}})
+            return
+
+        malformed = rng.random() < config.malformed_rate
+        if provider == "openai":
+            prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+        else:
+            prompt = "\n".join(
+                str(part.get("text", ""))
+                for content in request.get("contents", [])
+                for part in content.get("parts", [])
+            )
+        kind, text = build_completion(prompt, malformed)
+        prompt_tokens, completion_tokens = _count_tokens(prompt), _count_tokens(text)
+
+        if provider == "openai":
+            payload = {
+                "id": f"chatcmpl-mock-{rng.getrandbits(48):x}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        else:
+            payload = {
+                "candidates": [
+                    {
+                        "content": {"parts": [{"text": text}], "role": "model"},
+                        "finishReason": "STOP",
+                        "index": 0,
+                    }
+                ],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": completion_tokens,
+                    "totalTokenCount": prompt_tokens + completion_tokens,
+                },
+            }
+
+        self._finish(started, 200, provider, kind, malformed, prompt_tokens, completion_tokens)
+        self._send_json(200, payload)
+
+    def _finish(
+        self,
+        started: float,
+        status: int,
+        provider: str,
+        kind: str,
+        malformed: bool = False,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+    ) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        with self.server.lock:
+            stats = self.server.stats
+            stats.requests += 1
+            stats.by_status[str(status)] = stats.by_status.get(str(status), 0) + 1
+            kind_key = f"{provider}:{kind}"
+            stats.by_kind[kind_key] = stats.by_kind.get(kind_key, 0) + 1
+            stats.malformed += int(malformed)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.latencies_ms.append(elapsed_ms)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address: Tuple[str, int], config: MockLLMConfig) -> None:
+        super().__init__(address, _MockLLMHandler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.stats = MockLLMStats()
+        self._seed_rng = random.Random(config.seed)
+        self._local = threading.local()
+
+    def rng(self) -> random.Random:
+        # One generator per handler thread keeps sampling lock-free.
+        rng = getattr(self._local, "rng", None)
+        if rng is None:
+            with self.lock:
+                rng = random.Random(self._seed_rng.getrandbits(64))
+            self._local.rng = rng
+        return rng
+
+    def reset(self) -> None:
+        with self.lock:
+            self.stats = MockLLMStats()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return asdict(self.stats)
+
+
+class MockLLMServer:
+    """Run the mock server on a background thread.
+
+    Example:
+        with MockLLMServer(MockLLMConfig(latency_ms=50)) as server:
+            enricher = UltraFastEnricher(provider="openai", base_url=server.openai_base_url, ...)
+    """
+
+    def __init__(self, config: Optional[MockLLMConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or MockLLMConfig()
+        self._server = _MockHTTPServer((host, port), self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def stats(self) -> dict:
+        return self._server.snapshot()
+
+    def reset_stats(self) -> None:
+        self._server.reset()
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal", help="Latency distribution")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mean (median for lognormal) latency in ms")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Sigma for the lognormal distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of JSON answers that are truncated")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+
+
+def config_from_args(args: argparse.Namespace) -> MockLLMConfig:
+    return MockLLMConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        retry_after_s=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local mock LLM server (OpenAI + Gemini wire formats)")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8089, help="Port to listen on (0 picks a free port)")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockLLMServer(config_from_args(args), host=args.host, port=args.port)
+    print(f"Mock LLM server listening on {server.url}", flush=True)
+    print(f"  OpenAI base URL: {server.openai_base_url}", flush=True)
+    print(f"  Gemini endpoint: {server.url}", flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping mock LLM server.")
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""Synthetic full-size inputs for scaling tests of every pipeline stage.
+
+The committed samples are small (9k INE names, details for two names), so
+this writes realistic stand-ins at any size, laid out the way each stage
+expects them:
+
+``spain/``
+    - ``1_data_download_INE_names/names_frecuencia_edad_media.csv``: the phase 1
+      base table with Zipf frequencies (floored at INE's 20-person cut-off), a
+      configurable compound-name rate and mean ages matching each name's birth
+      curve
+    - ``3_data_download_INE_names_details/details/details_{decades,municipios,provincias}.csv``:
+      phase 3 outputs for the most frequent names (also replayable by
+      ``mock_ine_server --replay-dir``)
+    - ``raw_data/``: ``poblacion_municipios_provincias.csv``, ``municipios.svg`` and
+      ``provincias.svg`` for ``population_lookup``/``svg_maps``
+
+``usa/downloaded_data/``
+    - ``national/yobYYYY.txt`` and ``state/XX.TXT`` in the SSA layouts, with each
+      name following its own popularity curve and the SSA 5-birth cut-off
+
+Everything is generated with NumPy/polars from one seed, so ``--scale 10``
+produces the same kind of data ten times larger. Each generated part's
+directory is cleared first, so regenerating into the same ``--output-dir``
+leaves no files from an earlier run (e.g. yob years outside the new range).
+``manifest.json`` records the configuration, row counts, bytes and
+generation time of each part.
+
+Examples
+--------
+    python -m benchmarks.synthetic_data --output-dir /tmp/names_x1
+    python -m benchmarks.synthetic_data --output-dir /tmp/names_x10 --scale 10 --only spain
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import shutil
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+from benchmarks.bench_enrichment import synthetic_names
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PROVINCES_SVG = REPO_ROOT / "names_data_sources" / "Spain_names_ine" / "utils" / "raw_data" / "provincias.svg"
+
+REFERENCE_YEAR = 2024
+INE_MIN_FREQUENCY = 20
+SSA_MIN_COUNT = 5
+# Decade ticks of the INE chart widget and the year each one is centred on.
+DECADE_TICKS = [
+    ("< 1930", 1920), ("1930-1940", 1935), ("1940-1950", 1945), ("1950-1960", 1955),
+    ("1960-1970", 1965), ("1970-1980", 1975), ("1980-1990", 1985), ("1990-2000", 1995),
+    ("2000-2010", 2005), ("2010-2019", 2015), ("2020-2029", 2022),
+]
+STATES = [
+    "AK", "AL", "AR", "AZ", "CA", "CO", "CT", "DC", "DE", "FL", "GA", "HI", "IA", "ID", "IL", "IN", "KS",
+    "KY", "LA", "MA", "MD", "ME", "MI", "MN", "MO", "MS", "MT", "NC", "ND", "NE", "NH", "NJ", "NM", "NV",
+    "NY", "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VA", "VT", "WA", "WI", "WV", "WY",
+]
+_SVG_PROVINCE_RE = re.compile(r'<path[^>]*class="[^"]*\bid_(\d+)[^"]*"[^>]*title="([^"]+)"')
+
+
+@dataclass(slots=True)
+class SyntheticConfig:
+    """Sizes at ``scale=1`` approximate the full real datasets."""
+
+    ine_names: int = 55_000
+    compound_rate: float = 0.35
+    zipf_exponent: float = 1.05
+    top_frequency: int = 650_000
+    detail_names: int = 100
+    municipalities: int = 8_131
+    ssa_names: int = 100_000
+    first_year: int = 1880
+    last_year: int = 2023
+    state_first_year: int = 1910
+    seed: int = 0
+
+    def scaled(self, scale: float) -> "SyntheticConfig":
+        return replace(
+            self,
+            ine_names=max(10, int(self.ine_names * scale)),
+            detail_names=max(1, int(self.detail_names * scale)),
+            ssa_names=max(10, int(self.ssa_names * scale)),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Spain
+# ---------------------------------------------------------------------------
+
+
+def _zipf_counts(rng: np.random.Generator, count: int, top: float, exponent: float, floor: int) -> np.ndarray:
+    ranks = np.arange(1, count + 1, dtype=np.float64)
+    values = top * ranks**-exponent * rng.lognormal(0.0, 0.05, count)
+    return np.sort(np.maximum(np.round(values), floor).astype(np.int64))[::-1]
+
+
+def _gender_names(rng: np.random.Generator, simple: List[str], count: int, compound_rate: float, exponent: float) -> List[str]:
+    """``count`` unique names; compound ones pair two simple names, favouring the common ones."""
+    is_compound = rng.random(count) < compound_rate
+    weights = np.arange(1, len(simple) + 1, dtype=np.float64) ** -exponent
+    weights /= weights.sum()
+    names: List[str] = []
+    seen = set()
+    simple_iter = iter(simple)
+    for compound in is_compound:
+        name = None
+        while compound and name is None:
+            first, second = rng.choice(len(simple), size=2, p=weights)
+            candidate = f"{simple[first]} {simple[second]}"
+            if first != second and candidate not in seen:
+                name = candidate
+        if name is None:
+            name = next(simple_iter)
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def ine_base_table(config: SyntheticConfig, rng: np.random.Generator) -> pl.DataFrame:
+    """Phase 1 layout: ``Nombre``, ``Frecuencia``, ``Edad Media (*)``, ``Gender``."""
+    per_gender = {"Male": config.ine_names // 2, "Female": config.ine_names - config.ine_names // 2}
+    pool = list(rng.permutation(synthetic_names(config.ine_names + 2)))
+    frames = []
+    for offset, (gender, count) in enumerate(per_gender.items()):
+        # Disjoint simple-name pools per gender, like the real lists.
+        simple = pool[offset::2]
+        names = _gender_names(rng, simple, count, config.compound_rate, config.zipf_exponent)
+        frequency = _zipf_counts(rng, count, config.top_frequency, config.zipf_exponent, INE_MIN_FREQUENCY)
+        compound = np.array([" " in name for name in names])
+        # Compound names peaked in the 1950s-1980s; simple ones anywhere.
+        peak = np.where(compound, rng.uniform(1950, 1985, count), rng.uniform(1935, 2018, count))
+        age = np.clip(REFERENCE_YEAR - peak + rng.normal(0.0, 4.0, count), 1.0, 95.0)
+        frames.append(
+            pl.DataFrame(
+                {
+                    "Nombre": names,
+                    "Frecuencia": frequency,
+                    "Edad Media (*)": np.round(age, 1),
+                    "Gender": [gender] * count,
+                }
+            )
+        )
+    return pl.concat(frames)
+
+
+def spain_geography(config: SyntheticConfig, rng: np.random.Generator) -> Tuple[pl.DataFrame, pl.DataFrame]:
+    """Provinces from the tracked SVG and synthetic municipalities with Zipf populations."""
+    provinces = sorted(
+        (int(region_id), title) for region_id, title in _SVG_PROVINCE_RE.findall(PROVINCES_SVG.read_text(encoding="utf-8"))
+    )
+    province_ids = np.array([region_id for region_id, _ in provinces])
+    province_names = [name for _, name in provinces]
+
+    count = config.municipalities
+    population = np.maximum(np.round(3_300_000 * np.arange(1, count + 1, dtype=np.float64) ** -0.95), 50).astype(np.int64)
+    rng.shuffle(population)
+    province_index = rng.integers(0, len(provinces), count)
+    female = np.round(population * rng.uniform(0.48, 0.53, count)).astype(np.int64)
+    municipalities = pl.DataFrame(
+        {
+            "region_id": np.arange(1, count + 1),
+            "region_name": [name.title() for name in synthetic_names(count)],
+            "province_id": province_ids[province_index],
+            "province_name": [province_names[index] for index in province_index],
+            "population_male": population - female,
+            "population_female": female,
+        }
+    )
+    provinces_frame = (
+        municipalities.group_by("province_id", "province_name")
+        .agg(pl.col("population_male").sum(), pl.col("population_female").sum())
+        .rename({"province_id": "region_id", "province_name": "region_name"})
+        .sort("region_id")
+    )
+    return provinces_frame, municipalities
+
+
+def _thousands(value: int) -> str:
+    return f"{value:,}".replace(",", ".")
+
+
+def write_spain_raw_data(provinces: pl.DataFrame, municipalities: pl.DataFrame, raw_dir: Path) -> None:
+    """Population table in the INE padrón export layout plus the two SVG maps."""
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    lines = ["Total Nacional;Provincias;Municipios;Sexo;Nacionalidad;Periodo;Total"]
+    for label, columns in (("Total", ("population_male", "population_female")), ("Hombres", ("population_male",)), ("Mujeres", ("population_female",))):
+        for row in provinces.iter_rows(named=True):
+            total = sum(row[column] for column in columns)
+            lines.append(f"Total;{row['region_id']:02d} {row['region_name']};;{label};Total;2024;{_thousands(total)}")
+        for row in municipalities.iter_rows(named=True):
+            total = sum(row[column] for column in columns)
+            code = f"{row['province_id']:02d}{row['region_id'] % 1000:03d}"
+            province = f"{row['province_id']:02d} {row['province_name']}"
+            lines.append(f"Total;{province};{code} {row['region_name']};{label};Total;2024;{_thousands(total)}")
+    (raw_dir / "poblacion_municipios_provincias.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    paths = "\n".join(
+        f'  <path class="id_{region_id}" title="{name}" d="M{index % 997} {index % 991}h1v1z"/>'
+        for index, (region_id, name) in enumerate(municipalities.select("region_id", "region_name").iter_rows())
+    )
+    (raw_dir / "municipios.svg").write_text(f'<svg xmlns="http://www.w3.org/2000/svg">\n{paths}\n</svg>\n', encoding="utf-8")
+    shutil.copy(PROVINCES_SVG, raw_dir / "provincias.svg")
+
+
+def _decade_records(names: pl.DataFrame, rng: np.random.Generator) -> pl.DataFrame:
+    centres = np.array([centre for _, centre in DECADE_TICKS], dtype=np.float64)
+    peak = REFERENCE_YEAR - names["Edad Media (*)"].to_numpy()
+    width = rng.uniform(10.0, 25.0, names.height)
+    weights = np.exp(-(((centres[None, :] - peak[:, None]) / width[:, None]) ** 2))
+    persons = np.round(weights / weights.sum(axis=1, keepdims=True) * names["Frecuencia"].to_numpy()[:, None]).astype(np.int64)
+    ticks = [tick for tick, _ in DECADE_TICKS]
+    return (
+        pl.DataFrame(
+            {
+                "nombre": np.repeat(names["Nombre"].to_numpy(), len(ticks)),
+                "gender": np.repeat(names["Gender"].to_numpy(), len(ticks)),
+                "decade": ticks * names.height,
+                "persons": persons.ravel(),
+            }
+        )
+        .filter(pl.col("persons") > 0)
+    )
+
+
+def _region_records(
+    names: pl.DataFrame,
+    regions: pl.DataFrame,
+    region_type: str,
+    rng: np.random.Generator,
+    parents: Optional[np.ndarray] = None,
+) -> pl.DataFrame:
+    frequency = names["Frecuencia"].to_numpy().astype(np.float64)
+    gender_population = {
+        "Male": regions["population_male"].to_numpy(),
+        "Female": regions["population_female"].to_numpy(),
+    }
+    national = {gender: float(values.sum()) for gender, values in gender_population.items()}
+    frames = []
+    for index, (nombre, gender) in enumerate(names.select("Nombre", "Gender").iter_rows()):
+        population = gender_population[gender]
+        if region_type == "municipio":
+            # Common names appear almost everywhere, rare ones in a few places.
+            coverage = min(1.0, 0.02 + math.log10(frequency[index]) / 6)
+            present = np.flatnonzero(rng.random(regions.height) < coverage)
+            spread = 0.6
+        else:
+            present = np.arange(regions.height)
+            spread = 0.3
+        rate = frequency[index] / national[gender] * 1000
+        per_mille = np.round(rate * rng.lognormal(0.0, spread, present.size), 3)
+        frames.append(
+            pl.DataFrame(
+                {
+                    "nombre": nombre,
+                    "gender": gender,
+                    "region_id": regions["region_id"].to_numpy()[present],
+                    "region_name": regions["region_name"].to_numpy()[present],
+                    "percentage": per_mille,
+                    "unidad": "‰",
+                    "persons": np.round(population[present] * per_mille / 1000).astype(np.int64),
+                    "region_type": region_type,
+                    "parent_region_name": (parents if parents is not None else regions["region_name"].to_numpy())[present],
+                }
+            )
+        )
+    return pl.concat(frames)
+
+
+def ine_detail_tables(
+    base: pl.DataFrame,
+    provinces: pl.DataFrame,
+    municipalities: pl.DataFrame,
+    count: int,
+    rng: np.random.Generator,
+) -> Dict[str, pl.DataFrame]:
+    """Phase 3 detail tables for the ``count`` most frequent names."""
+    names = base.sort("Frecuencia", descending=True).head(count)
+    return {
+        "decades": _decade_records(names, rng),
+        "municipios": _region_records(
+            names, municipalities, "municipio", rng, parents=municipalities["province_name"].to_numpy()
+        ),
+        "provincias": _region_records(names, provinces, "provincia", rng),
+    }
+
+
+def generate_spain(config: SyntheticConfig, out_dir: Path, rng: np.random.Generator) -> Dict[str, int]:
+    base = ine_base_table(config, rng)
+    provinces, municipalities = spain_geography(config, rng)
+    write_spain_raw_data(provinces, municipalities, out_dir / "raw_data")
+
+    base_path = out_dir / "1_data_download_INE_names" / "names_frecuencia_edad_media.csv"
+    base_path.parent.mkdir(parents=True, exist_ok=True)
+    base.sort(["Gender", "Frecuencia"], descending=[True, True]).write_csv(base_path)
+    counts = {"ine_names": base.height, "municipalities": municipalities.height}
+
+    details_dir = out_dir / "3_data_download_INE_names_details" / "details"
+    details_dir.mkdir(parents=True, exist_ok=True)
+    for kind, frame in ine_detail_tables(base, provinces, municipalities, config.detail_names, rng).items():
+        frame.write_csv(details_dir / f"details_{kind}.csv")
+        counts[f"details_{kind}_rows"] = frame.height
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# USA
+# ---------------------------------------------------------------------------
+
+
+def ssa_name_pool(config: SyntheticConfig, rng: np.random.Generator) -> pl.DataFrame:
+    """One row per (name, sex) with the parameters of its popularity curve."""
+    count = config.ssa_names
+    names = [name.title() for name in rng.permutation(synthetic_names(count))]
+    sex = np.where(rng.random(count) < 0.58, "F", "M")
+    # A few names are used for both sexes, less often for the second one.
+    dual = np.flatnonzero(rng.random(count) < 0.04)
+    names += [names[index] for index in dual]
+    sex = np.concatenate([sex, np.where(sex[dual] == "F", "M", "F")])
+    total = len(names)
+    # Zipf peaks, but every name clears the cut-off at least around its peak.
+    peak_count = 90_000 * rng.permutation(np.arange(1, total + 1, dtype=np.float64)) ** -1.15
+    peak_count = np.maximum(peak_count, rng.uniform(6.0, 40.0, total))
+    peak_count[count:] *= 0.2
+    # Name diversity keeps growing, so most curves peak in recent decades.
+    span = config.last_year + 10 - (config.first_year - 20)
+    peak_year = config.first_year - 20 + span * rng.random(total) ** 0.5
+    return pl.DataFrame(
+        {
+            "name": names,
+            "sex": sex,
+            "peak_year": peak_year,
+            "width": rng.uniform(8.0, 40.0, total),
+            "peak_count": peak_count,
+        }
+    )
+
+
+def _birth_scale(year: np.ndarray | int, config: SyntheticConfig) -> np.ndarray:
+    """Recorded births grow over time (early SSA years are sparse)."""
+    progress = (np.asarray(year, dtype=np.float64) - config.first_year) / max(1, config.last_year - config.first_year)
+    return 0.15 + 0.85 / (1.0 + np.exp(-8.0 * (progress - 0.3)))
+
+
+def ssa_national_counts(pool: pl.DataFrame, config: SyntheticConfig, rng: np.random.Generator) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """``year -> (pool indices, counts)`` for every entry at or above the SSA cut-off."""
+    peak_year = pool["peak_year"].to_numpy()
+    width = pool["width"].to_numpy()
+    peak_count = pool["peak_count"].to_numpy()
+    by_year = {}
+    for year in range(config.first_year, config.last_year + 1):
+        expected = peak_count * np.exp(-(((year - peak_year) / width) ** 2)) * _birth_scale(year, config)
+        counts = np.round(expected * rng.lognormal(0.0, 0.1, expected.size)).astype(np.int64)
+        present = np.flatnonzero(counts >= SSA_MIN_COUNT)
+        by_year[year] = (present, counts[present])
+    return by_year
+
+
+def _ssa_frame(pool: pl.DataFrame, indices: np.ndarray, counts: np.ndarray, **columns) -> pl.DataFrame:
+    frame = pool.select("name", "sex")[indices].with_columns(pl.Series("count", counts))
+    return frame.with_columns(**{key: pl.lit(value) for key, value in columns.items()})
+
+
+def generate_usa(config: SyntheticConfig, out_dir: Path, rng: np.random.Generator) -> Dict[str, int]:
+    pool = ssa_name_pool(config, rng)
+    national = ssa_national_counts(pool, config, rng)
+    national_dir = out_dir / "downloaded_data" / "national"
+    state_dir = out_dir / "downloaded_data" / "state"
+    national_dir.mkdir(parents=True, exist_ok=True)
+    state_dir.mkdir(parents=True, exist_ok=True)
+
+    national_rows = 0
+    for year, (indices, counts) in national.items():
+        frame = _ssa_frame(pool, indices, counts).sort(["sex", "count", "name"], descending=[False, True, False])
+        frame.write_csv(national_dir / f"yob{year}.txt", include_header=False)
+        national_rows += frame.height
+
+    # Zipf-ish state shares; each state's count is the national one times its share, with noise.
+    shares = rng.permutation(np.arange(1, len(STATES) + 1, dtype=np.float64) ** -0.9)
+    shares /= shares.sum()
+    state_parts: Dict[str, List[pl.DataFrame]] = {state: [] for state in STATES}
+    for year, (indices, counts) in national.items():
+        if year < config.state_first_year:
+            continue
+        expected = counts[:, None] * shares[None, :] * rng.lognormal(0.0, 0.3, (counts.size, len(STATES)))
+        state_counts = np.round(expected).astype(np.int64)
+        for state_index, state in enumerate(STATES):
+            keep = state_counts[:, state_index] >= SSA_MIN_COUNT
+            if keep.any():
+                state_parts[state].append(_ssa_frame(pool, indices[keep], state_counts[keep, state_index], state=state, year=year))
+
+    state_rows = 0
+    for state, parts in state_parts.items():
+        if not parts:
+            continue
+        frame = (
+            pl.concat(parts)
+            .sort(["sex", "year", "count", "name"], descending=[False, False, True, False])
+            .select("state", "sex", "year", "name", "count")
+        )
+        frame.write_csv(state_dir / f"{state}.TXT", include_header=False)
+        state_rows += frame.height
+    # Names used for both sexes have one pool row per sex.
+    return {
+        "ssa_names": pool["name"].n_unique(),
+        "ssa_name_sex_rows": pool.height,
+        "national_rows": national_rows,
+        "state_rows": state_rows,
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def _directory_bytes(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+
+
+def generate(config: SyntheticConfig, output_dir: Path, parts: Sequence[str] = ("spain", "usa")) -> dict:
+    """Write the requested parts under ``output_dir`` (replacing earlier output) and return the manifest."""
+    rng = np.random.default_rng(config.seed)
+    generators = {"spain": generate_spain, "usa": generate_usa}
+    manifest = {"config": asdict(config), "parts": {}}
+    for part in parts:
+        part_dir = output_dir / part
+        if part_dir.exists():
+            shutil.rmtree(part_dir)
+        started = time.perf_counter()
+        counts = generators[part](config, part_dir, rng)
+        manifest["parts"][part] = {
+            **counts,
+            "bytes": _directory_bytes(part_dir),
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Generate synthetic INE and SSA inputs for scaling tests")
+    parser.add_argument("--output-dir", type=Path, required=True, help="Where to write the dataset")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for the INE, detail and SSA name counts")
+    parser.add_argument("--only", choices=["spain", "usa"], help="Generate one part only")
+    parser.add_argument("--ine-names", type=int, default=defaults.ine_names, help="INE base names (both genders, before --scale)")
+    parser.add_argument("--compound-rate", type=float, default=defaults.compound_rate, help="Fraction of compound INE names")
+    parser.add_argument("--zipf-exponent", type=float, default=defaults.zipf_exponent, help="Exponent of the name frequency distribution")
+    parser.add_argument("--detail-names", type=int, default=defaults.detail_names, help="Names with phase 3 details (before --scale)")
+    parser.add_argument("--municipalities", type=int, default=defaults.municipalities, help="Synthetic municipalities")
+    parser.add_argument("--ssa-names", type=int, default=defaults.ssa_names, help="Distinct SSA names (before --scale)")
+    parser.add_argument("--first-year", type=int, default=defaults.first_year, help="First yob year")
+    parser.add_argument("--last-year", type=int, default=defaults.last_year, help="Last yob year")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed")
+    args = parser.parse_args(argv)
+
+    config = SyntheticConfig(
+        ine_names=args.ine_names,
+        compound_rate=args.compound_rate,
+        zipf_exponent=args.zipf_exponent,
+        detail_names=args.detail_names,
+        municipalities=args.municipalities,
+        ssa_names=args.ssa_names,
+        first_year=args.first_year,
+        last_year=args.last_year,
+        seed=args.seed,
+    ).scaled(args.scale)
+    manifest = generate(config, args.output_dir, [args.only] if args.only else ["spain", "usa"])
+    for part, summary in manifest["parts"].items():
+        details = ", ".join(f"{key}={value:,}" for key, value in summary.items() if key not in ("bytes", "seconds"))
+        print(f"{part}: {details} ({summary['bytes'] / 1e6:.1f} MB in {summary['seconds']:.1f}s)")
+    print(f"Manifest: {args.output_dir / 'manifest.json'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ from pathlib import Path
 import pandas as pd
 import requests
 
+from utils.tables import BASE_SCHEMA, write_table
+
 try:
     import xlrd
 except ImportError as exc:
@@ -19,17 +21,19 @@ def download_base_names_dataset(
     session: requests.Session | None = None,
     max_retries: int = 3,
 ) -> Path:
-    """Download the INE base names dataset and persist it as CSV.
+    """Download the INE base names dataset and persist it as typed Parquet.
+
+    A CSV export with the same rows is written next to the Parquet file.
 
     Args:
-        output_dir: Directory where the CSV output will be written. If ``None``,
+        output_dir: Directory where the output will be written. If ``None``,
             a folder named ``output_data`` next to this script is used.
         url: Optional override for the INE Excel URL (useful for testing).
         session: Optional pre-configured ``requests.Session`` to reuse connections
             or inject custom behaviour in tests.
 
     Returns:
-        Path to the generated CSV file.
+        Path to the generated Parquet file.
 
     Raises:
         requests.HTTPError: If the download request fails.
@@ -69,10 +73,7 @@ def download_base_names_dataset(
     combined_df = pd.concat([male_names_df, female_names_df])
     final_df = combined_df[["Nombre", "Frecuencia", "Edad Media (*)", "Gender"]]
 
-    output_file = output_path / "names_frecuencia_edad_media.csv"
-    final_df.to_csv(output_file, index=False)
-
-    return output_file
+    return write_table(final_df, output_path / "names_frecuencia_edad_media.parquet", BASE_SCHEMA)
 
 
 def main() -> None:
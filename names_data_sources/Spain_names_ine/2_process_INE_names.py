@@ -1,9 +1,9 @@
-import pandas as pd
 import nltk
+import polars as pl
 from pathlib import Path
 
-# Ensure you have the necessary NLTK data downloaded
-nltk.download('punkt', quiet=True)
+from utils.phonetic import PHONETIC_COLUMN, PhoneticIndex, phonetic_keys
+from utils.tables import BASE_SCHEMA, PROCESSED_SCHEMA, export_csv, read_pandas, read_table, write_table
 
 def count_syllables_spanish(name):
     # This is a placeholder function. You need to implement the syllable counting logic here.
@@ -23,9 +23,9 @@ def count_syllables_spanish(name):
     
     return syllables
 
-def add_syllable_and_character_counts(csv_file_path):
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(csv_file_path)
+def add_syllable_and_character_counts(table_path):
+    # Read the table into a DataFrame
+    df = read_pandas(table_path, PROCESSED_SCHEMA)
     
     # Calculate the number of characters for each name
     df['Character_Count'] = df['Nombre'].apply(lambda name: len(name) if isinstance(name, str) else 0)
@@ -33,13 +33,13 @@ def add_syllable_and_character_counts(csv_file_path):
     # Calculate the number of syllables for each name
     df['Syllable_Count'] = df['Nombre'].apply(lambda name: count_syllables_spanish(name) if isinstance(name, str) else 0)
     
-    # Write the updated DataFrame back to a CSV file
-    df.to_csv(csv_file_path, index=False)
+    # Write the updated DataFrame back as typed Parquet
+    write_table(df, table_path, PROCESSED_SCHEMA, csv_export=False)
     return df
 
-def calculate_name_percentage(csv_file_path):
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(csv_file_path)
+def calculate_name_percentage(table_path):
+    # Read the table into a DataFrame
+    df = read_pandas(table_path, PROCESSED_SCHEMA)
     
     # Group by 'Gender' and calculate the sum of 'Frecuencia'
     gender_totals = df.groupby('Gender')['Frecuencia'].sum().reset_index()
@@ -54,13 +54,13 @@ def calculate_name_percentage(csv_file_path):
     # Drop the total frequency column as it's no longer needed
     df.drop('Frecuencia_Total', axis=1, inplace=True)
     
-    # Write the updated DataFrame back to a CSV file
-    df.to_csv(csv_file_path, index=False)
+    # Write the updated DataFrame back as typed Parquet
+    write_table(df, table_path, PROCESSED_SCHEMA, csv_export=False)
     return df
 
-def add_name_popularity_rank(csv_file_path):
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(csv_file_path)
+def add_name_popularity_rank(table_path):
+    # Read the table into a DataFrame
+    df = read_pandas(table_path, PROCESSED_SCHEMA)
     
     # Sort the DataFrame by 'Gender' and 'Frecuencia' in descending order
     df.sort_values(by=['Gender', 'Frecuencia'], ascending=[True, False], inplace=True)
@@ -68,40 +68,70 @@ def add_name_popularity_rank(csv_file_path):
     # Add a new column 'Popularity' which is the rank of the name within each gender
     df['Popularity'] = df.groupby('Gender').cumcount() + 1
     
-    # Write the updated DataFrame back to a CSV file
-    df.to_csv(csv_file_path, index=False)
+    # Write the updated DataFrame back as typed Parquet
+    write_table(df, table_path, PROCESSED_SCHEMA, csv_export=False)
     return df
 
-def identify_compound_names(csv_file_path):
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(csv_file_path)
+def identify_compound_names(table_path):
+    # Read the table into a DataFrame
+    df = read_pandas(table_path, PROCESSED_SCHEMA)
     
     # Identify compound names by checking if there is more than one word in the 'Name' column
     # and handle non-string values
     df['Is_Compound'] = df['Nombre'].apply(lambda name: True if isinstance(name, str) and len(name.split()) > 1 else False)
     
-    # Write the updated DataFrame back to a CSV file
-    df.to_csv(csv_file_path, index=False)
+    # Write the updated DataFrame back as typed Parquet
+    write_table(df, table_path, PROCESSED_SCHEMA, csv_export=False)
     return df
 
-# Call the function with the path to your CSV file
-script_dir = Path(__file__).parent
-input_file = script_dir / 'output_data' / '1_data_download_INE_names' / 'names_frecuencia_edad_media.csv'
-output_dir = script_dir / 'output_data' / '2_data_process_INE_names'
-output_dir.mkdir(parents=True, exist_ok=True)
-output_file = output_dir / 'names_frecuencia_edad_media.csv'
-
-# Start from the downloaded dataset to avoid mutating the original file
-df = pd.read_csv(input_file)
-df.to_csv(output_file, index=False)
-
-compound_df = identify_compound_names(str(output_file))
-simple_df = compound_df[
-    (~compound_df['Is_Compound'])
-    & (compound_df['Gender'].str.lower() == 'male')
-].copy()
-simple_df.to_csv(output_file, index=False)
-
-calculate_name_percentage(str(output_file))
-add_name_popularity_rank(str(output_file))
-add_syllable_and_character_counts(str(output_file))
\ No newline at end of file
+def add_phonetic_keys(table_path):
+    # Read the table into a DataFrame
+    df = read_pandas(table_path, PROCESSED_SCHEMA)
+
+    # Spanish sound-alike key (JENNIFER/YENIFER, BRAYAN/BRIAN), encoded for the whole column at once
+    df[PHONETIC_COLUMN] = phonetic_keys(df['Nombre'].astype(str))
+
+    # Write the updated DataFrame back as typed Parquet
+    write_table(df, table_path, PROCESSED_SCHEMA, csv_export=False)
+    return df
+
+def build_phonetic_index(base_path, index_path):
+    # Index every name of the phase 1 table (both sexes, compound names), not
+    # just the male single names phase 2 keeps
+    base = read_table(base_path, BASE_SCHEMA).filter(pl.col('Nombre').is_not_null())
+
+    # Inverted index: names sorted by phonetic key, read back by PhoneticIndex.load
+    return PhoneticIndex.from_frame(base).save(Path(index_path))
+
+def main():
+    # Ensure you have the necessary NLTK data downloaded
+    nltk.download('punkt', quiet=True)
+
+    script_dir = Path(__file__).parent
+    input_file = script_dir / 'output_data' / '1_data_download_INE_names' / 'names_frecuencia_edad_media.parquet'
+    output_dir = script_dir / 'output_data' / '2_data_process_INE_names'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / 'names_frecuencia_edad_media.parquet'
+
+    # Start from the downloaded dataset to avoid mutating the original file
+    write_table(read_table(input_file, BASE_SCHEMA), output_file, BASE_SCHEMA, csv_export=False)
+
+    compound_df = identify_compound_names(output_file)
+    simple_df = compound_df[
+        (~compound_df['Is_Compound'])
+        & (compound_df['Gender'].str.lower() == 'male')
+    ].copy()
+    write_table(simple_df, output_file, PROCESSED_SCHEMA, csv_export=False)
+
+    calculate_name_percentage(output_file)
+    add_name_popularity_rank(output_file)
+    add_syllable_and_character_counts(output_file)
+    add_phonetic_keys(output_file)
+    build_phonetic_index(input_file, output_dir / 'phonetic_index.arrow')
+
+    # CSV copy for spreadsheets; later phases read the Parquet file
+    export_csv(output_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,87 @@
 from __future__ import annotations
 
+import multiprocessing
+import os
 import re
-from dataclasses import asdict
+import socket
 from pathlib import Path
 from typing import Iterable, Sequence, Tuple
 
 import pandas as pd
-
-from utils.ine_client import INEClient
-from utils.ine_fetchers import fetch_decade_records, fetch_region_records
+import polars as pl
+
+from utils.fuzzy_names import SOURCE_INE, FuzzyNameIndex, normalize_name
+from utils.ine_client import DEFAULT_BASE_URL, INEClient
+from utils.ine_fetchers import DecadeRecord, RegionRecord, fetch_decade_records, fetch_region_records
+from utils.region_facts import region_facts_dir, split_region_details, write_region_facts
+from utils.tables import DECADES_SCHEMA, PROCESSED_SCHEMA, REGIONS_SCHEMA, Schema, read_pandas, resolve_table, write_table
+from utils.work_queue import WorkQueue
 import argparse
 import sys
 
 DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / "output_data" / "3_data_download_INE_names_details"
+DEFAULT_FUZZY_INDEX = Path(__file__).resolve().parent / "output_data" / "fuzzy_name_index.npz"
+FUZZY_CANDIDATES = 10
 
 
-def _load_base_dataframe(csv_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
+def _load_base_dataframe(base_path: Path) -> pd.DataFrame:
+    df = read_pandas(base_path, PROCESSED_SCHEMA)
+    # The phase 1 table has a row with an empty name; there is nothing to query for it.
+    df = df[df["Nombre"].notna()].reset_index(drop=True)
     df["Nombre"] = df["Nombre"].astype(str).str.upper()
+    df["Key"] = df["Nombre"].map(normalize_name)
     return df
 
 
+class _NameMatcher:
+    """Find base rows for a requested name.
+
+    Names are compared by their normalized key, so "maria jose" finds
+    "MARÍA JOSÉ". For names without such a match, the index written by
+    ``build_fuzzy_index.py`` (or one built from ``df`` when that file is
+    missing) suggests the closest names present in ``df``. They are only
+    reported, unless ``fuzzy`` is set, in which case the closest one is used.
+    A close spelling is often a different person's name (MARIA -> MARIO).
+    """
+
+    def __init__(self, df: pd.DataFrame, index_path: Path | None = DEFAULT_FUZZY_INDEX) -> None:
+        self.df = df
+        self.index_path = index_path
+        self._index: FuzzyNameIndex | None = None
+
+    def _fuzzy_index(self) -> FuzzyNameIndex:
+        if self._index is None:
+            if self.index_path is not None and self.index_path.exists():
+                self._index = FuzzyNameIndex.load(self.index_path)
+            else:
+                entries = zip(self.df["Nombre"], self.df["Frecuencia"].fillna(0).astype(int), [SOURCE_INE] * len(self.df))
+                self._index = FuzzyNameIndex.build(entries)
+        return self._index
+
+    def candidates(self, nombre: str) -> list[Tuple[pd.DataFrame, int]]:
+        """Rows of the base names closest to ``nombre`` with their edit distance, closest first."""
+        found: list[Tuple[pd.DataFrame, int]] = []
+        for candidate in self._fuzzy_index().search(nombre, limit=FUZZY_CANDIDATES):
+            rows = self.df[self.df["Key"] == candidate.key]
+            if not rows.empty:
+                found.append((rows, candidate.distance))
+        return found
+
+    def rows(self, nombre: str, *, fuzzy: bool = False) -> pd.DataFrame:
+        matches = self.df[self.df["Key"] == normalize_name(nombre)]
+        if not matches.empty:
+            return matches
+        candidates = self.candidates(nombre)
+        if fuzzy and candidates:
+            resolved, distance = candidates[0]
+            print(f"Resolved {nombre!r} -> {resolved['Nombre'].iloc[0]!r} (distance {distance})")
+            return resolved
+        if candidates:
+            suggestions = ", ".join(f"{rows['Nombre'].iloc[0]} ({distance})" for rows, distance in candidates)
+            print(f"No exact match for {nombre!r}; closest names: {suggestions}. Pass --fuzzy to use the first.", file=sys.stderr)
+        return matches
+
+
 def _normalize_requested_names(
     names: Sequence[str | Tuple[str, str]]
 ) -> list[Tuple[str, str | None]]:
@@ -44,6 +105,7 @@ def _iter_target_rows(
     df: pd.DataFrame,
     names: Sequence[str | Tuple[str, str]] | None,
     limit: int | None,
+    fuzzy: bool = False,
 ) -> Iterable[pd.Series]:
     if names is None:
         subset = df if limit is None else df.head(limit)
@@ -52,11 +114,12 @@ def _iter_target_rows(
         return
 
     normalized = _normalize_requested_names(names)
+    matcher = _NameMatcher(df)
     seen: set[Tuple[str, str]] = set()
     collected = 0
 
     for nombre, gender in normalized:
-        matches = df[df["Nombre"] == nombre]
+        matches = matcher.rows(nombre, fuzzy=fuzzy)
         if gender is not None:
             matches = matches[matches["Gender"].str.lower() == str(gender).lower()]
 
@@ -82,11 +145,15 @@ def download_name_details(
     limit: int | None = None,
     output_dir: Path | None = None,
     file_prefix: str = "details",
+    fuzzy: bool = False,
+    base_url: str = DEFAULT_BASE_URL,
+    region_layout: str = "wide",
 ) -> None:
     """Download detailed INE data (decades/municipios/provincias) for names.
 
     Args:
-        base_csv_path: Path to the base INE CSV with name frequencies.
+        base_csv_path: Path to the base INE table with name frequencies
+            (Parquet, or CSV when no Parquet file exists).
         names: Optional sequence of names to download. Accepts either strings
             (process all genders present in the dataset) or ``(name, gender)``
             tuples to target a specific gender.
@@ -94,7 +161,16 @@ def download_name_details(
             ``names`` is provided, the limit is applied after filtering.
         output_dir: Optional directory where the detail files will be written.
             Defaults to ``output_data/details`` next to this package.
-        file_prefix: Prefix used for the generated CSV filenames.
+        file_prefix: Prefix used for the generated filenames. Each table is
+            written as Parquet plus a CSV export.
+        fuzzy: Resolve names without an exact match (typos, missing accents)
+            to the closest name in the base dataset instead of only
+            reporting the candidates.
+        base_url: INE host to query; a local ``benchmarks/mock_ine_server.py``
+            URL runs the download offline.
+        region_layout: ``"wide"`` writes ``<prefix>_municipios``/``_provincias``
+            tables; ``"facts"`` writes the compact fact/dimension layout of
+            ``utils.region_facts`` to ``<prefix>_regions/`` instead.
     """
 
     df = _load_base_dataframe(base_csv_path)
@@ -109,74 +185,233 @@ def download_name_details(
     all_municipality_records: list[RegionRecord] = []
     all_province_records: list[RegionRecord] = []
 
-    with INEClient.create() as client:
-        for row in _iter_target_rows(df, names, limit):
-            nombre = row["Nombre"]
-            gender = row["Gender"]
-            frecuencia = int(row["Frecuencia"])
-
-            identifier = _sanitize_identifier(nombre, gender)
-
-            decade_records = fetch_decade_records(
-                client,
-                nombre=nombre,
-                gender=gender,
-                total_frequency=frecuencia,
+    with INEClient.create(base_url) as client:
+        for row in _iter_target_rows(df, names, limit, fuzzy):
+            decade_records, municipality_records, province_records = _fetch_name_details(
+                client, row["Nombre"], row["Gender"], int(row["Frecuencia"])
             )
             all_decade_records.extend(decade_records)
-
-            municipality_records = fetch_region_records(
-                client,
-                nombre=nombre,
-                gender=gender,
-                total_frequency=frecuencia,
-                vista="muni",
-            )
             all_municipality_records.extend(municipality_records)
-
-            province_records = fetch_region_records(
-                client,
-                nombre=nombre,
-                gender=gender,
-                total_frequency=frecuencia,
-                vista="prov",
-            )
             all_province_records.extend(province_records)
 
-    _write_records(all_decade_records, details_dir / f"{file_prefix}_decades.csv")
-    _write_records(all_municipality_records, details_dir / f"{file_prefix}_municipios.csv")
-    _write_records(all_province_records, details_dir / f"{file_prefix}_provincias.csv")
+    _write_records(all_decade_records, details_dir / f"{file_prefix}_decades.parquet", DECADES_SCHEMA)
+    region_frames = {
+        "municipios": _records_frame(all_municipality_records, REGIONS_SCHEMA),
+        "provincias": _records_frame(all_province_records, REGIONS_SCHEMA),
+    }
+    _write_region_tables(region_frames, details_dir, file_prefix, region_layout)
+
+
+def _fetch_name_details(
+    client: INEClient, nombre: str, gender: str, frecuencia: int
+) -> Tuple[list[DecadeRecord], list[RegionRecord], list[RegionRecord]]:
+    decade_records = fetch_decade_records(
+        client,
+        nombre=nombre,
+        gender=gender,
+        total_frequency=frecuencia,
+    )
+    municipality_records = fetch_region_records(
+        client,
+        nombre=nombre,
+        gender=gender,
+        total_frequency=frecuencia,
+        vista="muni",
+    )
+    province_records = fetch_region_records(
+        client,
+        nombre=nombre,
+        gender=gender,
+        total_frequency=frecuencia,
+        vista="prov",
+    )
+    return decade_records, municipality_records, province_records
+
 
+def _records_frame(records: Sequence[object], schema: Schema) -> pl.DataFrame:
+    # Built column by column with the declared dtypes, so ``persons`` stays an
+    # integer even where INE gave no population (``nombre_id`` is dropped).
+    columns = {name: [getattr(record, name) for record in records] for name in schema}
+    return pl.DataFrame(columns, schema=schema)
 
-def _write_records(records: Sequence[object], output_path: Path) -> None:
+
+def _write_records(records: Sequence[object], output_path: Path, schema: Schema) -> None:
     if not records:
         return
+    write_table(_records_frame(records, schema), output_path, schema)
+
+
+def _write_region_tables(
+    frames: dict[str, pl.DataFrame], details_dir: Path, file_prefix: str, region_layout: str
+) -> None:
+    frames = {kind: frame for kind, frame in frames.items() if frame.height}
+    if not frames:
+        return
+    if region_layout == "facts":
+        write_region_facts(split_region_details(frames), region_facts_dir(details_dir, file_prefix))
+        return
+    for kind, frame in frames.items():
+        write_table(frame, details_dir / f"{file_prefix}_{kind}.parquet", REGIONS_SCHEMA)
+
+
+# Work-queue mode: --enqueue fills the queue, --workers drains it with that many
+# processes (on this or other machines sharing the queue file), --merge joins
+# the shards into the regular details_* tables.
+
+DETAIL_KINDS = {
+    "decades": DECADES_SCHEMA,
+    "municipios": REGIONS_SCHEMA,
+    "provincias": REGIONS_SCHEMA,
+}
+
+
+def _shard_path(shard_dir: Path, lease_id: str, kind: str) -> Path:
+    return shard_dir / f"{lease_id}_{kind}.parquet"
 
-    rows = [asdict(record) for record in records]
-    df = pd.DataFrame(rows)
-    if "nombre_id" in df.columns:
-        df = df.drop(columns=["nombre_id"])
-    df.to_csv(output_path, index=False)
+
+def run_queue_worker(
+    queue_path: Path,
+    output_dir: Path,
+    *,
+    base_url: str = DEFAULT_BASE_URL,
+    batch_size: int = 20,
+    lease_ttl_s: float = 300.0,
+    worker: str | None = None,
+) -> int:
+    """Lease batches until the queue is drained, writing one shard per lease; returns names crawled."""
+    queue = WorkQueue(queue_path, lease_ttl_s=lease_ttl_s)
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    shard_dir = output_dir / "shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    crawled = 0
+
+    with INEClient.create(base_url) as client:
+        while (lease := queue.lease(worker, batch_size)) is not None:
+            records: dict[str, list] = {kind: [] for kind in DETAIL_KINDS}
+            failed: dict[int, str] = {}
+            with queue.keep_alive(lease):
+                for item in lease.items:
+                    try:
+                        fetched = _fetch_name_details(client, item.nombre, item.gender, item.frecuencia)
+                    except Exception as exc:
+                        failed[item.id] = f"{type(exc).__name__}: {exc}"
+                        continue
+                    for kind, kind_records in zip(DETAIL_KINDS, fetched):
+                        records[kind].extend(kind_records)
+                for kind, schema in DETAIL_KINDS.items():
+                    # Shards are written before the lease is completed, so a
+                    # crash in between only costs a re-crawl of the batch.
+                    frame = _records_frame(records[kind], schema).with_columns(pl.lit(lease.lease_id).alias("lease_id"))
+                    write_table(frame, _shard_path(shard_dir, lease.lease_id, kind), csv_export=False)
+            done = queue.complete(lease, failed)
+            crawled += done
+            print(f"[{worker}] {done}/{len(lease.items)} names done ({len(failed)} failed)")
+    return crawled
+
+
+def run_queue_workers(workers: int, queue_path: Path, output_dir: Path, **options) -> None:
+    if workers == 1:
+        run_queue_worker(queue_path, output_dir, **options)
+        return
+    # Spawned, not forked: a fork taken after the parent has used polars (e.g.
+    # --enqueue in the same command) inherits its thread pool's locks and hangs.
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_queue_worker, args=(queue_path, output_dir), kwargs=options, name=f"crawl-{index}")
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def merge_queue_shards(
+    queue_path: Path, output_dir: Path, file_prefix: str = "details", region_layout: str = "wide"
+) -> dict[str, int]:
+    """Write ``details_*`` from the shards, keeping each name's rows from the lease that completed it."""
+    completed = WorkQueue(queue_path).completed()
+    if not completed:
+        return {}
+    owners = pl.DataFrame(completed, schema=["task_id", "nombre", "gender", "lease_id"], orient="row")
+    shard_dir = output_dir / "shards"
+    details_dir = output_dir / "details"
+    rows: dict[str, int] = {}
+    region_frames: dict[str, pl.DataFrame] = {}
+    for kind, schema in DETAIL_KINDS.items():
+        shards = [
+            _shard_path(shard_dir, lease_id, kind)
+            for lease_id in owners["lease_id"].unique().to_list()
+            if _shard_path(shard_dir, lease_id, kind).exists()
+        ]
+        if not shards:
+            continue
+        merged = (
+            pl.scan_parquet(shards)
+            .join(owners.lazy(), on=["nombre", "gender", "lease_id"], how="inner")
+            .sort("task_id", maintain_order=True)
+            .select(list(schema))
+            .collect()
+        )
+        if schema is REGIONS_SCHEMA:
+            region_frames[kind] = merged
+        else:
+            write_table(merged, details_dir / f"{file_prefix}_{kind}.parquet", schema)
+        rows[kind] = merged.height
+    _write_region_tables(region_frames, details_dir, file_prefix, region_layout)
+    return rows
 
 
 def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Download detailed INE data for given names.")
-    parser.add_argument("--base-csv", type=Path, required=True, help="Path to processed base CSV (phase 2 output).")
-    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR, help="Directory to write detail CSVs.")
+    parser.add_argument("--base-csv", type=Path, help="Path to the processed base table (phase 2 Parquet or CSV output).")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR, help="Directory to write detail tables.")
     parser.add_argument("--names", nargs="*", help="Explicit list of names to download (ignores --top).")
     parser.add_argument("--gender", choices=["Male", "Female"], help="Restrict to a specific gender when selecting top names.")
     parser.add_argument("--top", type=int, help="Number of top names by frequency to download (default if names not provided).")
     parser.add_argument("--limit", type=int, help="Maximum number of rows to process (after filters).")
     parser.add_argument("--file-prefix", default="details", help="Prefix for generated detail files.")
-    return parser.parse_args(argv)
-
-
-def _select_names(df: pd.DataFrame, *, names: Sequence[str] | None, gender: str | None, top: int | None) -> list[Tuple[str, str]]:
+    parser.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help="Download the closest name when a requested name has no exact match (default: report candidates and skip).",
+    )
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="INE host (e.g. a local mock_ine_server URL for offline runs).")
+    parser.add_argument(
+        "--region-layout",
+        choices=["wide", "facts"],
+        default="wide",
+        help="Write municipality/province details as wide tables or as the compact fact/dimension layout.",
+    )
+    queue = parser.add_argument_group("work-queue mode")
+    queue.add_argument("--queue", type=Path, help="SQLite work queue shared by crawl workers.")
+    queue.add_argument("--enqueue", action="store_true", help="Add the selected names (all by default) to the queue.")
+    queue.add_argument("--workers", type=int, default=0, help="Worker processes draining the queue on this machine.")
+    queue.add_argument("--merge", action="store_true", help="Merge the completed shards into the details_* tables.")
+    queue.add_argument("--batch-size", type=int, default=20, help="Names leased per batch.")
+    queue.add_argument("--lease-ttl", type=float, default=300.0, help="Seconds before an unrenewed lease is reclaimed.")
+    args = parser.parse_args(argv)
+    if args.base_csv is None and (args.queue is None or args.enqueue):
+        parser.error("--base-csv is required unless only running --workers/--merge against a --queue")
+    if args.queue is None and (args.enqueue or args.workers or args.merge):
+        parser.error("--enqueue, --workers and --merge need --queue")
+    return args
+
+
+def _select_names(
+    df: pd.DataFrame,
+    *,
+    names: Sequence[str] | None,
+    gender: str | None,
+    top: int | None,
+    fuzzy: bool = False,
+) -> list[Tuple[str, str]]:
     if names:
         norm = [name.upper() for name in names]
+        matcher = _NameMatcher(df)
         result: list[Tuple[str, str]] = []
         for nombre in norm:
-            subset = df[df["Nombre"] == nombre]
+            subset = matcher.rows(nombre, fuzzy=fuzzy)
             if gender:
                 subset = subset[subset["Gender"].str.lower() == gender.lower()]
             if subset.empty:
@@ -197,15 +432,49 @@ def _select_names(df: pd.DataFrame, *, names: Sequence[str] | None, gender: str
     return [(row["Nombre"], row["Gender"]) for _, row in subset.iterrows()]
 
 
+def _run_queue_mode(args: argparse.Namespace) -> None:
+    queue = WorkQueue(args.queue, lease_ttl_s=args.lease_ttl)
+    if args.enqueue:
+        df = _load_base_dataframe(args.base_csv)
+        targets = _select_names(df, names=args.names, gender=args.gender, top=args.top, fuzzy=args.fuzzy)
+        if args.limit is not None:
+            targets = targets[: args.limit]
+        frequencies = df.drop_duplicates(["Nombre", "Gender"]).set_index(["Nombre", "Gender"])["Frecuencia"]
+        added = queue.enqueue((nombre, gender, frequencies[(nombre, gender)]) for nombre, gender in targets)
+        print(f"Queued {added} new names ({len(targets) - added} already queued)")
+
+    if args.workers:
+        run_queue_workers(
+            args.workers,
+            args.queue,
+            args.output_dir,
+            base_url=args.base_url,
+            batch_size=args.batch_size,
+            lease_ttl_s=args.lease_ttl,
+        )
+
+    counts = queue.counts()
+    print("Queue: " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+    if args.merge:
+        if counts["pending"] or counts["leased"]:
+            print("Warning: merging while names are still pending or leased", file=sys.stderr)
+        for kind, rows in merge_queue_shards(args.queue, args.output_dir, args.file_prefix, args.region_layout).items():
+            print(f"Merged {rows} rows into {args.file_prefix}_{kind}")
+
+
 def main(argv: Sequence[str] | None = None) -> None:
     args = _parse_args(argv)
 
-    if not args.base_csv.exists():
-        print(f"Error: base CSV not found: {args.base_csv}", file=sys.stderr)
+    if args.base_csv is not None and not resolve_table(args.base_csv).exists():
+        print(f"Error: base table not found: {args.base_csv}", file=sys.stderr)
         sys.exit(1)
 
+    if args.queue is not None:
+        _run_queue_mode(args)
+        return
+
     df = _load_base_dataframe(args.base_csv)
-    targets = _select_names(df, names=args.names, gender=args.gender, top=args.top)
+    targets = _select_names(df, names=args.names, gender=args.gender, top=args.top, fuzzy=args.fuzzy)
 
     if not targets:
         print("No names selected for details download.", file=sys.stderr)
@@ -217,6 +486,9 @@ def main(argv: Sequence[str] | None = None) -> None:
         limit=args.limit,
         output_dir=args.output_dir,
         file_prefix=args.file_prefix,
+        fuzzy=args.fuzzy,
+        base_url=args.base_url,
+        region_layout=args.region_layout,
     )
 
 
@@ -7,23 +7,164 @@ Supports Gemini and OpenAI providers with highly parallel requests.
 import os
 import asyncio
 import json
-import csv
 import time
 import random
 import argparse
 from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import google.generativeai as genai
+import polars as pl
 from dotenv import load_dotenv
 
+from utils.enrichment_telemetry import EnrichmentTelemetry
+from utils.origin_classifier import DEFAULT_TARGET_PRECISION, OriginClassifier
+from utils.row_sampling import SAMPLING_MODES, select_rows
+from utils.tables import ENRICHED_SCHEMA, resolve_table, write_table
+
 try:
     from openai import OpenAI
 except Exception:  # pragma: no cover - optional dependency
     OpenAI = None
 
 
+# Distance of each origin from Spanish/Latin, used to pick the dominant
+# component of a compound name (see rule 2 in ``get_origin_prompt``).
+# Origins not listed here count as the most distant.
+_ORIGIN_DISTANCE: Dict[str, int] = {
+    "Español": 0,
+    "Desconocido": 1,
+    "Otro": 1,
+    "Latinoamericano": 2,
+    "Catalán": 2,
+    "Gallego": 2,
+    "Portugués": 2,
+    "Italiano": 2,
+    "Francés": 2,
+    "Rumano": 2,
+}
+_MAX_ORIGIN_DISTANCE = 3
+# Placeholders for a component that could not be classified (unknown name or a
+# failed/unparseable origin call); they carry no information about the compound.
+_UNKNOWN_ORIGINS = frozenset({"Desconocido", "Otro"})
+# Connecting words in compound names (MARIA DEL CARMEN, JUAN DE LA CRUZ,
+# JOSEP I JOAN); they are not names and are never sent for classification.
+_NAME_PARTICLES = frozenset({"DE", "DEL", "LA", "LAS", "LOS", "EL", "Y", "I", "E", "DA", "DO", "DAS", "DOS"})
+
+
+# Rate limits, request timeouts and server errors are transient and retried;
+# any other status (bad request, auth, quota config) fails the call at once.
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Whether a provider error is worth retrying.
+
+    OpenAI errors carry the HTTP ``status_code`` and Gemini
+    (``google.api_core``) errors the HTTP ``code``; errors without a status
+    are retried only when they are timeouts or dropped connections.
+    """
+    status = getattr(exc, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(exc, "code", None)
+    if isinstance(status, int):
+        return status in RETRY_STATUSES
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def normalize_unit_name(name: str) -> str:
+    """Key used to collapse rows that refer to the same name."""
+    return " ".join(str(name).split()).upper()
+
+
+def derive_compound_origin(part_origins: List[str]) -> str:
+    """Derive a compound name origin from its components' origins.
+
+    Mirrors the compound rules given to the LLM in ``get_origin_prompt``:
+    an Anglo-Saxon + Spanish mix is "Latinoamericano"; otherwise the component
+    most distant from Spanish and Latin wins (first one on ties). Components
+    with an unknown origin are ignored unless no component is known.
+    """
+    if not part_origins:
+        return "Desconocido"
+    known = [origin for origin in part_origins if origin not in _UNKNOWN_ORIGINS] or part_origins
+    if "Anglosajón" in known and "Español" in known:
+        return "Latinoamericano"
+    return max(
+        known,
+        key=lambda origin: _ORIGIN_DISTANCE.get(origin, _MAX_ORIGIN_DISTANCE),
+    )
+
+
+@dataclass(slots=True)
+class EnrichmentPlan:
+    """Unique enrichment units for a list of input rows.
+
+    ``units`` holds one name per distinct normalized name, ``row_units`` maps
+    every input row to its unit, ``origin_names`` lists the names whose origin
+    must be classified and ``compound_parts`` the components of compound units
+    whose origin is derived locally. ``local_origins`` holds the origins
+    resolved without the LLM (e.g. by the local classifier).
+    """
+
+    units: List[str]
+    row_units: List[int]
+    origin_names: List[str]
+    compound_parts: Dict[str, List[str]] = field(default_factory=dict)
+    local_origins: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def llm_origin_names(self) -> List[str]:
+        return [name for name in self.origin_names if name not in self.local_origins]
+
+    @property
+    def call_count(self) -> int:
+        return len(self.llm_origin_names) + 2 * len(self.units)
+
+
+def plan_enrichment_units(names: List[str], split_compounds: bool = False) -> EnrichmentPlan:
+    """Collapse identical names into single enrichment units.
+
+    The same ``Nombre`` appears once per gender, so each distinct name is
+    enriched once and the result fanned out to every matching row. With
+    ``split_compounds`` the origin of compound names is derived from their
+    components, which are classified once and shared across compounds.
+    Particles such as DEL or DE LA are not components.
+    """
+    unit_index: Dict[str, int] = {}
+    units: List[str] = []
+    row_units: List[int] = []
+    for name in names:
+        key = normalize_unit_name(name)
+        if key not in unit_index:
+            unit_index[key] = len(units)
+            units.append(key)
+        row_units.append(unit_index[key])
+
+    compound_parts: Dict[str, List[str]] = {}
+    origin_names: Dict[str, None] = {}
+    for unit in units:
+        words = unit.split()
+        parts = [word for word in words if word not in _NAME_PARTICLES]
+        if split_compounds and len(words) > 1 and parts:
+            compound_parts[unit] = parts
+            origin_names.update(dict.fromkeys(parts))
+        else:
+            origin_names[unit] = None
+
+    return EnrichmentPlan(
+        units=units,
+        row_units=row_units,
+        origin_names=list(origin_names),
+        compound_parts=compound_parts,
+    )
+
+
 class UltraFastEnricher:
     def __init__(
         self,
@@ -32,19 +173,38 @@ class UltraFastEnricher:
         model_name: str = "gemini-2.5-flash",
         provider: str = "gemini",
         max_concurrent: Optional[int] = None,
+        base_url: Optional[str] = None,
+        origin_classifier: Optional[OriginClassifier] = None,
+        max_retries: int = 2,
     ) -> None:
-        """Initialise the enricher with the desired provider."""
+        """Initialise the enricher with the desired provider.
+
+        ``base_url`` points the provider client at an alternative endpoint,
+        e.g. the local mock server in ``benchmarks/mock_llm_server.py``.
+        When ``origin_classifier`` is given, origins it predicts at or above
+        its calibrated threshold skip the origin LLM call. Calls failing
+        with a transient error (``is_retryable_error``) are retried up to
+        ``max_retries`` times; every call and attempt is recorded in
+        ``self.telemetry``.
+        """
         load_dotenv()
         self.provider = provider
         self.model_name = model_name
         self.tier = tier
         self.api_key = api_key
+        self.origin_classifier = origin_classifier
+        self.last_plan: Optional[EnrichmentPlan] = None
+        self.max_retries = max_retries
+        self.telemetry = EnrichmentTelemetry(provider, model_name)
 
         if self.provider == "gemini":
             self.api_key = self.api_key or os.environ.get("GEMINI_API_KEY")
             if not self.api_key:
                 raise ValueError("GEMINI_API_KEY not found")
-            genai.configure(api_key=self.api_key)
+            if base_url:
+                genai.configure(api_key=self.api_key, transport="rest", client_options={"api_endpoint": base_url})
+            else:
+                genai.configure(api_key=self.api_key)
             self.model = genai.GenerativeModel(self.model_name)
             self.openai_client = None
         elif self.provider == "openai":
@@ -53,7 +213,8 @@ class UltraFastEnricher:
                 raise ValueError("OPENAI_API_KEY not found")
             if OpenAI is None:  # pragma: no cover - sanity guard
                 raise ImportError("openai package is required. Install it via requirements.txt")
-            self.openai_client = OpenAI()
+            # Retries are handled (and counted) by ``call_api``.
+            self.openai_client = OpenAI(api_key=self.api_key, base_url=base_url, max_retries=0)
             self.model = None
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
@@ -244,82 +405,136 @@ class UltraFastEnricher:
     # ------------------------------------------------------------------
     # API calls
     # ------------------------------------------------------------------
-    async def process_all_names(self, names: List[str]) -> List[Dict[str, str]]:
+    async def process_all_names(
+        self, names: List[str], split_compounds: bool = False
+    ) -> List[Dict[str, str]]:
+        plan = plan_enrichment_units(names, split_compounds=split_compounds)
+        if self.origin_classifier is not None:
+            plan.local_origins = self.origin_classifier.confident_origins(plan.origin_names)
+        self.last_plan = plan
         semaphore = asyncio.Semaphore(self.max_concurrent)
         executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
 
-        async def call_api(prompt: str, config: Optional[dict] = None) -> Optional[str]:
-            async with semaphore:
-                loop = asyncio.get_event_loop()
-                try:
-                    if self.provider == "gemini":
-                        if config:
-                            response = await loop.run_in_executor(
-                                executor,
-                                lambda: self.model.generate_content(prompt, generation_config=config),
-                            )
-                        else:
-                            response = await loop.run_in_executor(
-                                executor,
-                                lambda: self.model.generate_content(prompt),
-                            )
-                        return response.text
-
-                    def _openai_call() -> str:
-                        messages = [
-                            {
-                                "role": "system",
-                                "content": (
-                                    "Eres un asistente que responde exactamente según las instrucciones; "
-                                    "si se pide JSON, devuelve un JSON válido"
-                                ),
-                            },
-                            {"role": "user", "content": prompt},
-                        ]
-                        if config:
-                            response = self.openai_client.chat.completions.create(
-                                model=self.model_name,
-                                messages=messages,
-                                response_format={"type": "json_object"},
-                            )
-                        else:
-                            response = self.openai_client.chat.completions.create(
-                                model=self.model_name,
-                                messages=messages,
-                            )
-                        return response.choices[0].message.content
-
-                    return await loop.run_in_executor(executor, _openai_call)
-                except Exception as exc:  # pragma: no cover - debugging helper
-                    print(f"API error: {exc}")
-                    return None
-
-        # Origins first
-        origin_tasks = [call_api(self.get_origin_prompt(name), self.origin_config) for name in names]
+        def _request(prompt: str, config: Optional[dict]) -> Tuple[str, int, int]:
+            """Blocking provider call returning ``(text, input_tokens, output_tokens)``."""
+            if self.provider == "gemini":
+                if config:
+                    response = self.model.generate_content(prompt, generation_config=config)
+                else:
+                    response = self.model.generate_content(prompt)
+                usage = getattr(response, "usage_metadata", None)
+                return (
+                    response.text,
+                    getattr(usage, "prompt_token_count", 0) or 0,
+                    getattr(usage, "candidates_token_count", 0) or 0,
+                )
+
+            messages = [
+                {
+                    "role": "system",
+                    "content": (
+                        "Eres un asistente que responde exactamente según las instrucciones; "
+                        "si se pide JSON, devuelve un JSON válido"
+                    ),
+                },
+                {"role": "user", "content": prompt},
+            ]
+            if config:
+                response = self.openai_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                )
+            else:
+                response = self.openai_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                )
+            usage = response.usage
+            return (
+                response.choices[0].message.content,
+                getattr(usage, "prompt_tokens", 0) or 0,
+                getattr(usage, "completion_tokens", 0) or 0,
+            )
+
+        async def call_api(prompt: str, config: Optional[dict] = None, prompt_type: str = "description") -> Optional[str]:
+            loop = asyncio.get_running_loop()
+            queue_wait = 0.0
+            retries = 0
+            while True:
+                # The slot is held for one request only, never across a backoff sleep.
+                queued_at = time.perf_counter()
+                async with semaphore:
+                    started = time.perf_counter()
+                    queue_wait += started - queued_at
+                    try:
+                        text, input_tokens, output_tokens = await loop.run_in_executor(
+                            executor, _request, prompt, config
+                        )
+                        error = None
+                    except Exception as exc:
+                        error = exc
+                    self.telemetry.record_attempt(prompt_type, time.perf_counter() - started)
+
+                if error is None:
+                    self.telemetry.record_call(
+                        prompt_type,
+                        queue_wait_s=queue_wait,
+                        retries=retries,
+                        ok=True,
+                        input_tokens=input_tokens,
+                        output_tokens=output_tokens,
+                    )
+                    return text
+                if retries < self.max_retries and is_retryable_error(error):
+                    retries += 1
+                    await asyncio.sleep(min(20.0, 2 ** retries) * random.uniform(0.5, 1.0))
+                    continue
+                print(f"API error: {error}")
+                self.telemetry.record_call(prompt_type, queue_wait_s=queue_wait, retries=retries, ok=False)
+                return None
+
+        # Origins first (compound origins are derived from their components)
+        llm_origin_names = plan.llm_origin_names
+        origin_tasks = [
+            call_api(self.get_origin_prompt(name), self.origin_config, "origin") for name in llm_origin_names
+        ]
         origin_results = await asyncio.gather(*origin_tasks)
 
-        origins: List[str] = []
-        for name, result in zip(names, origin_results):
+        origin_by_name: Dict[str, str] = dict(plan.local_origins)
+        for name, result in zip(llm_origin_names, origin_results):
             origin = "Otro"
             if result:
                 try:
                     origin = json.loads(result).get("origin", "Otro")
                 except Exception:
+                    self.telemetry.record_parse_failure("origin")
                     origin = "Otro"
-            origins.append(origin)
+            origin_by_name[name] = origin
+
+        origins: List[str] = []
+        for unit in plan.units:
+            parts = plan.compound_parts.get(unit)
+            if parts:
+                origins.append(derive_compound_origin([origin_by_name[part] for part in parts]))
+            else:
+                origins.append(origin_by_name[unit])
 
         # Descriptions & pronunciation
-        desc_tasks = [call_api(self.get_description_prompt(name, origin)) for name, origin in zip(names, origins)]
+        desc_tasks = [
+            call_api(self.get_description_prompt(name, origin), prompt_type="description")
+            for name, origin in zip(plan.units, origins)
+        ]
         pron_tasks = [
-            call_api(self.get_pronunciation_prompt(name, origin), self.pronunciation_config)
-            for name, origin in zip(names, origins)
+            call_api(self.get_pronunciation_prompt(name, origin), self.pronunciation_config, "pronunciation")
+            for name, origin in zip(plan.units, origins)
         ]
 
         desc_results = await asyncio.gather(*desc_tasks)
         pron_results = await asyncio.gather(*pron_tasks)
 
-        enrichments: List[Dict[str, str]] = []
-        for name, origin, desc_text, pron_text in zip(names, origins, desc_results, pron_results):
+        unit_enrichments: List[Dict[str, str]] = []
+        for name, origin, desc_text, pron_text in zip(plan.units, origins, desc_results, pron_results):
             description = desc_text or f"Nombre de origen {origin}."
             if len(description) > 500:
                 description = description[:497] + "..."
@@ -335,9 +550,9 @@ class UltraFastEnricher:
                         "explanation": self._clean_text(pron_json.get("explanation", ""), name),
                     }
                 except Exception:
-                    pass
+                    self.telemetry.record_parse_failure("pronunciation")
 
-            enrichments.append(
+            unit_enrichments.append(
                 {
                     "Family_Origin": origin,
                     "Name_Description": description,
@@ -347,6 +562,7 @@ class UltraFastEnricher:
                 }
             )
 
+        enrichments = [dict(unit_enrichments[unit]) for unit in plan.row_units]
         executor.shutdown(wait=False)
         return enrichments
 
@@ -361,80 +577,133 @@ async def process_file_ultra_fast(
     max_concurrent: Optional[int] = None,
     mode: str = "sequential",
     seed: Optional[int] = None,
+    split_compounds: bool = False,
+    base_url: Optional[str] = None,
+    local_origin_model: Optional[str] = None,
+    local_origin_precision: float = DEFAULT_TARGET_PRECISION,
+    telemetry_report: Optional[str] = None,
+    prometheus_port: Optional[int] = None,
 ) -> None:
-    """Load names, enrich them and save the result."""
+    """Load names, enrich them and save the result.
+
+    The output is written as typed Parquet plus a CSV export next to it.
+    A JSON telemetry report is written to ``telemetry_report`` (default:
+    ``<output_file>.telemetry.json``); ``prometheus_port`` additionally serves
+    live metrics at ``/metrics`` while the run is in progress.
+    """
+    origin_classifier = None
+    if local_origin_model:
+        origin_classifier = OriginClassifier.load(Path(local_origin_model))
+        # Raises when the holdout precision is below the requested one.
+        origin_classifier.check_precision(local_origin_precision)
     enricher = UltraFastEnricher(
         tier=tier,
         model_name=model_name,
         provider=provider,
         max_concurrent=max_concurrent,
+        base_url=base_url,
+        origin_classifier=origin_classifier,
     )
 
-    with open(input_file, "r", encoding="utf-8") as infile:
-        reader = csv.DictReader(infile)
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames) + [
-            "Family_Origin",
-            "Name_Description",
-            "Pronunciation_Spanish",
-            "Pronunciation_Foreign",
-            "Pronunciation_Explanation",
-        ]
+    input_fieldnames, rows = select_rows(input_file, max_names=max_names, mode=mode, seed=seed)
+    fieldnames = input_fieldnames + [
+        "Family_Origin",
+        "Name_Description",
+        "Pronunciation_Spanish",
+        "Pronunciation_Foreign",
+        "Pronunciation_Explanation",
+    ]
 
     if not rows:
         print("No rows found in input file. Nothing to do.")
         return
 
-    if seed is not None:
-        random.seed(seed)
-
-    if mode == "random":
-        if max_names is None or max_names >= len(rows):
-            random.shuffle(rows)
-        else:
-            rows = random.sample(rows, max_names)
-    else:
-        if max_names is not None and max_names > 0:
-            rows = rows[:max_names]
-
-    names = [row["Nombre"] for row in rows]
+    names = [row.nombre for row in rows]
     total = len(names)
 
     print(f"\nProcessing {total} names ultra-fast ({mode})...")
     start_time = time.time()
 
-    enrichments = await enricher.process_all_names(names)
+    if prometheus_port:
+        enricher.telemetry.serve_prometheus(prometheus_port)
+        print(f"Prometheus metrics at http://127.0.0.1:{prometheus_port}/metrics")
+
+    try:
+        enrichments = await enricher.process_all_names(names, split_compounds=split_compounds)
+    finally:
+        enricher.telemetry.stop_server()
+    plan = enricher.last_plan
+    print(
+        f"Planned {len(plan.units)} unique names ({len(plan.llm_origin_names)} origin calls, "
+        f"{plan.call_count} LLM calls) for {total} rows"
+    )
+    if origin_classifier is not None:
+        print(
+            f"Local classifier resolved {len(plan.local_origins)}/{len(plan.origin_names)} origins "
+            f"(confidence >= {origin_classifier.threshold:.3f}, holdout precision {origin_classifier.holdout_precision:.1%})"
+        )
 
-    with open(output_file, "w", encoding="utf-8", newline="") as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL)
-        writer.writeheader()
-        for idx, (row, enrichment) in enumerate(zip(rows, enrichments), start=1):
-            row.update(enrichment)
-            writer.writerow(row)
-            print(f"[{idx}/{total}] {row['Nombre']}: {enrichment['Family_Origin']}")
+    records = []
+    for idx, (row, enrichment) in enumerate(zip(rows, enrichments), start=1):
+        record = row.as_dict(input_fieldnames)
+        record.update(enrichment)
+        records.append(record)
+        print(f"[{idx}/{total}] {row.nombre}: {enrichment['Family_Origin']}")
+    # Cells arrive as text; the schema restores the phase 2 dtypes.
+    output_frame = pl.DataFrame(records, schema={name: pl.Utf8 for name in fieldnames})
+    output_file = write_table(output_frame, output_file, ENRICHED_SCHEMA)
 
     elapsed = time.time() - start_time
     avg = elapsed / total if total else 0
-    effective_rpm = (total * 3 / elapsed * 60) if elapsed else 0
+    effective_rpm = (enricher.telemetry.successful_calls / elapsed * 60) if elapsed else 0
+    report_path = enricher.telemetry.write_json(
+        telemetry_report or Path(output_file).with_suffix(".telemetry.json")
+    )
 
     print(f"\n✨ Completed in {elapsed:.1f} seconds!")
     print(f"⚡ Speed: {avg:.2f} seconds per name")
     print(f"🚀 Effective RPM: {effective_rpm:.0f}")
     print(f"📁 Output: {output_file}")
+    print(f"📊 Telemetry: {report_path}\n")
+    enricher.telemetry.print_summary()
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Ultra-fast parallel enrichment")
     parser.add_argument("--num", type=int, default=50, help="Number of names (ignored with --all)")
     parser.add_argument("--all", action="store_true", help="Process all names in the dataset")
-    parser.add_argument("--mode", choices=["sequential", "random"], default="sequential", help="Processing mode")
-    parser.add_argument("--seed", type=int, help="Random seed when using random mode")
+    parser.add_argument(
+        "--mode",
+        choices=SAMPLING_MODES,
+        default="sequential",
+        help="Row selection: first N rows, uniform random sample, or random sample stratified by frequency",
+    )
+    parser.add_argument("--seed", type=int, help="Random seed when using random or stratified mode")
     parser.add_argument("--tier", choices=["free", "level1"], default="level1", help="Provider tier preset")
     parser.add_argument("--provider", choices=["gemini", "openai"], default="gemini", help="LLM provider")
     parser.add_argument("--model", type=str, default="gemini-2.5-flash", help="Provider model to use")
     parser.add_argument("--max-concurrent", type=int, help="Override max concurrent requests")
-    parser.add_argument("--input-file", type=str, help="Input CSV file")
-    parser.add_argument("--output-file", type=str, help="Output CSV file")
+    parser.add_argument(
+        "--split-compounds",
+        action="store_true",
+        help="Classify compound name components once and derive the compound origin locally",
+    )
+    parser.add_argument(
+        "--local-origin-model",
+        type=str,
+        help="Local origin classifier (see train_origin_classifier.py); confident names skip the origin LLM call",
+    )
+    parser.add_argument(
+        "--local-origin-precision",
+        type=float,
+        default=DEFAULT_TARGET_PRECISION,
+        help="Refuse a local origin model whose calibrated holdout precision is below this (default: 0.9)",
+    )
+    parser.add_argument("--telemetry-report", type=str, help="JSON telemetry report path (default: <output>.telemetry.json)")
+    parser.add_argument("--prometheus-port", type=int, help="Serve live Prometheus metrics on this port during the run")
+    parser.add_argument("--base-url", type=str, help="Override the provider API endpoint (e.g. a local mock server)")
+    parser.add_argument("--input-file", type=str, help="Input table (Parquet, or CSV)")
+    parser.add_argument("--output-file", type=str, help="Output table (Parquet plus a CSV export)")
 
     args = parser.parse_args()
     script_dir = Path(__file__).parent
@@ -444,20 +713,27 @@ def main() -> None:
         if not input_file.is_absolute():
             input_file = script_dir / args.input_file
     else:
-        input_file = script_dir / "output_data" / "2_data_process_INE_names" / "names_frecuencia_edad_media.csv"
+        input_file = script_dir / "output_data" / "2_data_process_INE_names" / "names_frecuencia_edad_media.parquet"
 
     if args.output_file:
         output_file = Path(args.output_file)
         if not output_file.is_absolute():
             output_file = script_dir / args.output_file
     else:
-        default_name = f"names_ultra_fast_{args.provider}_{args.tier}.csv"
+        default_name = f"names_ultra_fast_{args.provider}_{args.tier}.parquet"
         output_file = script_dir / "output_data" / "4_data_enrich_names" / default_name
 
-    if not input_file.exists():
+    if not resolve_table(input_file).exists():
         print(f"Error: Input file not found: {input_file}")
         return
 
+    if args.local_origin_model:
+        try:
+            OriginClassifier.load(Path(args.local_origin_model)).check_precision(args.local_origin_precision)
+        except ValueError as exc:
+            print(f"Error: refusing local origin model {args.local_origin_model}: {exc}")
+            raise SystemExit(1)
+
     max_names = None if args.all else args.num
 
     asyncio.run(
@@ -471,6 +747,12 @@ def main() -> None:
             max_concurrent=args.max_concurrent,
             mode=args.mode,
             seed=args.seed,
+            split_compounds=args.split_compounds,
+            base_url=args.base_url,
+            local_origin_model=args.local_origin_model,
+            local_origin_precision=args.local_origin_precision,
+            telemetry_report=args.telemetry_report,
+            prometheus_port=args.prometheus_port,
         )
     )
 
@@ -6,24 +6,25 @@ Script to filter Spanish names dataset for young, popular names
 - Take: Top 50 most frequent
 """
 
-import pandas as pd
 import sys
 from pathlib import Path
 
+from utils.tables import PROCESSED_SCHEMA, read_pandas, resolve_table, write_table
+
 def filter_young_popular_names(input_file, output_file, max_age=40, top_n=50):
     """
     Filter names dataset for young, popular names
     
     Args:
-        input_file: Path to input CSV file
-        output_file: Path to output CSV file
+        input_file: Path to input table (Parquet, or CSV)
+        output_file: Path to output table (Parquet plus a CSV export)
         max_age: Maximum average age to include (default: 40)
         top_n: Number of top names to keep (default: 50)
     """
     print(f"Loading dataset from: {input_file}")
     
     # Load the dataset
-    df = pd.read_csv(input_file)
+    df = read_pandas(input_file, PROCESSED_SCHEMA)
     
     print(f"Original dataset size: {len(df)} names")
     print(f"Age range in dataset: {df['Edad Media (*)'].min():.1f} - {df['Edad Media (*)'].max():.1f} years")
@@ -48,7 +49,7 @@ def filter_young_popular_names(input_file, output_file, max_age=40, top_n=50):
         print(f"{i:2d}. {row['Nombre']:<20} - Freq: {row['Frecuencia']:>6,} - Age: {row['Edad Media (*)']:>5.1f}")
     
     # Save filtered dataset
-    top_names.to_csv(output_file, index=False)
+    output_file = write_table(top_names, output_file, PROCESSED_SCHEMA)
     print(f"\nFiltered dataset saved to: {output_file}")
     
     # Show some statistics
@@ -79,7 +80,7 @@ Examples:
     parser.add_argument('--top-n', type=int, default=50,
                        help='Number of top names to keep (default: 50)')
     parser.add_argument('--input-file', type=str,
-                       help='Custom input file path (default: names_frecuencia_edad_media.csv)')
+                       help='Custom input file path (default: names_frecuencia_edad_media.parquet)')
     parser.add_argument('--output-file', type=str,
                        help='Custom output file path (default: auto-generated)')
     
@@ -94,7 +95,7 @@ Examples:
         if not input_file.is_absolute():
             input_file = script_dir / args.input_file
     else:
-        input_file = script_dir / 'output_data' / '2_data_process_INE_names' / 'names_frecuencia_edad_media.csv'
+        input_file = script_dir / 'output_data' / '2_data_process_INE_names' / 'names_frecuencia_edad_media.parquet'
     
     # Output file
     if args.output_file:
@@ -102,10 +103,10 @@ Examples:
         if not output_file.is_absolute():
             output_file = script_dir / args.output_file
     else:
-        output_file = script_dir / 'output_data' / '5_data_filter_young_popular_names' / f'young_popular_names_age{args.max_age}_top{args.top_n}.csv'
+        output_file = script_dir / 'output_data' / '5_data_filter_young_popular_names' / f'young_popular_names_age{args.max_age}_top{args.top_n}.parquet'
     
-    # Check if input file exists
-    if not input_file.exists():
+    # Check if input file exists (a CSV-only phase 2 output is also accepted)
+    if not resolve_table(input_file).exists():
         print(f"Error: Input file not found: {input_file}")
         return 1
     
@@ -0,0 +1,91 @@
+"""Build the dense names × decades matrix from the phase 3 decade details.
+
+Reads ``details_decades`` (Parquet, or the CSV export) and writes the
+``utils.decade_matrix.DecadeMatrix`` arrays plus their name index to
+``output_data/decade_matrix/``.
+
+Usage::
+
+    python build_decade_matrix.py
+    python build_decade_matrix.py --query Lucia --query Antonio
+    python build_decade_matrix.py --load --mostly 2000-2010 --mostly 2010-2019
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Sequence
+
+from utils.decade_matrix import INDEX_FILENAME, DecadeMatrix
+from utils.tables import DECADES_SCHEMA, read_table, resolve_table
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_DECADES_CSV = BASE_DIR / "output_data" / "3_data_download_INE_names_details" / "details" / "details_decades.csv"
+DEFAULT_MATRIX_DIR = BASE_DIR / "output_data" / "decade_matrix"
+
+
+def build_matrix(decades_csv: Path = DEFAULT_DECADES_CSV) -> DecadeMatrix:
+    if not resolve_table(decades_csv).exists():
+        raise FileNotFoundError(f"Decade details not found: {decades_csv}")
+    return DecadeMatrix.from_frame(read_table(decades_csv, DECADES_SCHEMA))
+
+
+def _print_rows(matrix: DecadeMatrix, names: Sequence[str]) -> None:
+    for nombre in names:
+        for gender in ("Male", "Female"):
+            row = matrix.row(nombre, gender)
+            if row is None:
+                continue
+            print(f"\n{nombre.upper()} ({gender}), {int(matrix.counts[row].sum())} people")
+            for decade, count, share in zip(matrix.decades, matrix.counts[row], matrix.shares[row]):
+                print(f"  {decade:<10} {int(count):>9} {share:6.1%}")
+
+
+def _print_mostly(matrix: DecadeMatrix, decades: Sequence[str], threshold: float) -> None:
+    share = matrix.share_of(decades)
+    hits = matrix.to_frame(share=share).filter(share > threshold).sort("share", descending=True)
+    print(f"\n{hits.height} names with more than {threshold:.0%} of births in {', '.join(decades)}")
+    for nombre, gender, value in hits.head(20).iter_rows():
+        print(f"  {nombre:<24} {gender:<6} {value:6.1%}")
+
+
+def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the names × decades matrix from the phase 3 decade details.")
+    parser.add_argument("--decades-csv", type=Path, default=DEFAULT_DECADES_CSV, help="Phase 3 details_decades table (its Parquet sibling is preferred).")
+    parser.add_argument("--output", type=Path, default=DEFAULT_MATRIX_DIR, help="Directory to write the matrix to.")
+    parser.add_argument("--load", action="store_true", help="Query the existing matrix instead of rebuilding it.")
+    parser.add_argument("--query", action="append", default=[], help="Print the decade profile of a name (repeatable).")
+    parser.add_argument("--mostly", action="append", default=[], help="List names born mostly in these decades (repeatable).")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Share of births --mostly requires.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = _parse_args(argv)
+
+    if args.load:
+        if not (args.output / INDEX_FILENAME).exists():
+            print(f"Error: matrix not found: {args.output}", file=sys.stderr)
+            sys.exit(1)
+        matrix = DecadeMatrix.load(args.output)
+    else:
+        started = time.perf_counter()
+        try:
+            matrix = build_matrix(args.decades_csv)
+        except FileNotFoundError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        matrix.save(args.output)
+        elapsed = time.perf_counter() - started
+        print(f"Built {len(matrix)} names × {len(matrix.decades)} decades in {elapsed:.1f}s -> {args.output}")
+
+    _print_rows(matrix, args.query)
+    if args.mostly:
+        _print_mostly(matrix, args.mostly, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
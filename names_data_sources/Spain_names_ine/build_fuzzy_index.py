@@ -0,0 +1,126 @@
+"""Build the accent- and typo-tolerant name index over INE and SSA names.
+
+Reads the phase 1 base table (``Nombre``/``Frecuencia``; every name of both
+sexes, compounds included, unlike the phase 2 table) and, when the USA
+pipeline has been run, the SSA name totals, and writes a single ``.npz`` that
+``utils.fuzzy_names.FuzzyNameIndex.load`` reads back. Phase 3 uses it to
+resolve requested names that have no exact match.
+
+Usage::
+
+    python build_fuzzy_index.py
+    python build_fuzzy_index.py --query Vicotriano --query "maria jose"
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, Sequence, Tuple
+
+import polars as pl
+
+from utils.fuzzy_names import SOURCE_INE, SOURCE_SSA, FuzzyNameIndex
+from utils.tables import BASE_SCHEMA, read_table, resolve_table
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_BASE_CSV = BASE_DIR / "output_data" / "1_data_download_INE_names" / "names_frecuencia_edad_media.csv"
+DEFAULT_SSA_TOTALS = BASE_DIR.parent / "USA_names_ssa" / "output_data" / "aggregates" / "name_totals.parquet"
+DEFAULT_INDEX_PATH = BASE_DIR / "output_data" / "fuzzy_name_index.npz"
+
+
+def ine_entries(base_csv: Path) -> Iterator[Tuple[str, int, int]]:
+    frame = read_table(base_csv, BASE_SCHEMA, columns=["Nombre", "Frecuencia"])
+    for name, count in frame.iter_rows():
+        yield name, int(count or 0), SOURCE_INE
+
+
+def ssa_entries(name_totals: Path) -> Iterator[Tuple[str, int, int]]:
+    frame = pl.read_parquet(name_totals, columns=["name", "total_count"])
+    for name, count in frame.iter_rows():
+        yield name, int(count or 0), SOURCE_SSA
+
+
+def build_index(
+    base_csv: Path | None = DEFAULT_BASE_CSV,
+    ssa_totals: Path | None = DEFAULT_SSA_TOTALS,
+    *,
+    max_distance: int = 2,
+    prefix_length: int = 7,
+) -> FuzzyNameIndex:
+    """Index every name from whichever of the two sources exist."""
+    entries: list[Tuple[str, int, int]] = []
+    if base_csv is not None and resolve_table(base_csv).exists():
+        entries.extend(ine_entries(base_csv))
+        print(f"INE names: {len(entries)} rows from {base_csv}")
+    if ssa_totals is not None and ssa_totals.exists():
+        before = len(entries)
+        entries.extend(ssa_entries(ssa_totals))
+        print(f"SSA names: {len(entries) - before} rows from {ssa_totals}")
+    if not entries:
+        raise FileNotFoundError("Neither the INE phase 1 table nor the SSA name totals were found")
+    return FuzzyNameIndex.build(entries, max_distance=max_distance, prefix_length=prefix_length)
+
+
+def _print_matches(index: FuzzyNameIndex, queries: Sequence[str]) -> None:
+    for query in queries:
+        started = time.perf_counter()
+        matches = index.search(query)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        print(f"\n{query!r} ({elapsed_us:.0f} µs)")
+        if not matches:
+            print("  no match")
+        for match in matches:
+            sources = "+".join(match.sources)
+            print(f"  {match.name:<24} distance={match.distance} count={match.count} sources={sources}")
+
+
+def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the fuzzy name index over INE and SSA names.")
+    parser.add_argument("--base-csv", type=Path, default=DEFAULT_BASE_CSV, help="Phase 1 output with Nombre/Frecuencia (its Parquet sibling is preferred).")
+    parser.add_argument("--ssa-totals", type=Path, default=DEFAULT_SSA_TOTALS, help="SSA name_totals.parquet.")
+    parser.add_argument("--no-ssa", action="store_true", help="Index INE names only.")
+    parser.add_argument("--output", type=Path, default=DEFAULT_INDEX_PATH, help="Where to write the index.")
+    parser.add_argument("--max-distance", type=int, default=2, help="Largest edit distance the index supports.")
+    parser.add_argument("--prefix-length", type=int, default=7, help="Characters of each name used for deletions.")
+    parser.add_argument(
+        "--query",
+        action="append",
+        default=[],
+        help="Search the index after building (repeatable); with --load, skip the build.",
+    )
+    parser.add_argument("--load", action="store_true", help="Query the existing index instead of rebuilding it.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = _parse_args(argv)
+
+    if args.load:
+        if not args.output.exists():
+            print(f"Error: index not found: {args.output}", file=sys.stderr)
+            sys.exit(1)
+        index = FuzzyNameIndex.load(args.output)
+    else:
+        started = time.perf_counter()
+        try:
+            index = build_index(
+                args.base_csv,
+                None if args.no_ssa else args.ssa_totals,
+                max_distance=args.max_distance,
+                prefix_length=args.prefix_length,
+            )
+        except FileNotFoundError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        index.save(args.output)
+        elapsed = time.perf_counter() - started
+        print(f"Indexed {len(index)} names ({len(index.delete_hashes)} deletions) in {elapsed:.1f}s -> {args.output}")
+
+    _print_matches(index, args.query)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Map INE names to SSA names so their popularity can be compared.
+
+INE names are upper case, accented and may be compound ("MARÍA JOSÉ"); SSA
+names are title case without accents or spaces ("Mariajose"). Both sides get
+three keys computed as polars expressions over the whole column:
+
+- ``exact``: the name upper-cased ("JOSE" / "Jose")
+- ``folded``: accents stripped and spaces/punctuation removed
+  ("MARÍA JOSÉ" / "Mariajose")
+- ``phonetic``: ``utils.phonetic`` key of the folded name ("BRAYAN" / "Brian")
+
+The sides are joined on each key and sex, and every (INE name, SSA name, sex)
+pair keeps its strongest match type. The result is written as one Parquet
+table; no per-name Python loop is involved.
+
+The INE side is the phase 1 base table: phase 2 keeps only male, single-word
+names, so female and compound names would never be mapped from it.
+
+Usage::
+
+    python build_name_crosswalk.py
+    python build_name_crosswalk.py --show Victoriano --show "Maria Jose"
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Sequence
+
+import polars as pl
+
+from build_fuzzy_index import DEFAULT_BASE_CSV, DEFAULT_SSA_TOTALS
+from utils.phonetic import normalized_name_expr, phonetic_key_expr
+from utils.tables import BASE_SCHEMA, read_table, resolve_table
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "output_data" / "name_crosswalk.parquet"
+
+MATCH_TYPES = ["exact", "folded", "phonetic"]
+MATCH_TYPE_DTYPE = pl.Enum(MATCH_TYPES)
+SEX_FROM_GENDER = {"Male": "M", "Female": "F"}
+
+
+def _with_keys(frame: pl.DataFrame, name_column: str) -> pl.DataFrame:
+    folded = normalized_name_expr(name_column).str.replace_all(" ", "")
+    return frame.with_columns(
+        pl.col(name_column).str.to_uppercase().alias("exact_key"),
+        folded.alias("folded_key"),
+        phonetic_key_expr(folded).alias("phonetic_key"),
+    )
+
+
+def ine_names(base_csv: Path) -> pl.DataFrame:
+    frame = read_table(base_csv, BASE_SCHEMA, columns=["Nombre", "Gender", "Frecuencia"])
+    return _with_keys(
+        frame.select(
+            pl.col("Nombre").alias("ine_name"),
+            pl.col("Gender").replace_strict(SEX_FROM_GENDER, default=None).alias("sex"),
+            pl.col("Frecuencia").cast(pl.Int64).alias("ine_frequency"),
+        ).filter(pl.col("sex").is_not_null()),
+        "ine_name",
+    )
+
+
+def ssa_names(name_totals: Path) -> pl.DataFrame:
+    frame = pl.read_parquet(name_totals, columns=["name", "sex", "total_count"])
+    return _with_keys(
+        frame.select(
+            pl.col("name").alias("ssa_name"),
+            pl.col("sex").cast(pl.Utf8),
+            pl.col("total_count").alias("ssa_count"),
+        ),
+        "ssa_name",
+    )
+
+
+def build_crosswalk(ine: pl.DataFrame, ssa: pl.DataFrame) -> pl.DataFrame:
+    """One row per matched (INE name, SSA name, sex) with its strongest match type."""
+    ine_side = ine.lazy()
+    ssa_side = ssa.lazy()
+    matches = [
+        ine_side.join(ssa_side, on=[f"{match_type}_key", "sex"], how="inner", suffix="_ssa").select(
+            "ine_name",
+            "ssa_name",
+            "sex",
+            pl.lit(match_type, dtype=MATCH_TYPE_DTYPE).alias("match_type"),
+            "ine_frequency",
+            "ssa_count",
+        )
+        for match_type in MATCH_TYPES
+    ]
+    return (
+        pl.concat(matches)
+        .sort("match_type")
+        .unique(subset=["ine_name", "ssa_name", "sex"], keep="first", maintain_order=True)
+        .sort(["ine_name", "sex", "match_type", "ssa_count"], descending=[False, False, False, True])
+        .collect()
+    )
+
+
+def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the INE <-> SSA name crosswalk.")
+    parser.add_argument("--base-csv", type=Path, default=DEFAULT_BASE_CSV, help="Phase 1 base table (Nombre/Gender/Frecuencia).")
+    parser.add_argument("--ssa-totals", type=Path, default=DEFAULT_SSA_TOTALS, help="SSA name_totals.parquet.")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write the crosswalk.")
+    parser.add_argument("--show", action="append", default=[], help="Print the SSA matches of an INE name (repeatable).")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = _parse_args(argv)
+    for path in (resolve_table(args.base_csv), args.ssa_totals):
+        if not path.exists():
+            print(f"Error: input not found: {path}", file=sys.stderr)
+            sys.exit(1)
+
+    started = time.perf_counter()
+    ine = ine_names(args.base_csv)
+    ssa = ssa_names(args.ssa_totals)
+    crosswalk = build_crosswalk(ine, ssa)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    crosswalk.write_parquet(args.output, compression="zstd")
+    elapsed = time.perf_counter() - started
+
+    matched = crosswalk.select("ine_name", "sex").n_unique()
+    print(f"Crosswalk: {crosswalk.height} pairs covering {matched}/{ine.height} INE names in {elapsed:.1f}s -> {args.output}")
+    print(crosswalk["match_type"].value_counts(sort=True))
+
+    for name in args.show:
+        key = ine.filter(normalized_name_expr("ine_name") == normalized_name_expr(pl.lit(name)))["ine_name"].unique()
+        with pl.Config(tbl_rows=-1):
+            print(crosswalk.filter(pl.col("ine_name").is_in(key.to_list())))
+
+
+if __name__ == "__main__":
+    main()
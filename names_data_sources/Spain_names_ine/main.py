@@ -2,14 +2,24 @@ import os
 import subprocess
 import sys
 import argparse
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
 
-def run_script(script_path, args=None):
-    """Run a Python script with optional arguments."""
+PROFILE_RUNNER = Path(__file__).resolve().parent.parent / "profile_phase.py"
+
+
+def run_script(script_path, args=None, profile=None):
+    """Run a Python script with optional arguments.
+
+    ``profile`` is a list of ``profile_phase.py`` options; when given the
+    script runs under it and its resource usage is appended to the report.
+    """
     print(f"\nExecuting {script_path}...")
     cmd = [sys.executable, script_path]
+    if profile is not None:
+        cmd = [sys.executable, str(PROFILE_RUNNER), *profile, str(script_path)]
     if args:
         cmd.extend(args)
     try:
@@ -24,14 +34,24 @@ def run_script(script_path, args=None):
 OUTPUT_ROOT = Path(__file__).parent / "output_data"
 
 
+def default_report_path(output_dir: Path) -> Path:
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return output_dir / "profiles" / f"profile_{stamp}.json"
+
+
+def print_profile_summary(report: Path):
+    if report.exists():
+        subprocess.run([sys.executable, str(PROFILE_RUNNER), "--summary", str(report)], check=False)
+
+
 def build_ultrafast_args(args, base_file: Path, output_dir: Path):
     uf_args = [
         "--input-file", str(base_file),
         "--provider", args.origin_provider,
         "--model", args.origin_model,
         "--tier", args.origin_tier,
-        "--mode", "random" if args.origin_mode == "random" else "sequential",
-        "--output-file", str(output_dir / f"names_ultra_fast_{args.origin_provider}_{args.origin_tier}.csv"),
+        "--mode", args.origin_mode if args.origin_mode in ("random", "stratified") else "sequential",
+        "--output-file", str(output_dir / f"names_ultra_fast_{args.origin_provider}_{args.origin_tier}.parquet"),
     ]
 
     if args.origin_mode == "all":
@@ -45,6 +65,15 @@ def build_ultrafast_args(args, base_file: Path, output_dir: Path):
     if args.origin_max_concurrent:
         uf_args.extend(["--max-concurrent", str(args.origin_max_concurrent)])
 
+    if args.origin_split_compounds:
+        uf_args.append("--split-compounds")
+
+    if args.origin_local_model:
+        uf_args.extend([
+            "--local-origin-model", args.origin_local_model,
+            "--local-origin-precision", str(args.origin_local_precision),
+        ])
+
     if args.origin_output:
         uf_args.extend(["--output-file", args.origin_output])
 
@@ -53,8 +82,8 @@ def build_ultrafast_args(args, base_file: Path, output_dir: Path):
 
 def main():
     parser = argparse.ArgumentParser(description="Spanish INE names pipeline with ultra-fast enrichment")
-    parser.add_argument("--origin-mode", choices=["sequential", "random", "all"], default="sequential",
-                        help="Mode for origin classification")
+    parser.add_argument("--origin-mode", choices=["sequential", "random", "stratified", "all"], default="sequential",
+                        help="Mode for origin classification (stratified samples proportionally by frequency band)")
     parser.add_argument("--origin-count", type=int, default=100,
                         help="Number of names to classify (ignored if mode is 'all')")
     parser.add_argument("--origin-output", type=str, help="Custom output file for origin classification")
@@ -68,8 +97,20 @@ def main():
                         help="Override max concurrent requests for ultra-fast enrichment")
     parser.add_argument("--origin-seed", type=int,
                         help="Random seed when using random mode")
+    parser.add_argument("--origin-split-compounds", action="store_true",
+                        help="Classify compound name components once and derive compound origins locally")
+    parser.add_argument("--origin-local-model", type=str,
+                        help="Local origin classifier model; confident names skip the origin LLM call")
+    parser.add_argument("--origin-local-precision", type=float, default=0.9,
+                        help="Minimum calibrated holdout precision of the local classifier (default: 0.9)")
     parser.add_argument("--gemini-key", type=str,
                         help="Optional Gemini API key override")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record wall/CPU time, peak RSS, rows and bytes per phase in a JSON report")
+    parser.add_argument("--profile-report", type=Path,
+                        help="Report path for --profile (default: output_data/profiles/profile_<timestamp>.json)")
+    parser.add_argument("--cprofile-dir", type=Path,
+                        help="With --profile, also dump a cProfile .prof file per phase into this directory")
 
     args = parser.parse_args()
 
@@ -84,46 +125,59 @@ def main():
     enrich_script = current_dir / "4_enrich_names.py"
     filter_script = current_dir / "5_filter_young_popular_names.py"
 
+    profile = None
+    if args.profile:
+        report = args.profile_report or default_report_path(OUTPUT_ROOT)
+        profile = ["--report", str(report)]
+        if args.cprofile_dir:
+            profile.extend(["--cprofile-dir", str(args.cprofile_dir)])
+
     print("Starting Spanish INE names data processing pipeline...")
     print("=" * 60)
 
-    if not run_script(download_script):
+    if not run_script(download_script, profile=profile):
         sys.exit(1)
 
-    if not run_script(process_script):
+    if not run_script(process_script, profile=profile):
         sys.exit(1)
 
-    base_file = OUTPUT_ROOT / "1_data_download_INE_names" / "names_frecuencia_edad_media.csv"
+    base_file = OUTPUT_ROOT / "1_data_download_INE_names" / "names_frecuencia_edad_media.parquet"
     if not base_file.exists():
         print(f"Error: Base file not found: {base_file}")
         sys.exit(1)
 
+    # Typo-tolerant index used by phase 3 to resolve requested names
+    run_script(current_dir / "build_fuzzy_index.py", profile=profile)
+
     # Download details after processing phase (sample names to keep runtime small)
     details_output_dir = OUTPUT_ROOT / "3_data_download_INE_names_details"
     details_output_dir.mkdir(parents=True, exist_ok=True)
     details_args = [
-        "--base-csv", str(OUTPUT_ROOT / "2_data_process_INE_names" / "names_frecuencia_edad_media.csv"),
+        "--base-csv", str(OUTPUT_ROOT / "2_data_process_INE_names" / "names_frecuencia_edad_media.parquet"),
         "--output-dir", str(details_output_dir),
         "--names", "VICTORIANO", "--names", "CARLOS",
         "--limit", "10",
     ]
-    run_script(details_script, details_args)
+    run_script(details_script, details_args, profile=profile)
+
+    # Names × decades matrix over the downloaded decade details
+    run_script(current_dir / "build_decade_matrix.py", profile=profile)
 
     enrich_output_dir = OUTPUT_ROOT / "4_data_enrich_names"
     enrich_output_dir.mkdir(parents=True, exist_ok=True)
     ul_args = build_ultrafast_args(args, base_file, enrich_output_dir)
 
-    if run_script(enrich_script, ul_args):
+    if run_script(enrich_script, ul_args, profile=profile):
         print("\nUltra-fast origin classification completed successfully!")
     else:
         print("\nFailed to complete ultra-fast origin classification.")
 
     filter_output_dir = OUTPUT_ROOT / "5_data_filter_young_popular_names"
     filter_output_dir.mkdir(parents=True, exist_ok=True)
-    filter_input = OUTPUT_ROOT / "2_data_process_INE_names" / "names_frecuencia_edad_media.csv"
-    filter_output = filter_output_dir / "young_popular_names.csv"
+    filter_input = OUTPUT_ROOT / "2_data_process_INE_names" / "names_frecuencia_edad_media.parquet"
+    filter_output = filter_output_dir / "young_popular_names.parquet"
     filter_args = ["--input-file", str(filter_input), "--output-file", str(filter_output)]
-    run_script(filter_script, filter_args)
+    run_script(filter_script, filter_args, profile=profile)
 
     print("\n" + "=" * 60)
     print("Spanish INE names data processing pipeline completed!")
@@ -132,9 +186,12 @@ def main():
     if args.origin_output:
         print(f"- Origin data (phase 4): {current_dir / args.origin_output}")
     else:
-        default_name = f"names_ultra_fast_{args.origin_provider}_{args.origin_tier}.csv"
+        default_name = f"names_ultra_fast_{args.origin_provider}_{args.origin_tier}.parquet"
         print(f"- Origin data (phase 4): {OUTPUT_ROOT / '4_data_enrich_names' / default_name}")
 
+    if profile is not None:
+        print_profile_summary(report)
+
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
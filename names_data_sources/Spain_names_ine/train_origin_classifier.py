@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Train the local origin classifier on existing phase-4 outputs.
+
+Examples
+--------
+    uv run python train_origin_classifier.py
+    uv run python train_origin_classifier.py --holdout 0.3 --target-precision 0.95
+    uv run python 4_enrich_names.py --all --local-origin-model output_data/4_data_enrich_names/origin_classifier.npz
+
+The model is fitted on the training split and calibrated on the holdout (see
+``utils.origin_classifier``); the saved model is the calibrated one, so its
+stored threshold and holdout precision describe exactly what phase 4 uses.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.origin_classifier import DEFAULT_TARGET_PRECISION, OriginClassifier
+
+ENRICH_DIR = Path(__file__).resolve().parent / "output_data" / "4_data_enrich_names"
+DEFAULT_MODEL_PATH = ENRICH_DIR / "origin_classifier.npz"
+
+
+def load_training_data(input_files: Sequence[Path]) -> pd.DataFrame:
+    frames = []
+    for path in input_files:
+        df = pd.read_csv(path, usecols=lambda column: column in {"Nombre", "Family_Origin"})
+        if {"Nombre", "Family_Origin"} <= set(df.columns):
+            frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["Nombre", "Family_Origin"])
+
+    df = pd.concat(frames, ignore_index=True).dropna()
+    df["Nombre"] = df["Nombre"].astype(str).str.strip().str.upper()
+    return df.drop_duplicates(subset="Nombre", keep="last")
+
+
+def evaluate(model: OriginClassifier, names: list[str], origins: list[str]) -> None:
+    predicted, _ = model.predict(names)
+    correct = np.asarray([p == o for p, o in zip(predicted, origins)])
+    print(f"Holdout accuracy (all): {correct.mean():.3f} on {len(names)} names")
+    print(f"Calibrated temperature: {model.temperature:.3g}")
+    if model.threshold is None:
+        print(
+            f"No confidence threshold reaches {model.target_precision:.0%} precision on the holdout; "
+            "phase 4 will refuse this model"
+        )
+    else:
+        print(
+            f"Threshold {model.threshold:.3f}: holdout precision {model.holdout_precision:.3f} "
+            f"covering {model.holdout_coverage:.1%} of names"
+        )
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Train the local character n-gram origin classifier")
+    parser.add_argument("--input-files", type=Path, nargs="*", help="Enriched CSVs (default: all phase-4 outputs)")
+    parser.add_argument("--model-path", type=Path, default=DEFAULT_MODEL_PATH, help="Where to save the model")
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.2,
+        help="Fraction of names kept aside for calibration (0 saves an uncalibrated model phase 4 refuses)",
+    )
+    parser.add_argument(
+        "--target-precision",
+        type=float,
+        default=DEFAULT_TARGET_PRECISION,
+        help="Holdout precision the confidence threshold must reach",
+    )
+    parser.add_argument("--alpha", type=float, default=0.1, help="Additive smoothing")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the holdout split")
+    args = parser.parse_args(argv)
+
+    input_files = args.input_files or sorted(ENRICH_DIR.glob("*.csv"))
+    df = load_training_data(input_files)
+    if df.empty:
+        print(f"No enriched names found in {[str(path) for path in input_files]}", file=sys.stderr)
+        return 1
+
+    print(f"Loaded {len(df)} labelled names from {len(input_files)} file(s)")
+    print(df["Family_Origin"].value_counts().head(10).to_string())
+
+    if args.holdout > 0:
+        holdout = df.sample(frac=args.holdout, random_state=args.seed)
+        train = df.drop(holdout.index)
+        model = OriginClassifier.fit(train["Nombre"].tolist(), train["Family_Origin"].tolist(), alpha=args.alpha)
+        model.calibrate(
+            holdout["Nombre"].tolist(), holdout["Family_Origin"].tolist(), target_precision=args.target_precision
+        )
+        evaluate(model, holdout["Nombre"].tolist(), holdout["Family_Origin"].tolist())
+    else:
+        model = OriginClassifier.fit(df["Nombre"].tolist(), df["Family_Origin"].tolist(), alpha=args.alpha)
+        print("Warning: no holdout, so the model is uncalibrated and phase 4 will refuse it", file=sys.stderr)
+
+    model.save(args.model_path)
+    print(f"Model with {len(model.classes)} classes and {len(model.vocabulary)} n-grams saved to {args.model_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,14 @@ from .ine_fetchers import (  # noqa: F401
     fetch_decade_records,
     fetch_region_records,
 )
+from .fuzzy_names import FuzzyMatch, FuzzyNameIndex  # noqa: F401
+from .enrichment_telemetry import EnrichmentTelemetry  # noqa: F401
+from .origin_classifier import OriginClassifier  # noqa: F401
 from .output_writers import write_dataclass_csv  # noqa: F401
+from .row_sampling import InputRow, select_rows  # noqa: F401
+from .tables import read_table, write_table  # noqa: F401
+from .decade_matrix import DecadeMatrix  # noqa: F401
+from .region_facts import load_region_details, split_region_details, write_region_facts  # noqa: F401
 from .svg_maps import get_municipality_map, get_province_map  # noqa: F401
 from .population_lookup import (  # noqa: F401
     get_population_by_name,
@@ -23,7 +30,19 @@ __all__ = [
     "build_nombre_id",
     "fetch_decade_records",
     "fetch_region_records",
+    "FuzzyMatch",
+    "FuzzyNameIndex",
+    "EnrichmentTelemetry",
+    "OriginClassifier",
     "write_dataclass_csv",
+    "InputRow",
+    "select_rows",
+    "read_table",
+    "write_table",
+    "DecadeMatrix",
+    "load_region_details",
+    "split_region_details",
+    "write_region_facts",
     "get_municipality_map",
     "get_province_map",
     "get_population_by_name",
@@ -0,0 +1,130 @@
+"""Dense names × decades matrix of the phase 3 birth counts.
+
+``details_decades`` stores one ``(nombre, gender, decade, persons)`` row per
+name and decade. ``DecadeMatrix`` pivots it once into two arrays with one
+row per ``(nombre, gender)`` and one column per decade, oldest first:
+
+- ``counts`` (int32): people born in each decade, 0 where INE gave nothing;
+- ``shares`` (float32): each row divided by its total, so a row sums to 1
+  (rows without births stay 0).
+
+Corpus-wide questions then become array operations, e.g. the names born
+mostly in the 2000s are ``matrix.share_of(["2000-2010"]) > 0.5``.
+
+``save`` writes ``counts.npy``, ``shares.npy`` and an ``index.json`` with the
+row names and column decades. ``load`` memory-maps the arrays by default, so
+opening the matrix costs the same for 50 names or 50 000.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+INDEX_FILENAME = "index.json"
+COUNTS_FILENAME = "counts.npy"
+SHARES_FILENAME = "shares.npy"
+
+
+def _decade_order(decade: str) -> Tuple[int, int]:
+    # "1930-1940" sorts by its first year; the open-ended "< 1930" goes first.
+    match = re.search(r"\d{4}", decade)
+    year = int(match.group()) if match else 0
+    return (0 if decade.strip().startswith("<") else 1, year)
+
+
+class DecadeMatrix:
+    """Birth counts and shares per ``(nombre, gender)`` row and decade column."""
+
+    def __init__(
+        self,
+        names: List[str],
+        genders: List[str],
+        decades: List[str],
+        counts: np.ndarray,
+        shares: np.ndarray,
+    ) -> None:
+        self.names = names
+        self.genders = genders
+        self.decades = decades
+        self.counts = counts
+        self.shares = shares
+        self._rows: Optional[Dict[Tuple[str, str], int]] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_frame(cls, frame: pl.DataFrame) -> "DecadeMatrix":
+        """Pivot a long ``nombre``/``gender``/``decade``/``persons`` table."""
+        frame = frame.select("nombre", "gender", "decade", pl.col("persons").fill_null(0))
+        decades = sorted(frame["decade"].drop_nulls().unique().to_list(), key=_decade_order)
+        rows = frame.select("nombre", "gender").unique(maintain_order=True).with_row_index("row")
+        columns = {decade: index for index, decade in enumerate(decades)}
+        cells = (
+            frame.filter(pl.col("decade").is_not_null())
+            .join(rows, on=["nombre", "gender"], how="inner")
+            .select("row", pl.col("decade").replace_strict(columns, return_dtype=pl.UInt32), "persons")
+        )
+
+        counts = np.zeros((rows.height, len(decades)), dtype=np.int32)
+        np.add.at(counts, (cells["row"].to_numpy(), cells["decade"].to_numpy()), cells["persons"].to_numpy())
+        totals = counts.sum(axis=1, keepdims=True, dtype=np.int64)
+        shares = np.divide(counts, totals, out=np.zeros(counts.shape, dtype=np.float64), where=totals > 0)
+        return cls(
+            names=rows["nombre"].to_list(),
+            genders=rows["gender"].to_list(),
+            decades=decades,
+            counts=counts,
+            shares=shares.astype(np.float32),
+        )
+
+    def save(self, directory: Path | str) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / COUNTS_FILENAME, np.ascontiguousarray(self.counts, dtype=np.int32))
+        np.save(directory / SHARES_FILENAME, np.ascontiguousarray(self.shares, dtype=np.float32))
+        index = {"decades": self.decades, "names": self.names, "genders": self.genders}
+        (directory / INDEX_FILENAME).write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+        return directory
+
+    @classmethod
+    def load(cls, directory: Path | str, *, mmap: bool = True) -> "DecadeMatrix":
+        directory = Path(directory)
+        index = json.loads((directory / INDEX_FILENAME).read_text(encoding="utf-8"))
+        mmap_mode = "r" if mmap else None
+        return cls(
+            names=index["names"],
+            genders=index["genders"],
+            decades=index["decades"],
+            counts=np.load(directory / COUNTS_FILENAME, mmap_mode=mmap_mode),
+            shares=np.load(directory / SHARES_FILENAME, mmap_mode=mmap_mode),
+        )
+
+    def row(self, nombre: str, gender: str) -> Optional[int]:
+        """Row index of ``(nombre, gender)``, or ``None`` when the name has no decade data."""
+        if self._rows is None:
+            self._rows = {key: index for index, key in enumerate(zip(self.names, self.genders))}
+        return self._rows.get((nombre.upper(), gender))
+
+    def share_of(self, decades: Sequence[str]) -> np.ndarray:
+        """Per-row share of births that fall in ``decades`` (one value per name)."""
+        unknown = set(decades) - set(self.decades)
+        if unknown:
+            raise KeyError(f"Unknown decades: {sorted(unknown)}")
+        columns = [self.decades.index(decade) for decade in decades]
+        return self.shares[:, columns].sum(axis=1)
+
+    def peak_decades(self) -> np.ndarray:
+        """Decade with the most births for every row."""
+        return np.asarray(self.decades, dtype=object)[self.counts.argmax(axis=1)]
+
+    def to_frame(self, **columns: np.ndarray) -> pl.DataFrame:
+        """``nombre``/``gender`` table with one extra column per per-row array in ``columns``."""
+        extra = {name: np.asarray(values) for name, values in columns.items()}
+        return pl.DataFrame({"nombre": self.names, "gender": self.genders, **extra})
@@ -0,0 +1,274 @@
+"""Per-call telemetry for the phase-4 LLM enrichment.
+
+Records queue wait, per-attempt request latency, retries, token usage, parse
+failures and estimated cost per ``(provider, prompt_type)``. Latencies go to fixed-bucket
+histograms that can be exported as a JSON report or in the Prometheus text
+exposition format (optionally served over HTTP while a run is in progress).
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds in seconds; the last implicit bucket is +Inf.
+LATENCY_BUCKETS_S: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0, 60.0,
+)
+
+# USD per million (input, output) tokens. Unknown models report no cost.
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+@dataclass(slots=True)
+class Histogram:
+    bounds: Tuple[float, ...] = LATENCY_BUCKETS_S
+    counts: List[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.count += other.count
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Estimate a percentile by linear interpolation within its bucket."""
+        if not self.count:
+            return None
+        target = pct / 100.0 * self.count
+        cumulative = 0
+        for idx, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= target:
+                lower = self.bounds[idx - 1] if idx > 0 else 0.0
+                upper = self.bounds[idx] if idx < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_s": round(self.total, 6),
+            "mean_s": round(self.total / self.count, 6) if self.count else None,
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+            "p99_s": self.percentile(99),
+            "buckets": {
+                **{f"{bound:g}": count for bound, count in zip(self.bounds, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+@dataclass(slots=True)
+class CallStats:
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
+    parse_failures: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    queue_wait: Histogram = field(default_factory=Histogram)
+    latency: Histogram = field(default_factory=Histogram)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "parse_failures": self.parse_failures,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "queue_wait": self.queue_wait.to_dict(),
+            "latency": self.latency.to_dict(),
+        }
+
+
+class EnrichmentTelemetry:
+    """Thread-safe collector shared by all ``call_api`` invocations."""
+
+    def __init__(self, provider: str, model_name: str, pricing: Optional[Tuple[float, float]] = None) -> None:
+        self.provider = provider
+        self.model_name = model_name
+        self.pricing = pricing or MODEL_PRICING.get(model_name)
+        self._stats: Dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _for(self, prompt_type: str) -> CallStats:
+        return self._stats.setdefault(prompt_type, CallStats())
+
+    def record_call(
+        self,
+        prompt_type: str,
+        *,
+        queue_wait_s: float,
+        retries: int,
+        ok: bool,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+    ) -> None:
+        with self._lock:
+            stats = self._for(prompt_type)
+            stats.calls += 1
+            stats.successes += int(ok)
+            stats.failures += int(not ok)
+            stats.retries += retries
+            stats.input_tokens += input_tokens
+            stats.output_tokens += output_tokens
+            if self.pricing:
+                input_price, output_price = self.pricing
+                stats.cost_usd += (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+            stats.queue_wait.observe(queue_wait_s)
+
+    def record_attempt(self, prompt_type: str, latency_s: float) -> None:
+        """Record the latency of one provider request (a call makes one per attempt)."""
+        with self._lock:
+            self._for(prompt_type).latency.observe(latency_s)
+
+    def record_parse_failure(self, prompt_type: str) -> None:
+        with self._lock:
+            self._for(prompt_type).parse_failures += 1
+
+    @property
+    def successful_calls(self) -> int:
+        with self._lock:
+            return sum(stats.successes for stats in self._stats.values())
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            overall = CallStats()
+            for stats in self._stats.values():
+                for name in ("calls", "successes", "failures", "retries", "parse_failures",
+                             "input_tokens", "output_tokens", "cost_usd"):
+                    setattr(overall, name, getattr(overall, name) + getattr(stats, name))
+                overall.queue_wait.merge(stats.queue_wait)
+                overall.latency.merge(stats.latency)
+            return {
+                "provider": self.provider,
+                "model": self.model_name,
+                "pricing_usd_per_million_tokens": (
+                    {"input": self.pricing[0], "output": self.pricing[1]} if self.pricing else None
+                ),
+                "overall": overall.to_dict(),
+                "by_prompt_type": {name: stats.to_dict() for name, stats in sorted(self._stats.items())},
+            }
+
+    def write_json(self, path: Path | str) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
+        return path
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        prefix = "ine_enrichment"
+        lines: List[str] = []
+        counters = (
+            ("calls", "LLM calls issued"),
+            ("failures", "LLM calls that failed after retries"),
+            ("retries", "LLM call retries"),
+            ("parse_failures", "LLM responses that could not be parsed"),
+            ("input_tokens", "Prompt tokens consumed"),
+            ("output_tokens", "Completion tokens produced"),
+            ("cost_usd", "Estimated cost in USD"),
+        )
+        with self._lock:
+            items = sorted(self._stats.items())
+            for name, help_text in counters:
+                lines.append(f"# HELP {prefix}_{name}_total {help_text}")
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                for prompt_type, stats in items:
+                    labels = f'provider="{self.provider}",model="{self.model_name}",prompt_type="{prompt_type}"'
+                    lines.append(f"{prefix}_{name}_total{{{labels}}} {getattr(stats, name):g}")
+
+            for metric, help_text in (
+                ("queue_wait", "Time spent waiting for a concurrency slot"),
+                ("latency", "Provider request latency per attempt, excluding retry backoff"),
+            ):
+                full_name = f"{prefix}_{metric}_seconds"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for prompt_type, stats in items:
+                    histogram: Histogram = getattr(stats, metric)
+                    labels = f'provider="{self.provider}",model="{self.model_name}",prompt_type="{prompt_type}"'
+                    cumulative = 0
+                    for bound, count in zip(histogram.bounds, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{full_name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                    lines.append(f'{full_name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f"{full_name}_sum{{{labels}}} {histogram.total:.6f}")
+                    lines.append(f"{full_name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int, host: str = "127.0.0.1") -> None:
+        """Expose ``/metrics`` on a background thread until ``stop_server``."""
+        telemetry = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args) -> None:  # noqa: A002 - stdlib signature
+                pass
+
+            def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop_server(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def print_summary(self) -> None:
+        report = self.to_dict()
+        print(f"{'prompt':<15} {'calls':>7} {'fail':>6} {'retry':>6} {'parse':>6} {'p50 s':>7} {'p95 s':>7} {'tokens in/out':>17} {'cost $':>9}")
+        rows = list(report["by_prompt_type"].items()) + [("total", report["overall"])]
+        for name, stats in rows:
+            latency = stats["latency"]
+            p50 = f"{latency['p50_s']:.2f}" if latency["p50_s"] is not None else "-"
+            p95 = f"{latency['p95_s']:.2f}" if latency["p95_s"] is not None else "-"
+            tokens = f"{stats['input_tokens']}/{stats['output_tokens']}"
+            print(
+                f"{name:<15} {stats['calls']:>7} {stats['failures']:>6} {stats['retries']:>6} "
+                f"{stats['parse_failures']:>6} {p50:>7} {p95:>7} {tokens:>17} {stats['cost_usd']:>9.4f}"
+            )
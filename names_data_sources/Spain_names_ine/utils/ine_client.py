@@ -3,14 +3,27 @@
 from __future__ import annotations
 
 import random
+import time
 from dataclasses import dataclass
 from typing import Iterable
+from urllib.parse import urlparse
 
 import requests
 
-WIDGET_URL = "https://www.ine.es/widgets/nombApell/nombApell.shtml?L=&w=1920px&h=943px&borc=000000"
-GRAFICO_ENDPOINT = "https://www.ine.es/tnombres/graficoWidget"
-MAPA_ENDPOINT = "https://www.ine.es/tnombres/mapaWidget"
+DEFAULT_BASE_URL = "https://www.ine.es"
+WIDGET_PATH = "/widgets/nombApell/nombApell.shtml?L=&w=1920px&h=943px&borc=000000"
+GRAFICO_PATH = "/tnombres/graficoWidget"
+MAPA_PATH = "/tnombres/mapaWidget"
+
+WIDGET_URL = DEFAULT_BASE_URL + WIDGET_PATH
+GRAFICO_ENDPOINT = DEFAULT_BASE_URL + GRAFICO_PATH
+MAPA_ENDPOINT = DEFAULT_BASE_URL + MAPA_PATH
+
+# Throttling and transient server errors are retried after a pause; an
+# expired session (401/403) is retried after a fresh widget handshake.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+SESSION_STATUSES = frozenset({401, 403})
+MAX_RETRY_DELAY_S = 60.0
 
 
 DEFAULT_HEADERS = {
@@ -36,34 +49,63 @@ def _random_session_id() -> str:
 
 @dataclass(slots=True)
 class INEClient:
-    """Small helper to interact with INE endpoints using a sticky session."""
+    """Small helper to interact with INE endpoints using a sticky session.
+
+    ``base_url`` defaults to the live site; point it at
+    ``benchmarks/mock_ine_server.py`` to run phase 3 offline.
+    """
 
     session: requests.Session
+    base_url: str = DEFAULT_BASE_URL
+    max_retries: int = 3
+    backoff_s: float = 1.0
 
     @classmethod
-    def create(cls) -> "INEClient":
+    def create(cls, base_url: str = DEFAULT_BASE_URL, *, max_retries: int = 3, backoff_s: float = 1.0) -> "INEClient":
+        base_url = base_url.rstrip("/")
         session = requests.Session()
         session.headers.update(DEFAULT_HEADERS)
+        session.headers.update({"Origin": base_url, "Referer": base_url + WIDGET_PATH})
 
-        session.get(WIDGET_URL, timeout=30)
+        client = cls(session=session, base_url=base_url, max_retries=max_retries, backoff_s=backoff_s)
+        client.start_session()
+        return client
 
-        fake_session = _random_session_id()
-        session.cookies.set("rxVisitor", fake_session, domain="www.ine.es")
-        session.cookies.set("rxvt", fake_session, domain="www.ine.es")
+    def start_session(self) -> None:
+        """Load the widget page for fresh session cookies, as the browser does."""
+        self.session.cookies.clear()
+        self.session.get(self.base_url + WIDGET_PATH, timeout=30)
 
-        return cls(session=session)
+        fake_session = _random_session_id()
+        domain = urlparse(self.base_url).hostname or "www.ine.es"
+        self.session.cookies.set("rxVisitor", fake_session, domain=domain)
+        self.session.cookies.set("rxvt", fake_session, domain=domain)
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float:
+        try:
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            delay = self.backoff_s * 2**attempt
+        return min(delay, MAX_RETRY_DELAY_S)
+
+    def _post(self, path: str, params: dict) -> dict:
+        attempt = 0
+        while True:
+            response = self.session.post(self.base_url + path, params=params, timeout=30)
+            if attempt < self.max_retries and response.status_code in SESSION_STATUSES:
+                self.start_session()
+            elif attempt < self.max_retries and response.status_code in RETRY_STATUSES:
+                time.sleep(self._retry_delay(response, attempt))
+            else:
+                response.raise_for_status()
+                return response.json()
+            attempt += 1
 
     def grafico_widget(self, *, nombre: str, sexo: int | str) -> dict:
-        params = {"nombre": nombre, "sexo": str(sexo)}
-        response = self.session.post(GRAFICO_ENDPOINT, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
+        return self._post(GRAFICO_PATH, {"nombre": nombre, "sexo": str(sexo)})
 
     def mapa_widget(self, *, nombre: str, sexo: int | str, vista: str) -> dict:
-        params = {"nombre": nombre, "sexo": str(sexo), "vista": vista}
-        response = self.session.post(MAPA_ENDPOINT, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
+        return self._post(MAPA_PATH, {"nombre": nombre, "sexo": str(sexo), "vista": vista})
 
     def close(self) -> None:
         self.session.close()
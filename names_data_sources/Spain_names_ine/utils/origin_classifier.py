@@ -0,0 +1,275 @@
+"""Local character n-gram classifier for ``Family_Origin``.
+
+A multinomial naive Bayes model (linear in log space) over character n-grams,
+trained on phase-4 enrichment outputs. Scoring is vectorized with NumPy so the
+whole base table is classified in a single pass; phase 4 only sends names
+below a confidence threshold to the LLM.
+
+Naive Bayes probabilities are not calibrated: with thousands of overlapping
+n-grams almost every name gets a confidence near 1, whether or not its label
+can be predicted from its spelling. ``calibrate`` fixes both parts on a
+holdout the model was not trained on. It fits a softmax temperature, then
+picks the lowest confidence threshold at which the holdout predictions reach
+the target precision. Both are saved with the model, and a model that never
+reaches the target has no threshold and accepts no names.
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_NGRAM_RANGE: Tuple[int, int] = (1, 4)
+DEFAULT_TARGET_PRECISION = 0.9
+# Fewest holdout names a threshold may be chosen from.
+MIN_CALIBRATION_NAMES = 30
+TEMPERATURE_GRID = np.geomspace(0.01, 1000.0, 241)
+
+
+def _prepare(name: str) -> str:
+    """Upper-case, accent-folded name padded with boundary markers."""
+    folded = unicodedata.normalize("NFKD", str(name).strip().upper())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return f"^{' '.join(folded.split())}$"
+
+
+def _ngrams(name: str, ngram_range: Tuple[int, int]) -> Iterable[str]:
+    text = _prepare(name)
+    low, high = ngram_range
+    for size in range(low, high + 1):
+        for start in range(len(text) - size + 1):
+            yield text[start : start + size]
+
+
+def _feature_indices(
+    names: Sequence[str], vocabulary: Dict[str, int], ngram_range: Tuple[int, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return flat ``(row_ids, feature_ids)`` arrays for known n-grams."""
+    row_ids: List[int] = []
+    feature_ids: List[int] = []
+    for row, name in enumerate(names):
+        for gram in _ngrams(name, ngram_range):
+            feature = vocabulary.get(gram)
+            if feature is not None:
+                row_ids.append(row)
+                feature_ids.append(feature)
+    return np.asarray(row_ids, dtype=np.int64), np.asarray(feature_ids, dtype=np.int64)
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    probabilities = np.exp(scores)
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    return probabilities
+
+
+@dataclass(slots=True)
+class OriginClassifier:
+    classes: List[str]
+    vocabulary: Dict[str, int]
+    log_prior: np.ndarray
+    log_likelihood: np.ndarray
+    ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE
+    temperature: float = 1.0
+    # Set by ``calibrate``; ``threshold`` stays ``None`` when no threshold
+    # reaches ``target_precision`` on the holdout.
+    threshold: Optional[float] = None
+    target_precision: Optional[float] = None
+    holdout_precision: Optional[float] = None
+    holdout_coverage: Optional[float] = None
+
+    @property
+    def calibrated(self) -> bool:
+        return self.target_precision is not None
+
+    @classmethod
+    def fit(
+        cls,
+        names: Sequence[str],
+        origins: Sequence[str],
+        *,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+        alpha: float = 0.1,
+    ) -> "OriginClassifier":
+        if len(names) != len(origins):
+            raise ValueError("names and origins must have the same length")
+        if not names:
+            raise ValueError("Cannot train the origin classifier without examples")
+
+        classes = sorted(set(origins))
+        class_index = {origin: idx for idx, origin in enumerate(classes)}
+        labels = np.asarray([class_index[origin] for origin in origins], dtype=np.int64)
+
+        vocabulary: Dict[str, int] = {}
+        for name in names:
+            for gram in _ngrams(name, ngram_range):
+                vocabulary.setdefault(gram, len(vocabulary))
+
+        row_ids, feature_ids = _feature_indices(names, vocabulary, ngram_range)
+        n_classes, n_features = len(classes), len(vocabulary)
+        counts = np.bincount(
+            labels[row_ids] * n_features + feature_ids, minlength=n_classes * n_features
+        ).reshape(n_classes, n_features).astype(np.float64)
+
+        smoothed = counts + alpha
+        log_likelihood = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        class_counts = np.bincount(labels, minlength=n_classes).astype(np.float64)
+        log_prior = np.log(class_counts) - np.log(class_counts.sum())
+
+        return cls(
+            classes=classes,
+            vocabulary=vocabulary,
+            log_prior=log_prior.astype(np.float32),
+            log_likelihood=log_likelihood.astype(np.float32),
+            ngram_range=ngram_range,
+        )
+
+    def _log_scores(self, names: Sequence[str]) -> np.ndarray:
+        """Unnormalized naive Bayes log posteriors, ``(n_names, n_classes)``."""
+        row_ids, feature_ids = _feature_indices(names, self.vocabulary, self.ngram_range)
+        scores = np.empty((len(names), len(self.classes)), dtype=np.float64)
+        for class_idx in range(len(self.classes)):
+            scores[:, class_idx] = np.bincount(
+                row_ids,
+                weights=self.log_likelihood[class_idx, feature_ids],
+                minlength=len(names),
+            )
+        scores += self.log_prior
+        return scores
+
+    def predict_proba(self, names: Sequence[str]) -> np.ndarray:
+        """Return an ``(n_names, n_classes)`` matrix of temperature-scaled class probabilities."""
+        return _softmax(self._log_scores(names) / self.temperature)
+
+    def predict(self, names: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """Return the most likely origin and its probability for each name."""
+        if not names:
+            return [], np.empty(0, dtype=np.float64)
+        probabilities = self.predict_proba(names)
+        best = probabilities.argmax(axis=1)
+        return [self.classes[idx] for idx in best], probabilities[np.arange(len(names)), best]
+
+    def calibrate(
+        self,
+        names: Sequence[str],
+        origins: Sequence[str],
+        *,
+        target_precision: float = DEFAULT_TARGET_PRECISION,
+    ) -> "OriginClassifier":
+        """Fit ``temperature`` and ``threshold`` on labelled holdout names the model was not trained on."""
+        if len(names) != len(origins):
+            raise ValueError("names and origins must have the same length")
+        if not names:
+            raise ValueError("Cannot calibrate the origin classifier without holdout names")
+
+        scores = self._log_scores(names)
+        class_index = {origin: idx for idx, origin in enumerate(self.classes)}
+        labels = np.asarray([class_index.get(origin, -1) for origin in origins], dtype=np.int64)
+        known = labels >= 0
+        if known.any():
+            # Temperature minimizing the holdout negative log-likelihood.
+            losses = [
+                -np.log(_softmax(scores[known] / temperature)[np.arange(known.sum()), labels[known]] + 1e-12).mean()
+                for temperature in TEMPERATURE_GRID
+            ]
+            self.temperature = float(TEMPERATURE_GRID[int(np.argmin(losses))])
+
+        probabilities = _softmax(scores / self.temperature)
+        best = probabilities.argmax(axis=1)
+        confidence = probabilities[np.arange(len(names)), best]
+        correct = best == labels
+
+        # Precision of the names at or above each distinct confidence value.
+        order = np.argsort(-confidence, kind="stable")
+        confidence, correct = confidence[order], correct[order]
+        precision = np.cumsum(correct) / np.arange(1, len(names) + 1)
+        group_ends = np.flatnonzero(np.append(confidence[1:] < confidence[:-1], True))
+        eligible = group_ends[(group_ends + 1 >= MIN_CALIBRATION_NAMES) & (precision[group_ends] >= target_precision)]
+
+        self.target_precision = target_precision
+        if eligible.size:
+            end = int(eligible[-1])
+            self.threshold = float(confidence[end])
+            self.holdout_precision = float(precision[end])
+            self.holdout_coverage = (end + 1) / len(names)
+        else:
+            self.threshold = None
+            self.holdout_precision = None
+            self.holdout_coverage = 0.0
+        return self
+
+    def confident_origins(self, names: Sequence[str]) -> Dict[str, str]:
+        """Map each name whose calibrated confidence reaches ``threshold`` to its origin."""
+        if self.threshold is None:
+            return {}
+        origins, confidence = self.predict(names)
+        return {
+            name: origin
+            for name, origin, score in zip(names, origins, confidence)
+            if score >= self.threshold
+        }
+
+    def check_precision(self, target_precision: float) -> None:
+        """Raise ``ValueError`` unless the holdout showed ``target_precision`` at the stored threshold."""
+        if not self.calibrated:
+            raise ValueError("Origin classifier is not calibrated; retrain it with train_origin_classifier.py --holdout")
+        if self.threshold is None or self.holdout_precision is None:
+            raise ValueError(
+                f"Origin classifier never reached {self.target_precision:.0%} precision on its holdout; "
+                "its origins cannot be trusted without the LLM"
+            )
+        if self.holdout_precision < target_precision:
+            raise ValueError(
+                f"Origin classifier holdout precision {self.holdout_precision:.1%} is below the "
+                f"target {target_precision:.0%}"
+            )
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.__getitem__)
+        with path.open("wb") as handle:
+            np.savez_compressed(
+                handle,
+                classes=np.asarray(self.classes),
+                vocabulary=np.asarray(vocabulary),
+                log_prior=self.log_prior,
+                log_likelihood=self.log_likelihood,
+                ngram_range=np.asarray(self.ngram_range),
+                calibration=np.asarray(
+                    [
+                        self.temperature,
+                        np.nan if self.threshold is None else self.threshold,
+                        np.nan if self.target_precision is None else self.target_precision,
+                        np.nan if self.holdout_precision is None else self.holdout_precision,
+                        np.nan if self.holdout_coverage is None else self.holdout_coverage,
+                    ],
+                    dtype=np.float64,
+                ),
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "OriginClassifier":
+        with np.load(Path(path)) as data:
+            vocabulary = data["vocabulary"].tolist()
+            # Models saved before calibration existed load as uncalibrated.
+            calibration = data["calibration"].tolist() if "calibration" in data.files else [1.0] + [np.nan] * 4
+            temperature, threshold, target, precision, coverage = (
+                None if np.isnan(value) else float(value) for value in calibration
+            )
+            return cls(
+                classes=data["classes"].tolist(),
+                vocabulary={gram: idx for idx, gram in enumerate(vocabulary)},
+                log_prior=data["log_prior"],
+                log_likelihood=data["log_likelihood"],
+                ngram_range=tuple(int(value) for value in data["ngram_range"]),
+                temperature=temperature or 1.0,
+                threshold=threshold,
+                target_precision=target,
+                holdout_precision=precision,
+                holdout_coverage=coverage,
+            )
@@ -0,0 +1,171 @@
+"""Spanish phonetic keys for grouping sound-alike spellings of a name.
+
+``phonetic_key_expr`` folds a name column with the same accent stripping as
+``population_lookup._normalize`` and then rewrites it with ordered regex
+rules, so spellings that a Spanish speaker pronounces alike share one key:
+
+- b/v merge (``V`` -> ``B``), ``W`` -> ``U``, ``PH`` -> ``F``, ``SH`` -> ``S``
+- silent ``H`` is dropped; ``CH`` is kept as its own sound (``CHR``/``CHL`` -> ``K``)
+- seseo: ``Z`` and ``C`` before ``E``/``I`` become ``S``; hard ``C``/``Q(U)`` become ``K``
+- ``J``, ``G`` before ``E``/``I``, ``LL``, consonant ``Y`` and a leading ``X``
+  (XIMENA, XAVIER) share one sound; vowel ``Y`` becomes ``I``
+- English spellings: ``BRAYAN``/``BRYAN`` -> ``BRIAN``, a final ``UA``/``UE`` after ``U``
+  collapses (JOSHUA/JOSUE) and ``S`` + consonant gets its prosthetic ``E``
+  (STEFANIA/ESTEFANIA)
+- doubled letters collapse (JENNIFER/YENIFER)
+
+Every rule is a polars string expression, so a whole column is encoded
+without a Python loop; ``phonetic_key`` runs the same rules through ``re``
+for single lookups. ``PhoneticIndex`` is the inverted index: the table
+sorted by key plus a key -> row-range map. Phase 2 builds it from the
+phase 1 table (both sexes, compound names) and stores it as an uncompressed
+Arrow file next to its own output.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import polars as pl
+
+from .population_lookup import _normalize
+
+PHONETIC_COLUMN = "Phonetic_Key"
+INDEX_COLUMNS = ["Nombre", "Gender", "Frecuencia"]
+
+_VOWELS = "AEIOU"
+_DOUBLE_LETTERS = [letter * 2 for letter in "ABDEFIKLMNOPRSTUY"]
+
+# (pattern, replacement) pairs applied in order; lower-case letters are
+# placeholders that no later rule matches.
+PHONETIC_RULES: List[Tuple[str, str]] = [
+    ("PH", "F"),
+    ("SH", "S"),
+    ("CH([RL])", "K${1}"),
+    ("CH", "x"),
+    (r"\bX", "J"),
+    ("X", "KS"),
+    ("QU([EI])", "K${1}"),
+    ("Q", "K"),
+    ("GU([EI])", "g${1}"),
+    ("G([EI])", "J${1}"),
+    ("g", "G"),
+    ("C([EI])", "S${1}"),
+    ("Z", "S"),
+    ("C", "K"),
+    ("LL", "Y"),
+    (rf"\b([BDFGKPT][RL])AY([{_VOWELS}])", "${1}I${2}"),
+    (rf"([BDFGKPTR])Y([{_VOWELS}])", "${1}I${2}"),
+    (r"Y\b", "I"),
+    (rf"Y([^{_VOWELS}])", "I${1}"),
+    ("J", "Y"),
+    ("H", ""),
+    ("V", "B"),
+    ("W", "U"),
+    (rf"U[{_VOWELS}]\b", "U"),
+    (rf"\bS([^{_VOWELS} ])", "ES${1}"),
+]
+
+
+def normalized_name_expr(column: str | pl.Expr = "Nombre") -> pl.Expr:
+    """Vectorized ``population_lookup._normalize``: no accents, upper case, single spaces."""
+    expr = pl.col(column) if isinstance(column, str) else column
+    return (
+        expr.str.normalize("NFKD")
+        .str.replace_all(r"\p{Mn}", "")
+        .str.to_uppercase()
+        .str.replace_all(r"[^A-Z0-9]+", " ")
+        .str.strip_chars()
+    )
+
+
+def phonetic_key_expr(column: str | pl.Expr = "Nombre") -> pl.Expr:
+    expr = normalized_name_expr(column)
+    for pattern, replacement in PHONETIC_RULES:
+        expr = expr.str.replace_all(pattern, replacement)
+    expr = expr.str.replace_many(_DOUBLE_LETTERS, [pair[0] for pair in _DOUBLE_LETTERS])
+    return expr.str.to_uppercase()
+
+
+def phonetic_keys(names: Iterable[Optional[str]]) -> List[Optional[str]]:
+    series = pl.Series("name", list(names), dtype=pl.Utf8)
+    return series.to_frame().select(phonetic_key_expr("name"))["name"].to_list()
+
+
+_COMPILED_RULES = [
+    (re.compile(pattern), re.sub(r"\$\{(\d+)\}", r"\\g<\1>", replacement)) for pattern, replacement in PHONETIC_RULES
+]
+_DOUBLE_LETTERS_RE = re.compile("|".join(_DOUBLE_LETTERS))
+
+
+def phonetic_key(name: Optional[str]) -> Optional[str]:
+    """Scalar ``phonetic_key_expr`` for one name (no DataFrame round trip)."""
+    if name is None:
+        return None
+    key = _normalize(name) or ""
+    for pattern, replacement in _COMPILED_RULES:
+        key = pattern.sub(replacement, key)
+    return _DOUBLE_LETTERS_RE.sub(lambda match: match.group()[0], key).upper()
+
+
+def with_phonetic_key(frame: pl.DataFrame, column: str = "Nombre") -> pl.DataFrame:
+    """Add ``Phonetic_Key`` unless the frame already carries it."""
+    if PHONETIC_COLUMN in frame.columns:
+        return frame
+    return frame.with_columns(phonetic_key_expr(column).alias(PHONETIC_COLUMN))
+
+
+@dataclass(slots=True)
+class PhoneticIndex:
+    """Names grouped by phonetic key, each group a contiguous row range."""
+
+    frame: pl.DataFrame
+    spans: Dict[str, Tuple[int, int]]
+
+    @classmethod
+    def from_frame(cls, frame: pl.DataFrame) -> "PhoneticIndex":
+        table = (
+            with_phonetic_key(frame)
+            .select(PHONETIC_COLUMN, *INDEX_COLUMNS)
+            .filter(pl.col(PHONETIC_COLUMN).str.len_chars() > 0)
+            .sort([PHONETIC_COLUMN, "Frecuencia"], descending=[False, True])
+        )
+        return cls._from_sorted(table)
+
+    @classmethod
+    def _from_sorted(cls, table: pl.DataFrame) -> "PhoneticIndex":
+        spans = (
+            table.select(PHONETIC_COLUMN)
+            .with_row_index("start")
+            .group_by(PHONETIC_COLUMN, maintain_order=True)
+            .agg(pl.col("start").first(), pl.len().alias("length"))
+        )
+        return cls(frame=table, spans={key: (start, length) for key, start, length in spans.iter_rows()})
+
+    @classmethod
+    def from_csv(cls, csv_path: Path) -> "PhoneticIndex":
+        return cls.from_frame(pl.read_csv(csv_path, infer_schema_length=10_000))
+
+    @classmethod
+    def load(cls, path: Path) -> "PhoneticIndex":
+        # The file is already sorted by key; rebuilding the spans is one pass.
+        return cls._from_sorted(pl.read_ipc(path))
+
+    def save(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.frame.write_ipc(path, compression="uncompressed")
+        return path
+
+    def variants(self, name: str, gender: Optional[str] = None) -> pl.DataFrame:
+        """Every spelling sharing ``name``'s phonetic key, most frequent first."""
+        span = self.spans.get(phonetic_key(name) or "")
+        rows = self.frame.slice(*span) if span else self.frame.clear()
+        if gender is not None:
+            rows = rows.filter(pl.col("Gender").str.to_lowercase() == gender.lower())
+        return rows
+
+    def combined_frequency(self, name: str, gender: Optional[str] = None) -> int:
+        return int(self.variants(name, gender)["Frecuencia"].sum())
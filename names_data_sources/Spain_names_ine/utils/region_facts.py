@@ -0,0 +1,189 @@
+"""Fact/dimension layout for the phase 3 municipality and province details.
+
+The wide ``details_municipios``/``details_provincias`` tables repeat the name,
+gender, region name, unit, region type and province as strings on every row.
+This layout stores each of them once, in a directory of Parquet tables:
+
+- ``names.parquet``: ``name_id`` (Int32), ``nombre``, ``gender``;
+- ``regions.parquet``: ``region_key`` (Int16), ``region_type``, the INE
+  ``region_id``, ``region_name``, ``province`` and the male/female
+  population ``persons`` is derived from;
+- ``municipios.parquet`` / ``provincias.parquet``: one fact per name and
+  region, ``name_id`` (Int32), ``region_key`` (Int16), ``per_mille``
+  (Float32) and ``persons`` (Int32, null when the population is unknown).
+
+INE region ids are too large for Int16, and municipality and province ids
+overlap, so ``region_key`` numbers the ``(region_type, region_id)`` pairs
+densely. Regions where a name does not occur (``per_mille == 0``) are not
+stored. ``load_region_details`` joins the tables back into the wide
+``REGIONS_SCHEMA`` view, with every value expressed in per mille.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Sequence
+
+import polars as pl
+
+from .population_lookup import DATA_PATH, get_population_by_name
+from .tables import REGIONS_SCHEMA, Schema, cast_to_schema, write_table
+
+# Fact table name -> ``region_type`` of its rows.
+REGION_KINDS = {"municipios": "municipio", "provincias": "provincia"}
+
+NAMES_SCHEMA: Schema = {
+    "name_id": pl.Int32,
+    "nombre": pl.Utf8,
+    "gender": pl.Utf8,
+}
+
+REGION_DIMENSION_SCHEMA: Schema = {
+    "region_key": pl.Int16,
+    "region_type": pl.Utf8,
+    "region_id": pl.Int32,
+    "region_name": pl.Utf8,
+    "province": pl.Utf8,
+    "population_male": pl.Int32,
+    "population_female": pl.Int32,
+}
+
+FACTS_SCHEMA: Schema = {
+    "name_id": pl.Int32,
+    "region_key": pl.Int16,
+    "per_mille": pl.Float32,
+    "persons": pl.Int32,
+}
+
+# INE publishes rates with three decimals; rounding on load undoes the
+# Float32 representation error.
+PER_MILLE_DECIMALS = 3
+INT16_MAX = 32_767
+
+
+def region_facts_dir(details_dir: Path, file_prefix: str = "details") -> Path:
+    return Path(details_dir) / f"{file_prefix}_regions"
+
+
+def _per_mille() -> pl.Expr:
+    return (
+        pl.when(pl.col("unidad") == "%")
+        .then(pl.col("percentage") * 10)
+        .otherwise(pl.col("percentage"))
+        .alias("per_mille")
+    )
+
+
+def _region_population(region_type: str, region_name: str, province: Optional[str], gender: str) -> Optional[int]:
+    # Same lookup ``fetch_region_records`` uses to derive ``persons``; a
+    # municipality whose province is ambiguous has no population.
+    if region_type == "provincia":
+        return get_population_by_name(gender=gender, province_name=region_name)
+    if not province:
+        return None
+    return get_population_by_name(gender=gender, province_name=province, municipality_name=region_name)
+
+
+def _with_population(regions: pl.DataFrame) -> pl.DataFrame:
+    columns = {"population_male": "Male", "population_female": "Female"}
+    if not DATA_PATH.exists():
+        return regions.with_columns(pl.lit(None, dtype=pl.Int32).alias(column) for column in columns)
+    rows = regions.select("region_type", "region_name", "province").rows()
+    return regions.with_columns(
+        pl.Series(column, [_region_population(*row, gender) for row in rows], dtype=pl.Int32)
+        for column, gender in columns.items()
+    )
+
+
+def split_region_details(details: Mapping[str, pl.DataFrame]) -> Dict[str, pl.DataFrame]:
+    """Split wide region tables (``{"municipios": frame, "provincias": frame}``) into the layout's tables.
+
+    Returns ``{"names": ..., "regions": ..., <kind>: facts}``. Names keep the
+    order they first appear in, and facts are sorted by name and region, so
+    ``load_region_details`` returns the rows in the order phase 3 wrote them.
+    """
+    frames = {
+        kind: cast_to_schema(frame, REGIONS_SCHEMA).select(list(REGIONS_SCHEMA))
+        for kind, frame in details.items()
+    }
+    unknown = set(frames) - set(REGION_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown region tables: {sorted(unknown)}")
+    wide = pl.concat(frames.values()) if frames else pl.DataFrame(schema=REGIONS_SCHEMA)
+
+    units = set(wide["unidad"].drop_nulls().unique().to_list()) - {"‰", "%"}
+    if units:
+        raise ValueError(f"Unsupported region units: {sorted(units)}")
+    names = cast_to_schema(
+        wide.select("nombre", "gender").unique(maintain_order=True).with_row_index("name_id"),
+        NAMES_SCHEMA,
+    )
+    regions = (
+        wide.group_by("region_type", "region_id", maintain_order=True)
+        .agg(
+            pl.col("region_name").first(),
+            pl.col("parent_region_name").drop_nulls().first().alias("province"),
+        )
+        .sort("region_type", "region_id")
+        .with_row_index("region_key")
+    )
+    if regions.height > INT16_MAX + 1:
+        raise ValueError(f"{regions.height} regions do not fit the Int16 region_key")
+    tables = {
+        "names": names,
+        "regions": cast_to_schema(_with_population(regions), REGION_DIMENSION_SCHEMA),
+    }
+    for kind, frame in frames.items():
+        facts = (
+            frame.with_columns(_per_mille())
+            .filter(pl.col("per_mille") > 0)
+            .join(names, on=["nombre", "gender"], how="inner")
+            .join(regions.select("region_key", "region_type", "region_id"), on=["region_type", "region_id"], how="inner")
+            .select(list(FACTS_SCHEMA))
+            .sort("name_id", "region_key")
+        )
+        tables[kind] = cast_to_schema(facts, FACTS_SCHEMA)
+    return tables
+
+
+def write_region_facts(tables: Mapping[str, pl.DataFrame], directory: Path) -> Path:
+    """Write the tables returned by ``split_region_details`` into ``directory``."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    schemas = {"names": NAMES_SCHEMA, "regions": REGION_DIMENSION_SCHEMA}
+    for name, frame in tables.items():
+        write_table(frame, directory / f"{name}.parquet", schemas.get(name, FACTS_SCHEMA), csv_export=False)
+    return directory
+
+
+def load_region_details(
+    directory: Path,
+    kind: str,
+    nombres: Optional[Sequence[str]] = None,
+) -> pl.DataFrame:
+    """Rebuild the wide ``details_<kind>`` view, optionally for the given ``nombres`` only."""
+    if kind not in REGION_KINDS:
+        raise ValueError(f"kind must be one of {sorted(REGION_KINDS)}, got {kind!r}")
+    directory = Path(directory)
+    names = pl.scan_parquet(directory / "names.parquet")
+    if nombres is not None:
+        names = names.filter(pl.col("nombre").is_in([nombre.upper() for nombre in nombres]))
+    wide = (
+        pl.scan_parquet(directory / f"{kind}.parquet")
+        .join(names, on="name_id", how="inner")
+        .join(pl.scan_parquet(directory / "regions.parquet"), on="region_key", how="left")
+        .sort("name_id", "region_key")
+        .select(
+            "nombre",
+            "gender",
+            "region_id",
+            "region_name",
+            pl.col("per_mille").cast(pl.Float64).round(PER_MILLE_DECIMALS).alias("percentage"),
+            pl.lit("‰").alias("unidad"),
+            "persons",
+            "region_type",
+            pl.col("province").alias("parent_region_name"),
+        )
+        .collect()
+    )
+    return cast_to_schema(wide, REGIONS_SCHEMA)
@@ -0,0 +1,191 @@
+"""Streaming row selection for the phase-4 input table.
+
+Rows are read lazily (``csv.reader`` for CSV, record batches for Parquet) so
+memory stays proportional to the number of selected rows rather than to the
+input file:
+
+- ``sequential`` reads only the first ``max_names`` rows.
+- ``random`` keeps a uniform reservoir sample (Algorithm L).
+- ``stratified`` keeps one reservoir per frequency band (powers of ten of
+  ``Frecuencia``) and allocates the sample proportionally to band sizes.
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import polars as pl
+import pyarrow.parquet as pq
+
+from .tables import resolve_table
+
+SAMPLING_MODES = ("sequential", "random", "stratified")
+PARQUET_BATCH_ROWS = 8192
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class InputRow:
+    """Compact record for one input row; ``values`` keeps the cells as text."""
+
+    nombre: str
+    frecuencia: Optional[int]
+    values: Tuple[str, ...]
+
+    def as_dict(self, fieldnames: Sequence[str]) -> Dict[str, str]:
+        return dict(zip(fieldnames, self.values))
+
+
+def _parse_int(value: str) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _iter_rows(reader: Iterator[List[str]], fieldnames: Sequence[str]) -> Iterator[InputRow]:
+    name_idx = fieldnames.index("Nombre")
+    freq_idx = fieldnames.index("Frecuencia") if "Frecuencia" in fieldnames else None
+    for values in reader:
+        if not values:
+            continue
+        yield InputRow(
+            nombre=values[name_idx],
+            frecuencia=_parse_int(values[freq_idx]) if freq_idx is not None else None,
+            values=tuple(values),
+        )
+
+
+def _parquet_cells(parquet: pq.ParquetFile) -> Iterator[List[str]]:
+    for batch in parquet.iter_batches(batch_size=PARQUET_BATCH_ROWS):
+        frame = pl.from_arrow(batch).select(pl.all().cast(pl.Utf8).fill_null(""))
+        for values in frame.iter_rows():
+            yield list(values)
+
+
+@contextmanager
+def _open_cells(input_file: Path) -> Iterator[Tuple[List[str], Iterator[List[str]]]]:
+    """Header and a lazy iterator over the rows of a CSV or Parquet file, as text cells."""
+    if input_file.suffix == ".parquet":
+        parquet = pq.ParquetFile(input_file)
+        try:
+            yield list(parquet.schema_arrow.names), _parquet_cells(parquet)
+        finally:
+            parquet.close()
+        return
+    with open(input_file, "r", encoding="utf-8", newline="") as infile:
+        reader = csv.reader(infile)
+        yield next(reader, []), reader
+
+
+def reservoir_sample(items: Iterable[T], k: int, rng: random.Random) -> List[T]:
+    """Uniform sample of ``k`` items from a stream of unknown length (Algorithm L)."""
+    if k <= 0:
+        return []
+    iterator = iter(items)
+    reservoir = list(islice(iterator, k))
+    if len(reservoir) < k:
+        return reservoir
+
+    w = math.exp(math.log(rng.random()) / k)
+    while True:
+        skip = int(math.log(rng.random()) / math.log(1 - w))
+        try:
+            item = next(islice(iterator, skip, None))
+        except StopIteration:
+            return reservoir
+        reservoir[rng.randrange(k)] = item
+        w *= math.exp(math.log(rng.random()) / k)
+
+
+def frequency_stratum(frecuencia: Optional[int]) -> int:
+    """Frequency band of a row: ``floor(log10(Frecuencia))``, ``-1`` if unknown."""
+    if not frecuencia or frecuencia <= 0:
+        return -1
+    return int(math.log10(frecuencia))
+
+
+def _allocate(counts: Dict[int, int], k: int) -> Dict[int, int]:
+    """Split ``k`` across strata proportionally (largest remainder method)."""
+    total = sum(counts.values())
+    if total <= k:
+        return dict(counts)
+    quotas = {stratum: k * count / total for stratum, count in counts.items()}
+    allocation = {stratum: int(quota) for stratum, quota in quotas.items()}
+    remainder = k - sum(allocation.values())
+    for stratum in sorted(quotas, key=lambda s: quotas[s] - allocation[s], reverse=True)[:remainder]:
+        allocation[stratum] += 1
+    return allocation
+
+
+def stratified_sample(rows: Iterable[InputRow], k: int, rng: random.Random) -> List[InputRow]:
+    """Frequency-stratified sample of ``k`` rows in a single pass.
+
+    Each stratum keeps a reservoir of up to ``k`` rows (classic Algorithm R),
+    so memory is bounded by ``k`` times the number of frequency bands.
+    """
+    reservoirs: Dict[int, List[InputRow]] = {}
+    counts: Dict[int, int] = {}
+    for row in rows:
+        stratum = frequency_stratum(row.frecuencia)
+        seen = counts.get(stratum, 0) + 1
+        counts[stratum] = seen
+        reservoir = reservoirs.setdefault(stratum, [])
+        if len(reservoir) < k:
+            reservoir.append(row)
+        else:
+            slot = rng.randrange(seen)
+            if slot < k:
+                reservoir[slot] = row
+
+    selected: List[InputRow] = []
+    for stratum, size in _allocate(counts, k).items():
+        selected.extend(rng.sample(reservoirs[stratum], size))
+    return selected
+
+
+def select_rows(
+    input_file: Path | str,
+    *,
+    max_names: Optional[int] = None,
+    mode: str = "sequential",
+    seed: Optional[int] = None,
+) -> Tuple[List[str], List[InputRow]]:
+    """Stream ``input_file`` and return its header plus the selected rows.
+
+    ``input_file`` resolves like ``tables.read_table``: a Parquet sibling is
+    preferred over the CSV export. Without ``max_names`` every row is
+    returned (shuffled in the sampling modes), which necessarily loads the
+    whole file.
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unsupported sampling mode: {mode}")
+
+    rng = random.Random(seed)
+    with _open_cells(resolve_table(input_file)) as (fieldnames, reader):
+        if "Nombre" not in fieldnames:
+            raise ValueError(f"Input file {input_file} has no 'Nombre' column")
+        rows = _iter_rows(reader, fieldnames)
+
+        if max_names is None or max_names <= 0:
+            selected = list(rows)
+            if mode != "sequential":
+                rng.shuffle(selected)
+        elif mode == "sequential":
+            selected = list(islice(rows, max_names))
+        elif mode == "random":
+            selected = reservoir_sample(rows, max_names, rng)
+            rng.shuffle(selected)
+        else:
+            selected = stratified_sample(rows, max_names, rng)
+            rng.shuffle(selected)
+
+    return fieldnames, selected
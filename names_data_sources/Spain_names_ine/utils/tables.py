@@ -0,0 +1,182 @@
+"""Declared schemas and Parquet I/O for the tables passed between phases.
+
+Each phase writes its table as zstd Parquet with the dtypes below. A CSV
+export of the same rows can be written next to it for spreadsheets and
+diffs, but the pipeline never reads it back when the Parquet file exists:
+
+- ``read_table`` accepts either path. A ``.csv`` path resolves to its
+  ``.parquet`` sibling whenever one exists. CSV exports carry the mtime of
+  their Parquet file, so a CSV edited afterwards is detected and reported
+  with a warning instead of being silently ignored.
+- CSV-only inputs (older runs, hand-made name lists) are parsed and then
+  cast to the schema. This turns legacy ``persons`` values such as ``21.0``
+  back into integers and ``"True"``/``"False"`` into booleans.
+- ``write_table`` casts to the schema before writing, so dtypes cannot
+  drift between phases.
+
+Columns missing from the schema keep whatever dtype they already have.
+"""
+
+from __future__ import annotations
+
+import os
+import warnings
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import pandas as pd
+import polars as pl
+
+from .phonetic import PHONETIC_COLUMN
+
+Schema = Dict[str, pl.DataType]
+
+PARQUET_COMPRESSION = "zstd"
+
+# Phase 1: the INE base table.
+BASE_SCHEMA: Schema = {
+    "Nombre": pl.Utf8,
+    "Frecuencia": pl.Int64,
+    "Edad Media (*)": pl.Float64,
+    "Gender": pl.Utf8,
+}
+
+# Phase 2 adds the derived columns; phases 4 and 5 keep them.
+PROCESSED_SCHEMA: Schema = {
+    **BASE_SCHEMA,
+    "Is_Compound": pl.Boolean,
+    "Percentage": pl.Float64,
+    "Popularity": pl.Int32,
+    "Character_Count": pl.Int16,
+    "Syllable_Count": pl.Int16,
+    PHONETIC_COLUMN: pl.Utf8,
+}
+
+ENRICHED_SCHEMA: Schema = {
+    **PROCESSED_SCHEMA,
+    "Family_Origin": pl.Utf8,
+    "Name_Description": pl.Utf8,
+    "Pronunciation_Spanish": pl.Utf8,
+    "Pronunciation_Foreign": pl.Utf8,
+    "Pronunciation_Explanation": pl.Utf8,
+}
+
+# Phase 3 detail tables (``DecadeRecord`` and ``RegionRecord`` without ``nombre_id``).
+DECADES_SCHEMA: Schema = {
+    "nombre": pl.Utf8,
+    "gender": pl.Utf8,
+    "decade": pl.Utf8,
+    "persons": pl.Int64,
+}
+
+REGIONS_SCHEMA: Schema = {
+    "nombre": pl.Utf8,
+    "gender": pl.Utf8,
+    "region_id": pl.Int32,
+    "region_name": pl.Utf8,
+    "percentage": pl.Float64,
+    "unidad": pl.Utf8,
+    "persons": pl.Int64,
+    "region_type": pl.Utf8,
+    "parent_region_name": pl.Utf8,
+}
+
+
+def parquet_path(path: Path | str) -> Path:
+    return Path(path).with_suffix(".parquet")
+
+
+def csv_path(path: Path | str) -> Path:
+    return Path(path).with_suffix(".csv")
+
+
+def _cast_column(frame: pl.DataFrame, name: str, dtype: pl.DataType) -> pl.Expr:
+    column = pl.col(name)
+    source = frame.schema[name]
+    if source == pl.Utf8:
+        # Text cells (CSV-derived rows): empty means missing.
+        column = pl.when(column.str.len_chars() > 0).then(column)
+        if dtype == pl.Boolean:
+            return column.str.to_lowercase().replace_strict({"true": True, "false": False}, default=None, return_dtype=pl.Boolean)
+    if dtype.is_integer() and source.is_float():
+        column = column.round()
+    return column.cast(dtype)
+
+
+def cast_to_schema(frame: pl.DataFrame, schema: Schema) -> pl.DataFrame:
+    """Cast the columns of ``frame`` named in ``schema``; other columns are left alone."""
+    casts = [
+        _cast_column(frame, name, dtype).alias(name)
+        for name, dtype in schema.items()
+        if name in frame.columns and frame.schema[name] != dtype
+    ]
+    return frame.with_columns(casts) if casts else frame
+
+
+def resolve_table(path: Path | str) -> Path:
+    """File ``read_table`` loads for ``path``: the Parquet sibling if present, else the CSV."""
+    path = Path(path)
+    parquet, csv = parquet_path(path), csv_path(path)
+    if parquet.exists():
+        if csv.exists() and csv.stat().st_mtime_ns > parquet.stat().st_mtime_ns:
+            warnings.warn(f"{csv} is newer than {parquet.name}; reading the Parquet file and ignoring the CSV edits", stacklevel=2)
+        return parquet
+    return csv if csv.exists() else path
+
+
+def _stamp_export(csv: Path, parquet: Path) -> None:
+    # The export gets its table's mtime; only a later edit makes it newer.
+    stat = parquet.stat()
+    os.utime(csv, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def read_table(
+    path: Path | str,
+    schema: Optional[Schema] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pl.DataFrame:
+    """Read a phase table from Parquet (preferred) or CSV, cast to ``schema``."""
+    source = resolve_table(path)
+    if source.suffix == ".parquet":
+        frame = pl.read_parquet(source, columns=list(columns) if columns else None)
+    else:
+        frame = pl.read_csv(source, columns=list(columns) if columns else None, infer_schema_length=10_000)
+    return cast_to_schema(frame, schema) if schema else frame
+
+
+def read_pandas(path: Path | str, schema: Optional[Schema] = None) -> pd.DataFrame:
+    """``read_table`` for the pandas-based phases."""
+    return read_table(path, schema).to_pandas()
+
+
+def write_table(
+    frame: pl.DataFrame | pd.DataFrame,
+    path: Path | str,
+    schema: Optional[Schema] = None,
+    *,
+    csv_export: bool = True,
+) -> Path:
+    """Write ``frame`` as Parquet (plus a CSV export) and return the Parquet path.
+
+    ``path`` may name either file; both are written next to each other.
+    """
+    if isinstance(frame, pd.DataFrame):
+        frame = pl.from_pandas(frame)
+    if schema:
+        frame = cast_to_schema(frame, schema)
+
+    parquet = parquet_path(path)
+    parquet.parent.mkdir(parents=True, exist_ok=True)
+    frame.write_parquet(parquet, compression=PARQUET_COMPRESSION)
+    if csv_export:
+        frame.write_csv(csv_path(path))
+        _stamp_export(csv_path(path), parquet)
+    return parquet
+
+
+def export_csv(path: Path | str) -> Path:
+    """Write the CSV export of an existing Parquet table."""
+    target = csv_path(path)
+    pl.read_parquet(parquet_path(path)).write_csv(target)
+    _stamp_export(target, parquet_path(path))
+    return target
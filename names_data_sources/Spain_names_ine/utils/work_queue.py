@@ -0,0 +1,192 @@
+"""SQLite work queue with expiring leases for the phase 3 detail crawl.
+
+Every ``(Nombre, Gender)`` to crawl is one row of the ``tasks`` table. A
+worker leases a batch of pending rows in one write transaction, so two
+workers never get the same row. While it works, it keeps the lease alive
+with heartbeats (``keep_alive``). When it is done it marks the rows it
+still holds as completed:
+
+- a lease that is not renewed within ``lease_ttl_s`` expires, and its rows
+  go to the next worker that asks;
+- ``complete`` only touches rows still carrying the worker's lease id, so
+  a worker that lost its lease cannot overwrite the new holder;
+- a row that fails ``max_attempts`` times is parked as ``failed`` instead of
+  being retried forever.
+
+Each completed row remembers the lease that finished it. The merge step uses
+that to keep exactly one shard's records per name, even when an expired
+lease's worker still wrote its shard.
+
+The database can be shared by processes on several machines through a
+network filesystem with working POSIX locks. Leases are timed with each
+host's wall clock, so the clocks must be kept in sync.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    frecuencia INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_id TEXT,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (nombre, gender)
+);
+CREATE INDEX IF NOT EXISTS tasks_status_idx ON tasks (status, lease_expires);
+CREATE INDEX IF NOT EXISTS tasks_lease_idx ON tasks (lease_id);
+"""
+
+
+@dataclass(slots=True)
+class QueueItem:
+    id: int
+    nombre: str
+    gender: str
+    frecuencia: int
+
+
+@dataclass(slots=True)
+class Lease:
+    lease_id: str
+    worker: str
+    items: List[QueueItem]
+
+
+class WorkQueue:
+    """Lease-based queue of ``(Nombre, Gender)`` crawl tasks stored at ``path``."""
+
+    def __init__(self, path: Path, *, lease_ttl_s: float = 300.0, max_attempts: int = 3) -> None:
+        self.path = Path(path)
+        self.lease_ttl_s = lease_ttl_s
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; writers take the lock up front with BEGIN IMMEDIATE.
+        return sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def enqueue(self, items: Iterable[Tuple[str, str, int]]) -> int:
+        """Add ``(nombre, gender, frecuencia)`` tasks; ones already queued are skipped."""
+        with self._write() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO tasks (nombre, gender, frecuencia) VALUES (?, ?, ?)",
+                ((nombre, gender, int(frecuencia)) for nombre, gender, frecuencia in items),
+            )
+            return connection.total_changes - before
+
+    def lease(self, worker: str, size: int) -> Optional[Lease]:
+        """Lease up to ``size`` pending or expired tasks, or ``None`` when nothing is left to lease."""
+        now = time.time()
+        lease_id = uuid.uuid4().hex
+        with self._write() as connection:
+            rows = connection.execute(
+                "SELECT id, nombre, gender, frecuencia FROM tasks"
+                " WHERE status = ? OR (status = ? AND lease_expires < ?)"
+                " ORDER BY id LIMIT ?",
+                (PENDING, LEASED, now, size),
+            ).fetchall()
+            if not rows:
+                return None
+            connection.executemany(
+                "UPDATE tasks SET status = ?, lease_id = ?, worker = ?, lease_expires = ?, attempts = attempts + 1"
+                " WHERE id = ?",
+                ((LEASED, lease_id, worker, now + self.lease_ttl_s, row[0]) for row in rows),
+            )
+        return Lease(lease_id, worker, [QueueItem(*row) for row in rows])
+
+    def heartbeat(self, lease: Lease) -> int:
+        """Extend the lease; returns how many of its tasks the worker still holds."""
+        with self._write() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE lease_id = ? AND status = ?",
+                (time.time() + self.lease_ttl_s, lease.lease_id, LEASED),
+            )
+            return cursor.rowcount
+
+    @contextmanager
+    def keep_alive(self, lease: Lease, interval_s: Optional[float] = None) -> Iterator[None]:
+        """Heartbeat ``lease`` from a background thread while the block runs."""
+        interval_s = interval_s or self.lease_ttl_s / 3
+        stop = threading.Event()
+
+        def beat() -> None:
+            while not stop.wait(interval_s):
+                self.heartbeat(lease)
+
+        thread = threading.Thread(target=beat, name=f"lease-{lease.lease_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, lease: Lease, failed: Optional[Dict[int, str]] = None) -> int:
+        """Mark the lease's tasks done, except ``failed`` (``{task id: error}``), which are retried or parked.
+
+        Returns the number of tasks marked done; tasks whose lease expired and
+        moved to another worker are left alone.
+        """
+        failed = failed or {}
+        with self._write() as connection:
+            for task_id, error in failed.items():
+                connection.execute(
+                    "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,"
+                    " lease_id = NULL, lease_expires = NULL, error = ?"
+                    " WHERE id = ? AND lease_id = ?",
+                    (self.max_attempts, FAILED, PENDING, error, task_id, lease.lease_id),
+                )
+            cursor = connection.execute(
+                "UPDATE tasks SET status = ?, lease_expires = NULL, error = NULL WHERE lease_id = ? AND status = ?",
+                (DONE, lease.lease_id, LEASED),
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {status: 0 for status in (PENDING, LEASED, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def completed(self) -> List[Tuple[int, str, str, str]]:
+        """``(id, nombre, gender, lease_id)`` of every done task, in queue order."""
+        with closing(self._connect()) as connection:
+            return connection.execute(
+                "SELECT id, nombre, gender, lease_id FROM tasks WHERE status = ? ORDER BY id", (DONE,)
+            ).fetchall()
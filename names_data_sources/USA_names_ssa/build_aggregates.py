@@ -0,0 +1,225 @@
+"""Materialize the aggregates most analyses recompute from the SSA datasets.
+
+Tables under ``output_data/aggregates/``:
+
+- ``yearly_ranks/year=YYYY``: national count, rank and share of births per
+  name within its sex, one partition per year.
+- ``state_shares/year=YYYY``: the same per state, plus ``name_share``, the
+  state's share of that name's births across all states in that year.
+- ``name_totals.parquet``: all-time totals, first/last/peak year per name.
+- ``year_totals.parquet``: births and distinct names per year and sex.
+
+Each partitioned table records the hash of the source partitions it was built
+from, so a refresh only recomputes years whose source data changed. Name totals
+are merged incrementally when the only change is newly published years.
+"""
+
+import polars as pl
+
+from ssa_dataset import (
+    AGGREGATES_DIR,
+    NAME_TOTALS_FILE,
+    NATIONAL_DATASET_DIR,
+    STATE_DATASET_DIR,
+    STATE_SHARE_COLUMNS,
+    STATE_SHARES_DIR,
+    YEAR_TOTALS_FILE,
+    YEARLY_RANK_COLUMNS,
+    YEARLY_RANKS_DIR,
+    bytes_sha256,
+    is_current,
+    load_manifest,
+    partition_file,
+    partition_key,
+    remove_partition,
+    save_manifest,
+    scan_dataset,
+    write_partition,
+    write_table,
+)
+
+
+def _key_year(key):
+    return int(key.rsplit('year=', 1)[1])
+
+
+def rank_and_share(frame, group_columns):
+    """Add `rank` (1 = most births, ties share a rank) and `share` within groups."""
+    return frame.with_columns(
+        pl.col('count').rank('min', descending=True).over(group_columns).cast(pl.Int32).alias('rank'),
+        (pl.col('count') / pl.col('count').sum().over(group_columns)).alias('share'),
+    )
+
+
+def _refresh_partitions(output_dir, sources, build):
+    """Rebuild the `year=YYYY` partitions whose source hash changed.
+
+    `sources` maps each output key to the hash of its inputs; `build(key)`
+    returns `(frame, extra_manifest_fields)` for one partition.
+    """
+    manifest = load_manifest(output_dir)
+    current_layout = is_current(manifest)
+    changed = []
+    for key in sorted(set(manifest['partitions']) - set(sources)):
+        remove_partition(output_dir, key)
+        manifest['partitions'].pop(key)
+        changed.append(key)
+
+    for key, source_sha256 in sorted(sources.items()):
+        known = manifest['partitions'].get(key)
+        if current_layout and known and known['source_sha256'] == source_sha256 and partition_file(output_dir, key).exists():
+            continue
+        frame, extra = build(key)
+        rows = write_partition(frame, output_dir, key, ['year'])
+        manifest['partitions'][key] = {'source_sha256': source_sha256, 'rows': rows, **extra}
+        changed.append(key)
+
+    save_manifest(output_dir, manifest)
+    return changed
+
+
+def refresh_yearly_ranks(dataset_dir=NATIONAL_DATASET_DIR, output_dir=YEARLY_RANKS_DIR):
+    """Refresh per-year national ranks and shares; returns the changed keys."""
+    sources = {key: entry['sha256'] for key, entry in load_manifest(dataset_dir)['partitions'].items()}
+
+    def build(key):
+        year = _key_year(key)
+        df = pl.read_parquet(partition_file(dataset_dir, key)).with_columns(
+            pl.lit(year, dtype=pl.Int32).alias('year')
+        )
+        totals = df.group_by('sex').agg(births=pl.col('count').sum(), names=pl.len())
+        ranked = rank_and_share(df, ['sex']).select(YEARLY_RANK_COLUMNS)
+        return ranked, {
+            'totals': {row['sex']: {'births': row['births'], 'names': row['names']} for row in totals.iter_rows(named=True)}
+        }
+
+    return _refresh_partitions(output_dir, sources, build)
+
+
+def refresh_state_shares(dataset_dir=STATE_DATASET_DIR, output_dir=STATE_SHARES_DIR):
+    """Refresh per-year state ranks and shares; returns the changed keys.
+
+    A year is rebuilt when any of its `state=XX/year=YYYY` source partitions
+    changed, since `name_share` depends on every state in that year.
+    """
+    by_year = {}
+    for key, entry in load_manifest(dataset_dir)['partitions'].items():
+        by_year.setdefault(partition_key(year=_key_year(key)), []).append(f"{key}:{entry['sha256']}")
+    sources = {key: bytes_sha256('\n'.join(sorted(parts)).encode('utf-8')) for key, parts in by_year.items()}
+
+    def build(key):
+        year = _key_year(key)
+        df = scan_dataset(dataset_dir, years=(year, year)).collect()
+        shares = rank_and_share(df, ['state', 'sex']).with_columns(
+            (pl.col('count') / pl.col('count').sum().over(['name', 'sex'])).alias('name_share')
+        )
+        return shares.select(STATE_SHARE_COLUMNS), {}
+
+    return _refresh_partitions(output_dir, sources, build)
+
+
+def name_totals(yearly):
+    """All-time totals per (name, sex) from a frame of yearly counts.
+
+    The peak year is the year with the most births, the earliest on ties.
+    """
+    by_peak = {'by': ['count', 'year'], 'descending': [True, False]}
+    return (
+        yearly.group_by(['name', 'sex'])
+        .agg(
+            total_count=pl.col('count').cast(pl.Int64).sum(),
+            years=pl.len().cast(pl.Int32),
+            first_year=pl.col('year').min(),
+            last_year=pl.col('year').max(),
+            peak_year=pl.col('year').sort_by(**by_peak).first(),
+            peak_count=pl.col('count').sort_by(**by_peak).first(),
+        )
+        .sort(['name', 'sex'])
+    )
+
+
+def merge_name_totals(old, new):
+    """Fold totals for strictly later years into existing totals."""
+    newer_peak = pl.col('peak_count_new').fill_null(-1) > pl.col('peak_count').fill_null(-1)
+    return (
+        old.join(new, on=['name', 'sex'], how='full', coalesce=True, suffix='_new')
+        .select(
+            'name',
+            'sex',
+            total_count=pl.col('total_count').fill_null(0) + pl.col('total_count_new').fill_null(0),
+            years=pl.col('years').fill_null(0) + pl.col('years_new').fill_null(0),
+            first_year=pl.min_horizontal('first_year', 'first_year_new'),
+            last_year=pl.max_horizontal('last_year', 'last_year_new'),
+            peak_year=pl.when(newer_peak).then('peak_year_new').otherwise('peak_year'),
+            peak_count=pl.when(newer_peak).then('peak_count_new').otherwise('peak_count'),
+        )
+        .sort(['name', 'sex'])
+    )
+
+
+def refresh_name_totals(ranks_dir=YEARLY_RANKS_DIR, output_file=NAME_TOTALS_FILE):
+    """Refresh name totals, merging only new years when history is unchanged.
+
+    Returns 'unchanged', 'merged' or 'rebuilt'.
+    """
+    current = {key: entry['source_sha256'] for key, entry in load_manifest(ranks_dir)['partitions'].items()}
+    manifest = load_manifest(output_file.parent)
+    built = manifest['sources']
+    if built == current and is_current(manifest) and output_file.exists():
+        return 'unchanged'
+
+    added = set(current) - set(built)
+    history_intact = all(current.get(key) == sha256 for key, sha256 in built.items())
+    appended_only = bool(built) and bool(added) and min(map(_key_year, added)) > max(map(_key_year, built))
+    columns = ['name', 'sex', 'year', 'count']
+
+    if output_file.exists() and is_current(manifest) and history_intact and appended_only:
+        first_added = min(map(_key_year, added))
+        new = name_totals(scan_dataset(ranks_dir, years=(first_added, None), columns=columns)).collect()
+        totals = merge_name_totals(pl.read_parquet(output_file), new)
+        status = 'merged'
+    else:
+        totals = name_totals(scan_dataset(ranks_dir, columns=columns)).collect()
+        status = 'rebuilt'
+
+    write_table(totals, output_file)
+    manifest['sources'] = current
+    save_manifest(output_file.parent, manifest)
+    return status
+
+
+def write_year_totals(ranks_dir=YEARLY_RANKS_DIR, output_file=YEAR_TOTALS_FILE):
+    """Write births/names per (year, sex) from the yearly ranks manifest."""
+    rows = [
+        {'year': _key_year(key), 'sex': sex, 'births': totals['births'], 'names': totals['names']}
+        for key, entry in load_manifest(ranks_dir)['partitions'].items()
+        for sex, totals in entry['totals'].items()
+    ]
+    schema = {'year': pl.Int32, 'sex': pl.Utf8, 'births': pl.Int64, 'names': pl.Int32}
+    write_table(pl.DataFrame(rows, schema=schema), output_file)
+    return len(rows)
+
+
+def build_aggregates():
+    changed = {}
+    if (NATIONAL_DATASET_DIR / '_manifest.json').exists():
+        changed['yearly_ranks'] = refresh_yearly_ranks()
+        changed['name_totals'] = refresh_name_totals()
+        write_year_totals()
+        print(f"Yearly ranks: {len(changed['yearly_ranks'])} partition(s) updated")
+        print(f"Name totals: {changed['name_totals']}")
+    else:
+        print(f"No national dataset at {NATIONAL_DATASET_DIR}, skipping national aggregates")
+
+    if (STATE_DATASET_DIR / '_manifest.json').exists():
+        changed['state_shares'] = refresh_state_shares()
+        print(f"State shares: {len(changed['state_shares'])} partition(s) updated")
+    else:
+        print(f"No state dataset at {STATE_DATASET_DIR}, skipping state aggregates")
+    return changed
+
+
+if __name__ == '__main__':
+    print("Building aggregate tables...")
+    build_aggregates()
+    print(f"Done! Aggregates are in {AGGREGATES_DIR}")
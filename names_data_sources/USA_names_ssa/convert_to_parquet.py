@@ -1,119 +1,288 @@
-import polars as pl
-import glob
+import argparse
+import io
+import zipfile
+from fnmatch import fnmatch
 from pathlib import Path
 
+import polars as pl
+
+from download_SSA_names import (
+    HTTP_CACHE_PATH,
+    URL_NAMES,
+    URL_NAMES_BY_STATE,
+    fetch_archives,
+    load_http_cache,
+    save_http_cache,
+)
+from ssa_dataset import (
+    NATIONAL_DATASET_DIR,
+    NATIONAL_LOOKUP_FILE,
+    STATE_DATASET_DIR,
+    STATE_LOOKUP_FILE,
+    bytes_sha256,
+    file_sha256,
+    frame_sha256,
+    is_current,
+    load_manifest,
+    partition_file,
+    partition_key,
+    remove_partition,
+    save_manifest,
+    scan_dataset,
+    write_partition,
+    write_table,
+)
+
+NATIONAL_SCHEMA = {
+    'name': pl.Utf8,
+    'sex': pl.Utf8,
+    'count': pl.Int32,
+}
+
+STATE_SCHEMA = {
+    'state': pl.Utf8,
+    'sex': pl.Utf8,
+    'year': pl.Int32,
+    'name': pl.Utf8,
+    'count': pl.Int32,
+}
+
+
 def extract_year_from_filename(filename):
     """Extract year from filename like 'yob1880.txt'"""
     return int(Path(filename).stem[3:])
 
-def process_names_data():
-    """Process national-level names data from yob files."""
-    # Get the absolute path to the script's directory
-    script_dir = Path(__file__).parent
-    
-    # Get all txt files in the national directory using absolute path
-    input_files = glob.glob(str(script_dir / 'downloaded_data' / 'national' / 'yob*.txt'))
-    
-    print(f"Found {len(input_files)} input files")
-    
-    # Create a list to store all dataframes
-    dfs = []
-    
-    # Process each file
-    for file_path in sorted(input_files):
-        year = extract_year_from_filename(file_path)
-        print(f"Processing year {year}...")
-        
-        # Read the CSV file
-        df = pl.read_csv(
-            file_path,
+
+def scan_national_files(input_files):
+    """Lazily scan yobYYYY.txt files, injecting `year` from the file name.
+
+    Polars parses the files in parallel and nothing is materialized until the
+    plan is executed, so the scan can be streamed straight into Parquet.
+    """
+    return (
+        pl.scan_csv(
+            [str(path) for path in input_files],
             has_header=False,
-            new_columns=['name', 'sex', 'count'],
-            schema={
-                'name': pl.Utf8,
-                'sex': pl.Utf8,
-                'count': pl.Int32
-            }
+            schema=NATIONAL_SCHEMA,
+            include_file_paths='source_file',
         )
-        
-        # Add year column
-        df = df.with_columns(pl.lit(year).alias('year'))
-        
-        dfs.append(df)
-    
-    if not dfs:
-        raise ValueError("No data files were found or processed")
-    
-    # Concatenate all dataframes
-    combined_df = pl.concat(dfs)
-    
-    # Create output directory if it doesn't exist
-    output_dir = script_dir / 'output_data'
-    output_dir.mkdir(exist_ok=True)
-    
-    # Save as parquet file
-    output_path = output_dir / 'names_database.parquet'
-    print(f"Saving data to {output_path}...")
-    combined_df.write_parquet(
-        output_path,
-        compression='zstd'  # Using zstd compression for good compression ratio and speed
+        .with_columns(
+            pl.col('source_file').str.extract(r'yob(\d{4})\.txt$', 1).cast(pl.Int32).alias('year')
+        )
+        .drop('source_file')
     )
 
-def process_state_names_data():
-    """Process state-level names data."""
-    # Get the absolute path to the script's directory
-    script_dir = Path(__file__).parent
-    
-    # Get all txt files in the state directory
-    input_files = glob.glob(str(script_dir / 'downloaded_data' / 'state' / '*.TXT'))
-    
-    print(f"Found {len(input_files)} state files")
-    
-    # Create a list to store all dataframes
-    dfs = []
-    
-    # Process each state file
-    for file_path in sorted(input_files):
-        state = Path(file_path).stem
-        print(f"Processing state {state}...")
-        
-        # Read the CSV file
-        df = pl.read_csv(
-            file_path,
-            has_header=False,
-            new_columns=['state', 'sex', 'year', 'name', 'count'],
-            schema={
-                'state': pl.Utf8,
-                'sex': pl.Utf8,
-                'year': pl.Int32,
-                'name': pl.Utf8,
-                'count': pl.Int32
-            }
-        )
-        
-        dfs.append(df)
-    
-    if not dfs:
-        raise ValueError("No state data files were found or processed")
-    
-    # Concatenate all dataframes
-    combined_df = pl.concat(dfs)
-    
-    # Create output directory if it doesn't exist
-    output_dir = script_dir / 'output_data'
-    output_dir.mkdir(exist_ok=True)
-    
-    # Save as parquet file
-    output_path = output_dir / 'state_names_database.parquet'
-    print(f"Saving data to {output_path}...")
-    combined_df.write_parquet(
-        output_path,
-        compression='zstd'
+
+def read_national_bytes(data, year):
+    """Parse an in-memory yobYYYY.txt member, adding its `year` column."""
+    return pl.read_csv(io.BytesIO(data), has_header=False, schema=NATIONAL_SCHEMA).with_columns(
+        pl.lit(year, dtype=pl.Int32).alias('year')
     )
 
+
+def read_state_file(source):
+    """Read one state file (XX.TXT); each row already carries its state and year.
+
+    `source` is a path or a file-like object.
+    """
+    return pl.read_csv(source, has_header=False, schema=STATE_SCHEMA)
+
+
+def disk_sources(input_dir, pattern):
+    """Source files in `input_dir` matching `pattern`, sorted by name."""
+    return sorted(Path(input_dir).glob(pattern))
+
+
+def zip_sources(archive, pattern):
+    """Members of an in-memory zip archive matching `pattern`, sorted by name.
+
+    Members are returned as `zipfile.Path` objects and only decompressed when
+    read, so the archive is never extracted to disk.
+    """
+    zf = zipfile.ZipFile(io.BytesIO(archive))
+    members = [
+        zipfile.Path(zf, at=info.filename)
+        for info in zf.infolist()
+        if not info.is_dir() and fnmatch(Path(info.filename).name, pattern)
+    ]
+    return sorted(members, key=lambda member: member.name)
+
+
+def _load_source(source):
+    """Return (sha256, size, data) for a source file or zip member.
+
+    Disk files are hashed in chunks and `data` is None so they can be scanned
+    lazily; zip members are decompressed once and their bytes reused for
+    parsing. Hashes are over the raw text either way, so the manifest stays
+    valid when switching between the two ingestion paths.
+    """
+    if isinstance(source, Path):
+        return file_sha256(source), source.stat().st_size, None
+    data = source.read_bytes()
+    return bytes_sha256(data), len(data), data
+
+
+def _drop_removed_sources(manifest, dataset_dir, current_sources):
+    removed = []
+    for source in sorted(set(manifest['sources']) - set(current_sources)):
+        for key in manifest['sources'].pop(source)['partitions']:
+            remove_partition(dataset_dir, key)
+            manifest['partitions'].pop(key, None)
+            removed.append(key)
+    return removed
+
+
+def refresh_lookup_file(dataset_dir, lookup_file, changed):
+    """Rewrite the name-sorted copy of a dataset if any partition changed."""
+    if not changed and Path(lookup_file).exists():
+        return
+    rows = write_table(scan_dataset(dataset_dir), lookup_file)
+    print(f"Wrote {rows} rows to {Path(lookup_file).name}")
+
+
+def process_names_data(input_dir=None, dataset_dir=NATIONAL_DATASET_DIR, sources=None):
+    """Refresh the year-partitioned national dataset from yob files.
+
+    Each yobYYYY.txt file maps to one `year=YYYY` partition; only files whose
+    hash changed since the last run (or whose partition is missing) are
+    rewritten. `sources` overrides the files found in `input_dir` (e.g. with
+    `zip_sources`). Returns the list of partitions written or removed.
+    """
+    if sources is None:
+        script_dir = Path(__file__).parent
+        input_dir = Path(input_dir) if input_dir else script_dir / 'downloaded_data' / 'national'
+        sources = disk_sources(input_dir, 'yob*.txt')
+
+    print(f"Found {len(sources)} input files")
+    if not sources:
+        raise ValueError("No data files were found or processed")
+
+    manifest = load_manifest(dataset_dir)
+    current_layout = is_current(manifest)
+    changed = _drop_removed_sources(manifest, dataset_dir, [source.name for source in sources])
+
+    for source in sources:
+        digest, size, data = _load_source(source)
+        year = extract_year_from_filename(source.name)
+        key = partition_key(year=year)
+        previous = manifest['sources'].get(source.name)
+        if current_layout and previous and previous['sha256'] == digest and partition_file(dataset_dir, key).exists():
+            continue
+
+        print(f"Writing partition {key} from {source.name}...")
+        frame = scan_national_files([source]) if data is None else read_national_bytes(data, year)
+        rows = write_partition(frame, dataset_dir, key, ['year'])
+        manifest['sources'][source.name] = {
+            'sha256': digest,
+            'size': size,
+            'partitions': [key],
+        }
+        manifest['partitions'][key] = {'source': source.name, 'sha256': digest, 'rows': rows}
+        changed.append(key)
+
+    save_manifest(dataset_dir, manifest)
+    print(f"National dataset: {len(changed)} partition(s) updated, {len(manifest['partitions'])} total")
+    refresh_lookup_file(dataset_dir, NATIONAL_LOOKUP_FILE, changed)
+    return changed
+
+
+def process_state_names_data(input_dir=None, dataset_dir=STATE_DATASET_DIR, sources=None):
+    """Refresh the state/year-partitioned state dataset.
+
+    Unchanged state files are skipped by hash. For a changed file, every
+    `state=XX/year=YYYY` slice is hashed and only slices whose content differs
+    from the manifest are rewritten (typically just the newly published year).
+    """
+    if sources is None:
+        script_dir = Path(__file__).parent
+        input_dir = Path(input_dir) if input_dir else script_dir / 'downloaded_data' / 'state'
+        sources = disk_sources(input_dir, '*.TXT')
+
+    print(f"Found {len(sources)} state files")
+    if not sources:
+        raise ValueError("No state data files were found or processed")
+
+    manifest = load_manifest(dataset_dir)
+    current_layout = is_current(manifest)
+    changed = _drop_removed_sources(manifest, dataset_dir, [source.name for source in sources])
+
+    for source in sources:
+        digest, size, data = _load_source(source)
+        previous = manifest['sources'].get(source.name)
+        if current_layout and previous and previous['sha256'] == digest and all(
+            partition_file(dataset_dir, key).exists() for key in previous['partitions']
+        ):
+            continue
+
+        print(f"Refreshing state file {source.name}...")
+        df = read_state_file(source if data is None else io.BytesIO(data))
+        keys = []
+        for (state, year), part in df.partition_by(['state', 'year'], as_dict=True, maintain_order=True).items():
+            key = partition_key(state=state, year=year)
+            keys.append(key)
+            part_digest = frame_sha256(part)
+            known = manifest['partitions'].get(key)
+            if current_layout and known and known['sha256'] == part_digest and partition_file(dataset_dir, key).exists():
+                continue
+            rows = write_partition(part, dataset_dir, key, ['state', 'year'])
+            manifest['partitions'][key] = {'source': source.name, 'sha256': part_digest, 'rows': rows}
+            changed.append(key)
+
+        for stale_key in sorted(set(previous['partitions'] if previous else []) - set(keys)):
+            remove_partition(dataset_dir, stale_key)
+            manifest['partitions'].pop(stale_key, None)
+            changed.append(stale_key)
+
+        manifest['sources'][source.name] = {
+            'sha256': digest,
+            'size': size,
+            'partitions': sorted(keys),
+        }
+
+    save_manifest(dataset_dir, manifest)
+    print(f"State dataset: {len(changed)} partition(s) updated, {len(manifest['partitions'])} total")
+    refresh_lookup_file(dataset_dir, STATE_LOOKUP_FILE, changed)
+    return changed
+
+
+def ingest_archives(force=False, cache_path=HTTP_CACHE_PATH):
+    """Download both SSA archives and convert their members straight from memory.
+
+    The archives are fetched concurrently with conditional requests; an
+    archive the server reports as unchanged is skipped entirely. The HTTP
+    cache is only saved once every changed archive has been ingested, so a
+    failed run re-downloads on the next attempt.
+    """
+    cache = {} if force else load_http_cache(cache_path)
+    archives, cache = fetch_archives([URL_NAMES, URL_NAMES_BY_STATE], cache)
+
+    changed = {'national': [], 'state': []}
+    if archives[URL_NAMES] is not None:
+        print("Processing national-level names data...")
+        changed['national'] = process_names_data(sources=zip_sources(archives[URL_NAMES], 'yob*.txt'))
+    if archives[URL_NAMES_BY_STATE] is not None:
+        print("Processing state-level names data...")
+        changed['state'] = process_state_names_data(
+            sources=zip_sources(archives[URL_NAMES_BY_STATE], '*.TXT')
+        )
+
+    save_http_cache(cache, cache_path)
+    return changed
+
+
 if __name__ == '__main__':
-    print("Processing national-level names data...")
-    process_names_data()
-    print("Processing state-level names data...")
-    process_state_names_data()
-    print("Done! Files have been saved to the output_data directory.") 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Convert SSA names data to partitioned Parquet')
+    parser.add_argument('--direct', action='store_true',
+                        help='Download the archives and convert them in memory (no downloaded_data/)')
+    parser.add_argument('--force', action='store_true',
+                        help='With --direct, ignore cached ETag/Last-Modified and re-download')
+    args = parser.parse_args()
+
+    if args.direct:
+        ingest_archives(force=args.force)
+    else:
+        print("Processing national-level names data...")
+        process_names_data()
+        print("Processing state-level names data...")
+        process_state_names_data()
+    print("Done! Datasets have been refreshed in the output_data directory.")
@@ -1,13 +1,33 @@
+import hashlib
+import io
+import json
 import os
 import urllib.request
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import requests
+
+URL_NAMES = "https://www.ssa.gov/oact/babynames/names.zip"
+URL_NAMES_BY_STATE = "https://www.ssa.gov/oact/babynames/state/namesbystate.zip"
+
+# ETag/Last-Modified of previously fetched archives, used for conditional requests
+HTTP_CACHE_PATH = Path(__file__).parent / "output_data" / "_http_cache.json"
+
+DOWNLOAD_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
+        " AppleWebKit/537.36 (KHTML, like Gecko)"
+        " Chrome/140.0.0.0 Safari/537.36"
+    ),
+}
+
 
 def download_and_extract(url, extract_folder):
     # Create the extract folder if it doesn't exist
     Path(extract_folder).mkdir(exist_ok=True)
-    
+
     # Derive the local filename based on the URL
     zip_filename = os.path.join(extract_folder, os.path.basename(url))
     print(f"Downloading {url} to {zip_filename}...")
@@ -19,38 +39,104 @@ def download_and_extract(url, extract_folder):
     print(f"Done extracting {url}")
 
 
+def load_http_cache(cache_path=HTTP_CACHE_PATH):
+    if not Path(cache_path).exists():
+        return {}
+    return json.loads(Path(cache_path).read_text(encoding="utf-8"))
+
+
+def save_http_cache(cache, cache_path=HTTP_CACHE_PATH):
+    Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(cache_path).write_text(json.dumps(cache, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def fetch_archive(url, cache_entry=None, session=None, chunk_size=1 << 20):
+    """Stream a zip archive into memory with a conditional request.
+
+    Returns ``(data, entry)`` where ``data`` is the archive bytes, or ``None``
+    when the server answers 304 or the content hash is unchanged, and
+    ``entry`` is the updated cache entry (etag, last_modified, sha256).
+    """
+    cache_entry = cache_entry or {}
+    headers = dict(DOWNLOAD_HEADERS)
+    if cache_entry.get("etag"):
+        headers["If-None-Match"] = cache_entry["etag"]
+    if cache_entry.get("last_modified"):
+        headers["If-Modified-Since"] = cache_entry["last_modified"]
+
+    http = session or requests
+    with http.get(url, headers=headers, stream=True, timeout=60) as response:
+        if response.status_code == 304:
+            print(f"{url} not modified since last download")
+            return None, cache_entry
+        response.raise_for_status()
+
+        buffer = io.BytesIO()
+        digest = hashlib.sha256()
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            buffer.write(chunk)
+            digest.update(chunk)
+
+        entry = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": digest.hexdigest(),
+        }
+
+    if entry["sha256"] == cache_entry.get("sha256"):
+        print(f"{url} content unchanged since last download")
+        return None, entry
+    print(f"Downloaded {url} ({buffer.tell() / 1e6:.1f} MB)")
+    return buffer.getvalue(), entry
+
+
+def fetch_archives(urls, cache=None):
+    """Fetch several archives concurrently.
+
+    Returns ``(archives, cache)``: unchanged archives map to ``None`` and the
+    returned cache holds the new entries. Save it with ``save_http_cache``
+    only once the archives have been ingested successfully.
+    """
+    cache = dict(cache or {})
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        futures = {url: executor.submit(fetch_archive, url, cache.get(url)) for url in urls}
+        results = {url: future.result() for url, future in futures.items()}
+
+    archives = {}
+    for url, (data, entry) in results.items():
+        archives[url] = data
+        cache[url] = entry
+    return archives, cache
+
+
 def main():
     # Get the current script's directory and set up the downloaded_data directory
     script_dir = Path(__file__).parent
     download_dir = script_dir / "downloaded_data"
     download_dir.mkdir(exist_ok=True)
-    
+
     # Create separate directories for national and state data
     national_dir = download_dir / "national"
     state_dir = download_dir / "state"
-    
-    # URLs to download
-    url_names = "https://www.ssa.gov/oact/babynames/names.zip"
-    url_namesbystate = "https://www.ssa.gov/oact/babynames/state/namesbystate.zip"
-    
+
     print("Starting download and extraction process.")
-    
+
     # Download and extract national data
     print("\nProcessing national data...")
-    download_and_extract(url_names, str(national_dir))
-    
+    download_and_extract(URL_NAMES, str(national_dir))
+
     # Download and extract state data
     print("\nProcessing state data...")
-    download_and_extract(url_namesbystate, str(state_dir))
-    
+    download_and_extract(URL_NAMES_BY_STATE, str(state_dir))
+
     # Move README files to the root download directory
     for file in national_dir.glob("*ReadMe.pdf"):
         file.rename(download_dir / file.name)
     for file in state_dir.glob("*ReadMe.pdf"):
         file.rename(download_dir / file.name)
-    
+
     print("\nAll files downloaded and extracted successfully.")
 
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
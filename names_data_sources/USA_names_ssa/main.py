@@ -2,14 +2,24 @@ import os
 import subprocess
 import sys
 import argparse
+from datetime import datetime
 from pathlib import Path
 
-def run_script(script_path):
-    """Run a Python script and check for successful execution."""
+PROFILE_RUNNER = Path(__file__).resolve().parent.parent / "profile_phase.py"
+
+def run_script(script_path, args=None, profile=None):
+    """Run a Python script and check for successful execution.
+
+    With ``profile`` (a list of profile_phase.py options) the script runs
+    under the profiler and its resource usage is appended to the report.
+    """
     print(f"\nExecuting {script_path}...")
+    cmd = [sys.executable, str(script_path), *(args or [])]
+    if profile is not None:
+        cmd = [sys.executable, str(PROFILE_RUNNER), *profile, *cmd[1:]]
     try:
         # Using sys.executable ensures we use the same Python interpreter (with uv)
-        result = subprocess.run([sys.executable, script_path], check=True)
+        result = subprocess.run(cmd, check=True)
         print(f"Successfully completed {script_path}")
         return True
     except subprocess.CalledProcessError as e:
@@ -25,6 +35,19 @@ def main():
                        help='Only download data, skip conversion')
     parser.add_argument('--convert-only', action='store_true', 
                        help='Only convert existing data to parquet')
+    parser.add_argument('--direct', action='store_true',
+                       help='Stream the zip archives and convert them in memory, '
+                            'without writing downloaded_data/ (skips unchanged archives)')
+    parser.add_argument('--force', action='store_true',
+                       help='With --direct, re-download even if the archives are unchanged')
+    parser.add_argument('--skip-aggregates', action='store_true',
+                       help='Do not refresh the aggregate tables after conversion')
+    parser.add_argument('--profile', action='store_true',
+                       help='Record wall/CPU time, peak RSS, rows and bytes per step in a JSON report')
+    parser.add_argument('--profile-report', type=Path,
+                       help='Report path for --profile (default: output_data/profiles/profile_<timestamp>.json)')
+    parser.add_argument('--cprofile-dir', type=Path,
+                       help='With --profile, also dump a cProfile .prof file per step into this directory')
     args = parser.parse_args()
     
     # Get the absolute path to the current directory
@@ -33,15 +56,30 @@ def main():
     # Define paths to scripts
     download_script = current_dir / "download_SSA_names.py"
     convert_script = current_dir / "convert_to_parquet.py"
+    aggregates_script = current_dir / "build_aggregates.py"
+    
+    profile = None
+    if args.profile:
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        report = args.profile_report or current_dir / 'output_data' / 'profiles' / f'profile_{stamp}.json'
+        profile = ['--report', str(report)]
+        if args.cprofile_dir:
+            profile += ['--cprofile-dir', str(args.cprofile_dir)]
     
     print("Starting USA SSA names data processing pipeline...")
     print("=" * 60)
     
     # Handle different execution modes
-    should_download = not args.skip_download and not args.convert_only
-    should_convert = not args.download_only
+    should_download = not args.skip_download and not args.convert_only and not args.direct
+    should_convert = not args.download_only and not args.direct
     
-    if args.convert_only:
+    if args.direct:
+        print("Running direct in-memory ingestion (--direct flag).")
+        convert_args = ['--direct'] + (['--force'] if args.force else [])
+        if not run_script(convert_script, convert_args, profile=profile):
+            print("Failed to ingest data.")
+            sys.exit(1)
+    elif args.convert_only:
         print("Running conversion only (--convert-only flag).")
     elif args.skip_download:
         print("Skipping download (--skip-download flag).")
@@ -54,7 +92,7 @@ def main():
     if should_download:
         print(f"\nNote: Download may fail due to SSA website restrictions.")
         print("Use --skip-download if you already have the data.")
-        if not run_script(download_script):
+        if not run_script(download_script, profile=profile):
             print("Failed to download data.")
             if not args.download_only:
                 print("Continuing with conversion using existing data...")
@@ -71,19 +109,30 @@ def main():
             print("Please run with download first or check the downloaded_data directory.")
             sys.exit(1)
             
-        if not run_script(convert_script):
+        if not run_script(convert_script, profile=profile):
             print("Failed to convert data to parquet.")
             sys.exit(1)
     
+    # Refresh aggregate tables after any conversion
+    if (should_convert or args.direct) and not args.skip_aggregates:
+        if not run_script(aggregates_script, profile=profile):
+            print("Failed to build aggregate tables.")
+            sys.exit(1)
+    
     print("\n" + "=" * 60)
     print("USA SSA names data processing pipeline completed!")
     
-    # Show output files
+    # Show output datasets
     output_dir = current_dir / "output_data"
     if output_dir.exists():
-        print(f"Output files:")
-        for file in output_dir.glob("*.parquet"):
-            print(f"  - {file}")
+        print(f"Output datasets:")
+        for dataset_dir in sorted(output_dir.iterdir()):
+            if dataset_dir.is_dir():
+                partitions = len(list(dataset_dir.rglob("*.parquet")))
+                print(f"  - {dataset_dir} ({partitions} partitions)")
+    
+    if profile is not None and report.exists():
+        subprocess.run([sys.executable, str(PROFILE_RUNNER), '--summary', str(report)], check=False)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,266 @@
+"""Hive-partitioned Parquet layout for the SSA names data.
+
+Layout under ``output_data/``::
+
+    names_database/year=1880/data.parquet
+    names_database/_manifest.json
+    state_names_database/state=AK/year=1910/data.parquet
+    state_names_database/_manifest.json
+    names_by_name.parquet
+    state_names_by_name.parquet
+    aggregates/yearly_ranks/year=1880/data.parquet
+    aggregates/state_shares/year=1910/data.parquet
+    aggregates/name_totals.parquet
+    aggregates/year_totals.parquet
+
+Partition columns live in the directory names, not in the files. Each
+manifest records the ingested source files (name, size, sha256) and the
+partitions they produced (with a content hash and row count), so a refresh
+only rewrites partitions whose source data changed. The aggregate tables are
+built from these datasets by ``build_aggregates.py``.
+
+Every file is sorted by ``SORT_COLUMNS`` and written with small row groups and
+min/max statistics, with ``sex`` stored as an Enum. The ``*_by_name.parquet``
+files hold a whole dataset in one name-sorted file, so a single-name lookup
+reads one or two row groups instead of every partition.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import polars as pl
+
+OUTPUT_DIR = Path(__file__).parent / 'output_data'
+NATIONAL_DATASET_DIR = OUTPUT_DIR / 'names_database'
+STATE_DATASET_DIR = OUTPUT_DIR / 'state_names_database'
+AGGREGATES_DIR = OUTPUT_DIR / 'aggregates'
+YEARLY_RANKS_DIR = AGGREGATES_DIR / 'yearly_ranks'
+STATE_SHARES_DIR = AGGREGATES_DIR / 'state_shares'
+NAME_TOTALS_FILE = AGGREGATES_DIR / 'name_totals.parquet'
+YEAR_TOTALS_FILE = AGGREGATES_DIR / 'year_totals.parquet'
+NATIONAL_LOOKUP_FILE = OUTPUT_DIR / 'names_by_name.parquet'
+STATE_LOOKUP_FILE = OUTPUT_DIR / 'state_names_by_name.parquet'
+MANIFEST_FILENAME = '_manifest.json'
+PARTITION_FILENAME = 'data.parquet'
+
+# Bump when the file layout changes so that existing outputs get rewritten.
+LAYOUT_VERSION = 2
+
+# Rows are sorted by these columns (when present) so that Parquet min/max
+# statistics let a single-name lookup skip almost every row group.
+SORT_COLUMNS = ['name', 'sex', 'state', 'year']
+ROW_GROUP_SIZE = 16_384
+SEX_DTYPE = pl.Enum(['F', 'M'])
+
+NATIONAL_COLUMNS = ['name', 'sex', 'count', 'year']
+STATE_COLUMNS = ['state', 'sex', 'year', 'name', 'count']
+YEARLY_RANK_COLUMNS = ['name', 'sex', 'year', 'count', 'rank', 'share']
+STATE_SHARE_COLUMNS = ['state', 'name', 'sex', 'year', 'count', 'rank', 'share', 'name_share']
+COLUMN_DTYPES = {
+    'state': pl.Utf8,
+    'sex': SEX_DTYPE,
+    'year': pl.Int32,
+    'name': pl.Utf8,
+    'count': pl.Int32,
+    'rank': pl.Int32,
+    'share': pl.Float64,
+    'name_share': pl.Float64,
+}
+HIVE_COLUMNS = ['state', 'year']
+
+
+def bytes_sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def frame_sha256(df):
+    """Content hash of a DataFrame (row order sensitive, stable across runs)."""
+    return bytes_sha256(df.write_csv().encode('utf-8'))
+
+
+def is_current(manifest):
+    """Whether a manifest's outputs were written with the current layout."""
+    return manifest.get('layout_version') == LAYOUT_VERSION
+
+
+def load_manifest(dataset_dir):
+    path = Path(dataset_dir) / MANIFEST_FILENAME
+    if not path.exists():
+        return {'sources': {}, 'partitions': {}}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_manifest(dataset_dir, manifest):
+    path = Path(dataset_dir) / MANIFEST_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    manifest['layout_version'] = LAYOUT_VERSION
+    tmp_path = path.with_suffix('.json.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def partition_key(**keys):
+    """Relative partition directory, e.g. ``state=CA/year=1910``."""
+    return '/'.join(f'{column}={value}' for column, value in keys.items())
+
+
+def partition_file(dataset_dir, key):
+    return Path(dataset_dir) / key / PARTITION_FILENAME
+
+
+def to_storage_layout(frame):
+    """Sort rows for lookups and store `sex` as an Enum (dictionary-encoded)."""
+    columns = frame.collect_schema().names()
+    if 'sex' in columns:
+        frame = frame.with_columns(pl.col('sex').cast(SEX_DTYPE))
+    return frame.sort([column for column in SORT_COLUMNS if column in columns])
+
+
+def _write_parquet(frame, path):
+    """Write `frame` atomically in the storage layout; LazyFrames are streamed."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.parquet.tmp')
+    frame = to_storage_layout(frame)
+    options = {'compression': 'zstd', 'statistics': True, 'row_group_size': ROW_GROUP_SIZE}
+    if isinstance(frame, pl.LazyFrame):
+        frame.sink_parquet(tmp_path, **options)
+    else:
+        frame.write_parquet(tmp_path, **options)
+    os.replace(tmp_path, path)
+
+
+def write_table(frame, path):
+    """Write a standalone table (e.g. an aggregate or lookup file) atomically."""
+    _write_parquet(frame, Path(path))
+    return pl.scan_parquet(path).select(pl.len()).collect().item()
+
+
+def write_partition(frame, dataset_dir, key, partition_columns):
+    """Write one partition atomically, dropping the columns encoded in its path.
+
+    ``frame`` may be a DataFrame or a LazyFrame; LazyFrames are streamed.
+    Returns the number of rows written.
+    """
+    return write_table(frame.drop(partition_columns), partition_file(dataset_dir, key))
+
+
+def remove_partition(dataset_dir, key):
+    partition_dir = Path(dataset_dir) / key
+    if partition_dir.exists():
+        shutil.rmtree(partition_dir)
+    # Drop now-empty parent directories (e.g. ``state=XX``).
+    parent = partition_dir.parent
+    while parent != Path(dataset_dir) and parent.exists() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+def _parse_key(key):
+    return dict(part.split('=', 1) for part in key.split('/'))
+
+
+def partition_files(dataset_dir, years=None, states=None):
+    """Partition files matching the optional year range and state filters.
+
+    ``years`` is an inclusive ``(start, end)`` tuple; either bound may be ``None``.
+    """
+    manifest = load_manifest(dataset_dir)
+    start, end = years if years else (None, None)
+    wanted_states = {state.upper() for state in states} if states else None
+
+    files = []
+    for key in sorted(manifest['partitions']):
+        values = _parse_key(key)
+        year = int(values['year'])
+        if start is not None and year < start:
+            continue
+        if end is not None and year > end:
+            continue
+        if wanted_states is not None and values.get('state') not in wanted_states:
+            continue
+        files.append(partition_file(dataset_dir, key))
+    return files
+
+
+def scan_dataset(dataset_dir, years=None, states=None, columns=None):
+    """Lazily scan only the partitions needed for the given years/states.
+
+    `columns` defaults to the national or state column order, depending on
+    the dataset; pass it explicitly for other partitioned datasets.
+    """
+    dataset_dir = Path(dataset_dir)
+    files = partition_files(dataset_dir, years=years, states=states)
+    if columns is None:
+        columns = STATE_COLUMNS if dataset_dir.name == STATE_DATASET_DIR.name else NATIONAL_COLUMNS
+    if not files:
+        return pl.LazyFrame(schema={column: COLUMN_DTYPES[column] for column in columns})
+    key = files[0].parent.relative_to(dataset_dir).as_posix()
+    hive_schema = {column: COLUMN_DTYPES[column] for column in _parse_key(key)}
+    return pl.scan_parquet(
+        files,
+        hive_partitioning=True,
+        hive_schema=hive_schema,
+    ).select(columns)
+
+
+def scan_national(years=None):
+    return scan_dataset(NATIONAL_DATASET_DIR, years=years)
+
+
+def scan_state(years=None, states=None):
+    return scan_dataset(STATE_DATASET_DIR, years=years, states=states)
+
+
+def scan_yearly_ranks(years=None):
+    """Per-year national rank and share of each name within its sex."""
+    return scan_dataset(YEARLY_RANKS_DIR, years=years, columns=YEARLY_RANK_COLUMNS)
+
+
+def scan_state_shares(years=None, states=None):
+    """Per-state, per-year rank and shares of each name."""
+    frame = scan_dataset(STATE_SHARES_DIR, years=years, columns=STATE_SHARE_COLUMNS)
+    if states:
+        frame = frame.filter(pl.col('state').is_in([state.upper() for state in states]))
+    return frame
+
+
+def read_name_totals(names=None):
+    """All-time totals per (name, sex); optionally only for `names`."""
+    frame = pl.scan_parquet(NAME_TOTALS_FILE)
+    if names is not None:
+        frame = frame.filter(pl.col('name').is_in(list(names)))
+    return frame.collect()
+
+
+def read_name_history(name, sex=None):
+    """One name's national history from the name-sorted lookup file."""
+    frame = pl.scan_parquet(NATIONAL_LOOKUP_FILE).filter(pl.col('name') == name)
+    if sex is not None:
+        frame = frame.filter(pl.col('sex') == sex)
+    return frame.collect()
+
+
+def read_state_name_history(name, sex=None, states=None):
+    """One name's per-state history from the name-sorted lookup file."""
+    frame = pl.scan_parquet(STATE_LOOKUP_FILE).filter(pl.col('name') == name)
+    if sex is not None:
+        frame = frame.filter(pl.col('sex') == sex)
+    if states:
+        frame = frame.filter(pl.col('state').is_in([state.upper() for state in states]))
+    return frame.collect()
+
+
+def read_year_totals():
+    """Births and distinct names per (year, sex)."""
+    return pl.read_parquet(YEAR_TOTALS_FILE)
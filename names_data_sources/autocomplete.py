@@ -0,0 +1,302 @@
+"""Frequency-ranked prefix autocomplete over INE and SSA names.
+
+Every prefix of every normalized name (``name_keys.normalize_name``) is a node
+that stores its top ``k`` names in advance, ranked by ``Frecuencia`` (INE) or
+total births (SSA). Nodes are kept per source and sex (``F``, ``M`` or both)
+in an open-addressing hash table, so a query hashes the prefix, probes a
+slot and slices at most ``k`` name ids: O(prefix length + k), independent of
+how many names share the prefix.
+
+The index is a single file of 64-byte aligned arrays behind a JSON header;
+``PrefixIndex`` memory-maps it, so opening it costs nothing and only
+the pages a query touches are read.
+
+Usage::
+
+    python -m names_data_sources.autocomplete build
+    python -m names_data_sources.autocomplete query ALE --sex F --source ine
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+
+from names_data_sources.build_lookup_tables import INE_PHASE1_CSV, SSA_NAME_TOTALS, phase_table, read_phase_table
+from names_data_sources.name_keys import normalize_name, normalize_sex
+
+INDEX_PATH = Path(__file__).resolve().parent / "output_data" / "autocomplete.idx"
+MAGIC = b"NAMEPFX1"
+ALIGNMENT = 64
+DEFAULT_TOP_K = 10
+SOURCES = ("ine", "ssa")
+SEXES = ("F", "M", None)
+
+Entry = Tuple[str, Optional[str], int]
+
+
+def _hash(list_id: int, prefix: str) -> int:
+    digest = hashlib.blake2b(prefix.encode("utf-8"), digest_size=8, salt=struct.pack("<Q", list_id)).digest()
+    # Zero marks an empty slot.
+    return int.from_bytes(digest, "little") or 1
+
+
+def _list_id(source: str, sex: Optional[str]) -> int:
+    return SOURCES.index(source) * len(SEXES) + SEXES.index(sex)
+
+
+@dataclass(slots=True)
+class Completion:
+    name: str
+    key: str
+    count: int
+
+
+def ine_entries(base_csv: Path = INE_PHASE1_CSV) -> List[Entry]:
+    frame = read_phase_table(base_csv, "BASE_SCHEMA", columns=["Nombre", "Frecuencia", "Gender"], infer_schema_length=10_000)
+    return [(name, normalize_sex(gender), int(count or 0)) for name, count, gender in frame.iter_rows()]
+
+
+def ssa_entries(name_totals: Path = SSA_NAME_TOTALS) -> List[Entry]:
+    frame = pl.read_parquet(name_totals, columns=["name", "sex", "total_count"])
+    return [(name, str(sex), int(count)) for name, sex, count in frame.iter_rows()]
+
+
+def _write_arrays(path: Path, header: dict, arrays: Dict[str, np.ndarray]) -> None:
+    """Write ``MAGIC``, the JSON header and each array at a 64-byte boundary."""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "length": int(array.size), "offset": offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = {**header, "arrays": layout}
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(MAGIC + struct.pack("<Q", data_start) + header_bytes)
+        for name, array in arrays.items():
+            handle.seek(data_start + layout[name]["offset"])
+            handle.write(np.ascontiguousarray(array).tobytes())
+        handle.truncate(data_start + offset)
+    # Readers that mapped the previous file keep it until they reload.
+    os.replace(tmp_path, path)
+
+
+def _pack_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def build_prefix_index(
+    sources: Dict[str, Iterable[Entry]],
+    path: Path = INDEX_PATH,
+    top_k: int = DEFAULT_TOP_K,
+) -> dict:
+    """Write the index for ``{"ine": entries, "ssa": entries}``; returns the header.
+
+    Entries are ``(name, sex, count)``. Counts of spellings that share a key
+    add up, and the most frequent spelling is shown.
+    """
+    if not 0 < top_k <= 255:
+        raise ValueError("top_k must be between 1 and 255")
+    display: Dict[str, Tuple[str, int]] = {}
+    list_counts: Dict[int, Dict[str, int]] = {}
+    for source, entries in sources.items():
+        for name, sex, count in entries:
+            key = normalize_name(name)
+            if not key:
+                continue
+            if count > display.get(key, ("", -1))[1]:
+                display[key] = (name, count)
+            for list_sex in (sex, None):
+                counts = list_counts.setdefault(_list_id(source, list_sex), {})
+                counts[key] = counts.get(key, 0) + count
+
+    terms = sorted(display)
+    term_ids = {term: term_id for term_id, term in enumerate(terms)}
+
+    nodes: Dict[int, List[int]] = {}
+    for list_id, counts in list_counts.items():
+        # Descending count, so the first ``top_k`` names to reach a node are its best.
+        for key in sorted(counts, key=lambda key: (-counts[key], key)):
+            term_id = term_ids[key]
+            for end in range(len(key) + 1):
+                node = nodes.setdefault(_hash(list_id, key[:end]), [])
+                if len(node) < top_k:
+                    node.append(term_id)
+
+    slots = 1 << max(4, (2 * len(nodes) - 1).bit_length())
+    mask = slots - 1
+    slot_hashes = [0] * slots
+    slot_starts = [0] * slots
+    slot_lengths = [0] * slots
+    entries: List[int] = []
+    for node_hash, members in nodes.items():
+        slot = node_hash & mask
+        while slot_hashes[slot]:
+            slot = (slot + 1) & mask
+        slot_hashes[slot] = node_hash
+        slot_starts[slot] = len(entries)
+        slot_lengths[slot] = len(members)
+        entries.extend(members)
+
+    counts_matrix = np.zeros((len(SOURCES) * len(SEXES), len(terms)), dtype=np.int64)
+    for list_id, counts in list_counts.items():
+        for key, count in counts.items():
+            counts_matrix[list_id, term_ids[key]] = count
+
+    term_offsets, term_bytes = _pack_strings(terms)
+    display_offsets, display_bytes = _pack_strings([display[term][0] for term in terms])
+    header = {"top_k": top_k, "names": len(terms), "nodes": len(nodes), "slots": slots}
+    _write_arrays(
+        path,
+        header,
+        {
+            "slot_hashes": np.array(slot_hashes, dtype=np.uint64),
+            "slot_starts": np.array(slot_starts, dtype=np.uint32),
+            "slot_lengths": np.array(slot_lengths, dtype=np.uint8),
+            "entries": np.array(entries, dtype=np.uint32),
+            "counts": counts_matrix.ravel(),
+            "term_offsets": term_offsets,
+            "term_bytes": term_bytes,
+            "display_offsets": display_offsets,
+            "display_bytes": display_bytes,
+        },
+    )
+    return header
+
+
+class PrefixIndex:
+    """Read-only, memory-mapped view of an index written by ``build_prefix_index``."""
+
+    def __init__(self, path: Path = INDEX_PATH) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not an autocomplete index: {self.path}")
+        (data_start,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        self.header = json.loads(self._map[len(MAGIC) + 8 : data_start].rstrip(b"\0"))
+        self.top_k: int = self.header["top_k"]
+        arrays = {
+            name: np.frombuffer(self._map, dtype=info["dtype"], count=info["length"], offset=data_start + info["offset"])
+            for name, info in self.header["arrays"].items()
+        }
+        self._slot_hashes = arrays["slot_hashes"]
+        self._slot_starts = arrays["slot_starts"]
+        self._slot_lengths = arrays["slot_lengths"]
+        self._entries = arrays["entries"]
+        self._counts = arrays["counts"].reshape(len(SOURCES) * len(SEXES), self.header["names"])
+        self._strings = {
+            "term": (arrays["term_offsets"], arrays["term_bytes"]),
+            "display": (arrays["display_offsets"], arrays["display_bytes"]),
+        }
+        self._mask = self.header["slots"] - 1
+
+    def __len__(self) -> int:
+        return self.header["names"]
+
+    def _string(self, kind: str, term_id: int) -> str:
+        offsets, blob = self._strings[kind]
+        return blob[offsets[term_id] : offsets[term_id + 1]].tobytes().decode("utf-8")
+
+    def complete(
+        self,
+        prefix: str,
+        *,
+        source: str = "ine",
+        sex: Optional[str] = None,
+        k: int = DEFAULT_TOP_K,
+    ) -> List[Completion]:
+        """Top ``k`` names starting with ``prefix``, most frequent first."""
+        if source not in SOURCES:
+            raise ValueError(f"Unsupported source: {source!r} (expected one of {SOURCES})")
+        if not 0 < k <= self.top_k:
+            raise ValueError(f"k must be between 1 and {self.top_k} for this index")
+        list_id = _list_id(source, normalize_sex(sex))
+        key = normalize_name(prefix) or ""
+
+        node_hash = _hash(list_id, key)
+        slot = node_hash & self._mask
+        while True:
+            stored = int(self._slot_hashes[slot])
+            if stored == node_hash:
+                break
+            if stored == 0:
+                return []
+            slot = (slot + 1) & self._mask
+
+        start = int(self._slot_starts[slot])
+        members = self._entries[start : start + min(k, int(self._slot_lengths[slot]))].tolist()
+        counts = self._counts[list_id]
+        completions = [
+            Completion(name=self._string("display", term_id), key=self._string("term", term_id), count=int(counts[term_id]))
+            for term_id in members
+        ]
+        # A 64-bit hash collision would surface names outside the prefix.
+        return [completion for completion in completions if completion.key.startswith(key)]
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or query the name prefix autocomplete index")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help="Index file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the index from the INE phase 1 table and SSA totals")
+    build_parser.add_argument("--base-csv", type=Path, default=INE_PHASE1_CSV, help="INE phase 1 base table (both sexes, compound names)")
+    build_parser.add_argument("--ssa-totals", type=Path, default=SSA_NAME_TOTALS, help="SSA name_totals.parquet")
+    build_parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Names stored per prefix")
+
+    query_parser = subparsers.add_parser("query", help="Complete a prefix")
+    query_parser.add_argument("prefix")
+    query_parser.add_argument("--source", choices=SOURCES, default="ine")
+    query_parser.add_argument("--sex", choices=["F", "M"])
+    query_parser.add_argument("-k", type=int, default=DEFAULT_TOP_K, help="Number of names to return")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        sources: Dict[str, List[Entry]] = {}
+        if phase_table(args.base_csv).exists():
+            sources["ine"] = ine_entries(args.base_csv)
+        if args.ssa_totals.exists():
+            sources["ssa"] = ssa_entries(args.ssa_totals)
+        if not sources:
+            raise SystemExit("Neither the INE phase 1 table nor the SSA name totals were found")
+        started = time.perf_counter()
+        header = build_prefix_index(sources, args.index, args.top_k)
+        print(
+            f"Indexed {header['names']} names ({header['nodes']} prefixes, sources: {', '.join(sources)}) "
+            f"in {time.perf_counter() - started:.1f}s -> {args.index}"
+        )
+        return
+
+    index = PrefixIndex(args.index)
+    started = time.perf_counter()
+    completions = index.complete(args.prefix, source=args.source, sex=args.sex, k=args.k)
+    elapsed_us = (time.perf_counter() - started) * 1e6
+    for completion in completions:
+        print(f"{completion.name:<24} {completion.count:>10}")
+    print(f"({len(completions)} names in {elapsed_us:.0f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Load every pipeline output into one indexed SQLite database.
+
+Each table is built only when its input exists:
+
+- ``ine_names``: the phase 1 base table (every name, both sexes) with the
+  phase 2 metrics joined where phase 2 computed them
+- ``ine_decades``: phase 3 births per decade
+- ``ine_regions``: phase 3 municipality and province shares (``region_type``),
+  from the wide tables or the ``details_regions/`` fact layout
+- ``ine_enrichments``: the phase 4 origin/description/pronunciation fields
+- ``ssa_national`` / ``ssa_state``: the SSA yearly counts
+- ``ssa_totals``: the SSA all-time totals per name
+- ``name_crosswalk``: the INE <-> SSA name crosswalk
+
+Every name table carries ``key`` (``name_keys.normalize_name``) and ``sex``
+(``F``/``M``) and is indexed on them, so INE and SSA rows join on
+``(key, sex)`` without a Python merge. ``build_info`` records the rows and
+source files of every table. The database is written to a temporary file and
+moved into place once complete, so readers never see a half-built file.
+
+Usage::
+
+    python -m names_data_sources.build_analytics_db
+    python -m names_data_sources.build_analytics_db --query \\
+        "SELECT n.name, n.frequency, s.total_count FROM ine_names n
+         JOIN ssa_totals s USING (key, sex) ORDER BY s.total_count DESC LIMIT 10"
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import polars as pl
+
+from names_data_sources.build_lookup_tables import (
+    ENRICHMENT_COLUMNS,
+    INE_BASE_CSV,
+    INE_COLUMNS,
+    INE_DETAILS_DIR,
+    INE_PHASE1_CSV,
+    SSA_NAME_TOTALS,
+    _gender_to_sex,
+    _ine_utils,
+    _with_key,
+    ine_decades_table,
+    latest_enriched_file,
+    phase_table,
+    read_phase_table,
+    read_region_details,
+    ssa_totals_table,
+)
+from names_data_sources.query import SSA_NATIONAL_LOOKUP, SSA_STATE_LOOKUP
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_DB_PATH = BASE_DIR / "output_data" / "names.sqlite"
+NAME_CROSSWALK = BASE_DIR / "Spain_names_ine" / "output_data" / "name_crosswalk.parquet"
+
+INSERT_BATCH_ROWS = 50_000
+
+# Indexes created after the bulk load; every tuple becomes one index.
+TABLE_INDEXES: Dict[str, List[Tuple[str, ...]]] = {
+    "ine_names": [("key", "sex"), ("popularity",)],
+    "ine_decades": [("key", "sex", "year"), ("year",)],
+    "ine_regions": [("key", "sex", "region_type"), ("region_type", "region_id")],
+    "ine_enrichments": [("key", "sex"), ("family_origin",)],
+    "ssa_national": [("key", "sex", "year"), ("year", "sex")],
+    "ssa_state": [("key", "sex", "state", "year"), ("state", "year")],
+    "ssa_totals": [("key", "sex")],
+    "name_crosswalk": [("ine_key", "sex"), ("ssa_key", "sex")],
+}
+
+
+def _sqlite_type(dtype: pl.DataType) -> str:
+    if dtype.is_integer() or dtype == pl.Boolean:
+        return "INTEGER"
+    if dtype.is_float():
+        return "REAL"
+    return "TEXT"
+
+
+def ine_names_table(phase1_csv: Path, phase2_csv: Path) -> pl.DataFrame:
+    """Phase 1 rows with the phase 2 metric columns (null where phase 2 filtered the name out).
+
+    ``phonetic_key`` is computed for every row, not taken from phase 2.
+    """
+    base_source = phase1_csv if phase_table(phase1_csv).exists() else phase2_csv
+    base = read_phase_table(base_source, "BASE_SCHEMA", infer_schema_length=10_000)
+    table = base.select(
+        pl.col("Nombre").alias("name"),
+        _gender_to_sex("Gender"),
+        pl.col("Frecuencia").cast(pl.Int64).alias("frequency"),
+        pl.col("Edad Media (*)").cast(pl.Float64).alias("mean_age"),
+        _ine_utils("phonetic").phonetic_key_expr("Nombre").alias("phonetic_key"),
+    )
+    if base_source != phase2_csv and phase_table(phase2_csv).exists():
+        metrics = read_phase_table(phase2_csv, "PROCESSED_SCHEMA", infer_schema_length=10_000)
+        present = {source: target for source, target in INE_COLUMNS.items() if source in metrics.columns}
+        metrics = metrics.select(
+            *[pl.col(source).alias(target) for source, target in present.items()],
+            _gender_to_sex("Gender"),
+        ).drop("frequency", "mean_age", "phonetic_key", strict=False)
+        table = table.join(metrics.unique(subset=["name", "sex"], keep="first"), on=["name", "sex"], how="left")
+    return _with_key(table.filter(pl.col("sex").is_not_null()), "name")
+
+
+def ine_regions_table(details_dir: Path) -> Optional[pl.DataFrame]:
+    frames = []
+    for kind in ("municipios", "provincias"):
+        regions = read_region_details(details_dir, kind)
+        if regions is None:
+            continue
+        per_mille = pl.when(pl.col("unidad") == "%").then(pl.col("percentage") * 10).otherwise(pl.col("percentage"))
+        frames.append(
+            regions.select(
+                pl.col("nombre").alias("name"),
+                _gender_to_sex(),
+                pl.col("region_type").cast(pl.Utf8),
+                pl.col("region_id").cast(pl.Int32),
+                pl.col("region_name").cast(pl.Utf8),
+                pl.col("parent_region_name").cast(pl.Utf8),
+                per_mille.cast(pl.Float64).alias("per_mille"),
+                pl.col("persons").cast(pl.Int64),
+            )
+        )
+    if not frames:
+        return None
+    return _with_key(pl.concat(frames), "name")
+
+
+def ine_enrichments_table(enriched_csv: Path) -> pl.DataFrame:
+    enriched = read_phase_table(enriched_csv, "ENRICHED_SCHEMA", infer_schema_length=0)
+    present = {source: target for source, target in ENRICHMENT_COLUMNS.items() if source in enriched.columns}
+    table = enriched.select(
+        pl.col("Nombre").alias("name"),
+        _gender_to_sex("Gender"),
+        *[pl.col(source).cast(pl.Utf8).alias(target) for source, target in present.items()],
+    ).unique(subset=["name", "sex"], keep="first")
+    return _with_key(table, "name")
+
+
+def ssa_yearly_table(path: Path) -> pl.DataFrame:
+    frame = pl.read_parquet(path).with_columns(pl.col("sex").cast(pl.Utf8))
+    return _with_key(frame, "name")
+
+
+def name_crosswalk_table(path: Path) -> pl.DataFrame:
+    crosswalk = pl.read_parquet(path).with_columns(pl.col("match_type").cast(pl.Utf8))
+    ine_keys = _with_key(crosswalk.select("ine_name", "sex").unique(), "ine_name").rename({"key": "ine_key"})
+    ssa_keys = _with_key(crosswalk.select("ssa_name", "sex").unique(), "ssa_name").rename({"key": "ssa_key"})
+    return crosswalk.join(ine_keys, on=["ine_name", "sex"], how="left").join(ssa_keys, on=["ssa_name", "sex"], how="left")
+
+
+def collect_tables(enriched_csv: Optional[Path] = None) -> Iterator[Tuple[str, pl.DataFrame, List[str]]]:
+    """Yield ``(name, frame, sources)`` for every table whose inputs exist, one at a time."""
+    if phase_table(INE_PHASE1_CSV).exists() or phase_table(INE_BASE_CSV).exists():
+        sources = [str(phase_table(path)) for path in (INE_PHASE1_CSV, INE_BASE_CSV) if phase_table(path).exists()]
+        yield "ine_names", ine_names_table(INE_PHASE1_CSV, INE_BASE_CSV), sources
+    decades_csv = INE_DETAILS_DIR / "details_decades.csv"
+    if phase_table(decades_csv).exists():
+        yield "ine_decades", ine_decades_table(decades_csv), [str(phase_table(decades_csv))]
+    regions = ine_regions_table(INE_DETAILS_DIR)
+    if regions is not None:
+        yield "ine_regions", regions, [str(INE_DETAILS_DIR)]
+    if enriched_csv is not None and phase_table(enriched_csv).exists():
+        yield "ine_enrichments", ine_enrichments_table(enriched_csv), [str(phase_table(enriched_csv))]
+    if SSA_NATIONAL_LOOKUP.exists():
+        yield "ssa_national", ssa_yearly_table(SSA_NATIONAL_LOOKUP), [str(SSA_NATIONAL_LOOKUP)]
+    if SSA_STATE_LOOKUP.exists():
+        yield "ssa_state", ssa_yearly_table(SSA_STATE_LOOKUP), [str(SSA_STATE_LOOKUP)]
+    if SSA_NAME_TOTALS.exists():
+        yield "ssa_totals", ssa_totals_table(SSA_NAME_TOTALS), [str(SSA_NAME_TOTALS)]
+    if NAME_CROSSWALK.exists():
+        yield "name_crosswalk", name_crosswalk_table(NAME_CROSSWALK), [str(NAME_CROSSWALK)]
+
+
+def load_table(connection: sqlite3.Connection, name: str, frame: pl.DataFrame) -> None:
+    """Create ``name`` from the frame's dtypes, bulk insert its rows and index it."""
+    columns = ", ".join(f'"{column}" {_sqlite_type(dtype)}' for column, dtype in frame.schema.items())
+    connection.execute(f'DROP TABLE IF EXISTS "{name}"')
+    connection.execute(f'CREATE TABLE "{name}" ({columns})')
+    placeholders = ", ".join("?" * frame.width)
+    insert = f'INSERT INTO "{name}" VALUES ({placeholders})'
+    for batch in frame.iter_slices(INSERT_BATCH_ROWS):
+        connection.executemany(insert, batch.iter_rows())
+    # Indexes are cheaper to build once over the loaded rows than to maintain per insert.
+    for columns in TABLE_INDEXES.get(name, []):
+        index_columns = [column for column in columns if column in frame.columns]
+        if index_columns:
+            index_name = f"{name}_{'_'.join(index_columns)}_idx"
+            quoted = ", ".join(f'"{column}"' for column in index_columns)
+            connection.execute(f'CREATE INDEX "{index_name}" ON "{name}" ({quoted})')
+
+
+def build_analytics_db(db_path: Path = DEFAULT_DB_PATH, enriched_csv: Optional[Path] = None) -> Dict[str, dict]:
+    """Build the database next to ``db_path`` and move it into place; returns ``{table: info}``."""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    built: Dict[str, dict] = {}
+    connection = sqlite3.connect(tmp_path)
+    try:
+        # Nothing to recover from if the build dies: the temporary file is discarded.
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute("CREATE TABLE build_info (table_name TEXT PRIMARY KEY, rows INTEGER, sources TEXT, built_at TEXT)")
+        for name, frame, sources in collect_tables(enriched_csv):
+            started = time.perf_counter()
+            with connection:
+                load_table(connection, name, frame)
+                connection.execute(
+                    "INSERT INTO build_info VALUES (?, ?, ?, ?)",
+                    (name, frame.height, ";".join(sources), datetime.now(timezone.utc).isoformat(timespec="seconds")),
+                )
+            built[name] = {"rows": frame.height, "sources": sources, "seconds": time.perf_counter() - started}
+        if not built:
+            raise FileNotFoundError("No INE or SSA outputs found to build the analytics database from")
+        connection.execute("ANALYZE")
+    except BaseException:
+        connection.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    connection.close()
+    os.replace(tmp_path, db_path)
+    return built
+
+
+def run_query(db_path: Path, sql: str, params: Sequence[object] = ()) -> pl.DataFrame:
+    """Run ``sql`` read-only against the database and return the result as a frame."""
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = connection.execute(sql, params)
+        columns = [description[0] for description in cursor.description or []]
+        return pl.DataFrame(cursor.fetchall(), schema=columns, orient="row", infer_schema_length=None)
+    finally:
+        connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load the INE and SSA outputs into one indexed SQLite database")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Database file to write (or query)")
+    parser.add_argument(
+        "--enriched-file",
+        type=Path,
+        help="Phase 4 output to load (default: newest output in 4_data_enrich_names/)",
+    )
+    parser.add_argument("--no-enrichment", action="store_true", help="Do not load phase 4 enrichment fields")
+    parser.add_argument("--query", help="Run a SQL query against an existing database instead of building it")
+    args = parser.parse_args()
+
+    if args.query:
+        with pl.Config(tbl_rows=50, tbl_cols=-1):
+            print(run_query(args.db, args.query))
+        return
+
+    enriched_csv = None if args.no_enrichment else (args.enriched_file or latest_enriched_file())
+    started = time.perf_counter()
+    built = build_analytics_db(args.db, enriched_csv)
+    print(f"Database written to {args.db} ({args.db.stat().st_size / 1024 / 1024:.1f} MB, {time.perf_counter() - started:.1f}s)")
+    for name, info in built.items():
+        print(f"  - {name}: {info['rows']:,} rows ({info['seconds']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
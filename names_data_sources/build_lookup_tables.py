@@ -0,0 +1,295 @@
+"""Consolidate per-name statistics into memory-mappable Arrow tables.
+
+Reads the INE phase 2 base table, the phase 3 decade and province details
+(wide, or rebuilt from the ``details_regions/`` fact layout),
+the phase 4 enrichment output and the SSA name totals (the INE phases write
+Parquet with a CSV export; the Parquet file is read when present), and writes one
+uncompressed Arrow IPC file per source under
+``output_data/lookup/builds/<build_id>/``. Every table carries a ``key`` column
+(``name_keys.normalize_name``) and is sorted by it, so the lookup service can
+index each name as a contiguous row range.
+
+``output_data/lookup/manifest.json`` is replaced atomically once a build is
+complete; the lookup service watches it and hot-swaps to the new build.
+
+Usage::
+
+    python -m names_data_sources.build_lookup_tables
+    python -m names_data_sources.build_lookup_tables --enriched-file path/to/enriched.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import shutil
+import sys
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Optional
+
+import polars as pl
+
+from names_data_sources.name_keys import normalize_name
+
+BASE_DIR = Path(__file__).resolve().parent
+INE_SCRIPTS_DIR = BASE_DIR / "Spain_names_ine"
+INE_OUTPUT_DIR = INE_SCRIPTS_DIR / "output_data"
+INE_PHASE1_CSV = INE_OUTPUT_DIR / "1_data_download_INE_names" / "names_frecuencia_edad_media.csv"
+INE_BASE_CSV = INE_OUTPUT_DIR / "2_data_process_INE_names" / "names_frecuencia_edad_media.csv"
+INE_DETAILS_DIR = INE_OUTPUT_DIR / "3_data_download_INE_names_details" / "details"
+INE_ENRICHED_DIR = INE_OUTPUT_DIR / "4_data_enrich_names"
+SSA_NAME_TOTALS = BASE_DIR / "USA_names_ssa" / "output_data" / "aggregates" / "name_totals.parquet"
+
+LOOKUP_DIR = BASE_DIR / "output_data" / "lookup"
+MANIFEST_FILENAME = "manifest.json"
+KEEP_BUILDS = 3
+
+INE_COLUMNS = {
+    "Nombre": "name",
+    "Frecuencia": "frequency",
+    "Edad Media (*)": "mean_age",
+    "Is_Compound": "is_compound",
+    "Percentage": "percentage",
+    "Popularity": "popularity",
+    "Character_Count": "character_count",
+    "Syllable_Count": "syllable_count",
+    "Phonetic_Key": "phonetic_key",
+}
+ENRICHMENT_COLUMNS = {
+    "Family_Origin": "family_origin",
+    "Name_Description": "description",
+    "Pronunciation_Spanish": "pronunciation_spanish",
+    "Pronunciation_Foreign": "pronunciation_foreign",
+    "Pronunciation_Explanation": "pronunciation_explanation",
+}
+SEX_FROM_GENDER = {"Male": "M", "Female": "F"}
+
+
+def _with_key(frame: pl.DataFrame, column: str) -> pl.DataFrame:
+    """Prepend the normalized ``key`` column and sort by it."""
+    keys = {value: normalize_name(value) for value in frame[column].unique().to_list()}
+    return (
+        frame.select(pl.col(column).replace_strict(keys, return_dtype=pl.Utf8).alias("key"), pl.all())
+        .filter(pl.col("key").is_not_null())
+        .sort(["key", "sex"])
+    )
+
+
+def _gender_to_sex(column: str = "gender") -> pl.Expr:
+    return pl.col(column).replace_strict(SEX_FROM_GENDER, default=None).alias("sex")
+
+
+def _ine_utils(module: str) -> ModuleType:
+    """Import ``utils.<module>`` of the INE phase scripts on first use.
+
+    The phase scripts import ``utils`` as a top-level package from their own
+    directory. It is imported lazily so reading Parquet outputs (the query
+    path) does not pull in pandas and requests.
+    """
+    if str(INE_SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(INE_SCRIPTS_DIR))
+    return importlib.import_module(f"utils.{module}")
+
+
+def phase_table(path: Path) -> Path:
+    """The Parquet sibling of an INE phase output when it exists, else ``path`` (the CSV export).
+
+    Warns, as ``utils.tables.resolve_table`` does, when the CSV export was
+    modified after the Parquet file was written.
+    """
+    parquet = path.with_suffix(".parquet")
+    if not parquet.exists():
+        return path
+    if path.exists() and path.stat().st_mtime_ns > parquet.stat().st_mtime_ns:
+        warnings.warn(f"{path} is newer than {parquet.name}; reading the Parquet file and ignoring the CSV edits", stacklevel=2)
+    return parquet
+
+
+def read_phase_table(path: Path, schema: str, columns: Optional[list[str]] = None, **csv_options) -> pl.DataFrame:
+    """Read an INE phase output with the dtypes of its declared schema.
+
+    ``schema`` names the table's schema in ``utils.tables`` (e.g.
+    ``"PROCESSED_SCHEMA"``). The Parquet file already has those dtypes; the
+    CSV fallback is parsed with ``csv_options`` and then cast to the schema.
+    """
+    source = phase_table(path)
+    if source.suffix == ".parquet":
+        return pl.read_parquet(source, columns=columns)
+    tables = _ine_utils("tables")
+    frame = pl.read_csv(source, columns=columns, **csv_options)
+    return tables.cast_to_schema(frame, getattr(tables, schema))
+
+
+def latest_enriched_file(enriched_dir: Path = INE_ENRICHED_DIR) -> Optional[Path]:
+    """Most recently written phase 4 CSV, if any."""
+    candidates = sorted(enriched_dir.glob("*.csv"), key=lambda path: path.stat().st_mtime) if enriched_dir.exists() else []
+    return candidates[-1] if candidates else None
+
+
+def ine_names_table(base_csv: Path, enriched_csv: Optional[Path] = None) -> pl.DataFrame:
+    base = read_phase_table(base_csv, "PROCESSED_SCHEMA", infer_schema_length=10_000)
+    table = base.select(
+        *[pl.col(source).alias(target) for source, target in INE_COLUMNS.items() if source in base.columns],
+        _gender_to_sex("Gender"),
+    )
+    if enriched_csv is not None:
+        enriched = read_phase_table(enriched_csv, "ENRICHED_SCHEMA", infer_schema_length=0)
+        present = {source: target for source, target in ENRICHMENT_COLUMNS.items() if source in enriched.columns}
+        enrichment = enriched.select(
+            pl.col("Nombre").alias("name"),
+            _gender_to_sex("Gender"),
+            *[pl.col(source).alias(target) for source, target in present.items()],
+        ).unique(subset=["name", "sex"], keep="first")
+        table = table.join(enrichment, on=["name", "sex"], how="left")
+    return _with_key(table, "name")
+
+
+def ine_decades_table(decades_csv: Path) -> pl.DataFrame:
+    decades = read_phase_table(decades_csv, "DECADES_SCHEMA")
+    first_year = pl.col("decade").str.extract(r"(\d{4})", 1).cast(pl.Int32)
+    table = decades.select(
+        pl.col("nombre").alias("name"),
+        _gender_to_sex(),
+        "decade",
+        pl.when(pl.col("decade").str.starts_with("<")).then(None).otherwise(first_year).alias("year"),
+        "persons",
+    )
+    return _with_key(table, "name").sort(["key", "sex", "year"], nulls_last=False)
+
+
+def region_details_source(details_dir: Path, kind: str) -> Optional[Path]:
+    """Phase 3 output holding the ``kind`` region details: the wide table or the ``details_regions/`` facts."""
+    wide = phase_table(details_dir / f"details_{kind}.csv")
+    if wide.exists():
+        return wide
+    facts_dir = details_dir / "details_regions"
+    if (facts_dir / f"{kind}.parquet").exists():
+        return facts_dir
+    return None
+
+
+def read_region_details(details_dir: Path, kind: str) -> Optional[pl.DataFrame]:
+    """Wide ``details_<kind>`` table (``kind`` is ``municipios`` or ``provincias``), or ``None`` if phase 3 wrote none.
+
+    With ``--region-layout facts`` phase 3 writes ``details_regions/``
+    instead; the wide view is then rebuilt with
+    ``utils.region_facts.load_region_details``.
+    """
+    source = region_details_source(details_dir, kind)
+    if source is None:
+        return None
+    if source.is_file():
+        return read_phase_table(source, "REGIONS_SCHEMA", infer_schema_length=10_000)
+    return _ine_utils("region_facts").load_region_details(source, kind)
+
+
+def ine_provinces_table(provinces: pl.DataFrame) -> pl.DataFrame:
+    per_mille = pl.when(pl.col("unidad") == "%").then(pl.col("percentage") * 10).otherwise(pl.col("percentage"))
+    table = provinces.select(
+        pl.col("nombre").alias("name"),
+        _gender_to_sex(),
+        pl.col("region_id").alias("province_id"),
+        pl.col("region_name").alias("province"),
+        per_mille.alias("per_mille"),
+        pl.col("persons").cast(pl.Int64),
+    )
+    return _with_key(table, "name").sort(["key", "sex", "persons"], descending=[False, False, True])
+
+
+def ssa_totals_table(name_totals: Path) -> pl.DataFrame:
+    totals = pl.read_parquet(name_totals).with_columns(pl.col("sex").cast(pl.Utf8))
+    return _with_key(totals, "name")
+
+
+def collect_tables(enriched_csv: Optional[Path] = None) -> Dict[str, tuple[pl.DataFrame, list[str]]]:
+    """Build every table whose inputs exist; returns ``{name: (frame, sources)}``."""
+    tables: Dict[str, tuple[pl.DataFrame, list[str]]] = {}
+    if phase_table(INE_BASE_CSV).exists():
+        sources = [str(phase_table(INE_BASE_CSV))] + ([str(phase_table(enriched_csv))] if enriched_csv else [])
+        tables["ine_names"] = (ine_names_table(INE_BASE_CSV, enriched_csv), sources)
+    decades_csv = INE_DETAILS_DIR / "details_decades.csv"
+    if phase_table(decades_csv).exists():
+        tables["ine_decades"] = (ine_decades_table(decades_csv), [str(phase_table(decades_csv))])
+    provinces = read_region_details(INE_DETAILS_DIR, "provincias")
+    if provinces is not None:
+        sources = [str(region_details_source(INE_DETAILS_DIR, "provincias"))]
+        tables["ine_provinces"] = (ine_provinces_table(provinces), sources)
+    if SSA_NAME_TOTALS.exists():
+        tables["ssa_totals"] = (ssa_totals_table(SSA_NAME_TOTALS), [str(SSA_NAME_TOTALS)])
+    return tables
+
+
+def load_manifest(lookup_dir: Path = LOOKUP_DIR) -> Optional[dict]:
+    path = lookup_dir / MANIFEST_FILENAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _prune_builds(lookup_dir: Path, keep: int) -> None:
+    builds = sorted((lookup_dir / "builds").iterdir(), key=lambda path: path.name)
+    # Readers that still map an older build keep their pages after unlinking.
+    for stale in builds[:-keep]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def build_lookup_tables(
+    lookup_dir: Path = LOOKUP_DIR,
+    enriched_csv: Optional[Path] = None,
+    keep_builds: int = KEEP_BUILDS,
+) -> dict:
+    """Write a new build and atomically point the manifest at it."""
+    tables = collect_tables(enriched_csv)
+    if not tables:
+        raise FileNotFoundError("No phase 2-4 or SSA outputs found to build lookup tables from")
+
+    build_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    build_dir = lookup_dir / "builds" / build_id
+    build_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {"build_id": build_id, "created_at": datetime.now(timezone.utc).isoformat(), "tables": {}}
+    for name, (frame, sources) in tables.items():
+        path = build_dir / f"{name}.arrow"
+        # Uncompressed so the service can memory-map the columns directly.
+        frame.write_ipc(path, compression="uncompressed")
+        manifest["tables"][name] = {
+            "file": path.relative_to(lookup_dir).as_posix(),
+            "rows": frame.height,
+            "keys": frame["key"].n_unique(),
+            "sources": sources,
+        }
+
+    manifest_path = lookup_dir / MANIFEST_FILENAME
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, manifest_path)
+    _prune_builds(lookup_dir, keep_builds)
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build memory-mappable lookup tables for the lookup service")
+    parser.add_argument("--lookup-dir", type=Path, default=LOOKUP_DIR, help="Output directory for builds and manifest")
+    parser.add_argument(
+        "--enriched-file",
+        type=Path,
+        help="Phase 4 output to join (default: newest CSV in 4_data_enrich_names/)",
+    )
+    parser.add_argument("--no-enrichment", action="store_true", help="Do not join phase 4 enrichment fields")
+    parser.add_argument("--keep-builds", type=int, default=KEEP_BUILDS, help="Number of builds to keep on disk")
+    args = parser.parse_args()
+
+    enriched_csv = None if args.no_enrichment else (args.enriched_file or latest_enriched_file())
+    manifest = build_lookup_tables(args.lookup_dir, enriched_csv, args.keep_builds)
+    print(f"Build {manifest['build_id']} written to {args.lookup_dir}")
+    for name, info in manifest["tables"].items():
+        print(f"  - {name}: {info['rows']} rows, {info['keys']} names")
+
+
+if __name__ == "__main__":
+    main()
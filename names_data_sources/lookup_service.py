@@ -0,0 +1,299 @@
+"""Asyncio HTTP service answering per-name statistics from the lookup build.
+
+Tables written by ``build_lookup_tables.py`` are uncompressed Arrow IPC files,
+which polars memory-maps instead of parsing; each is sorted by ``key`` so a
+name resolves through an in-memory hash index to one contiguous row range.
+The service polls ``manifest.json`` and swaps in a new build without a
+restart; requests in flight keep using the snapshot they started with.
+
+Endpoints:
+
+- ``GET /names/<name>``: statistics for one name (404 when unknown)
+- ``GET /names?name=A&name=B`` or ``POST /names`` with ``{"names": [...]}``:
+  batched lookups, results in request order
+- ``GET /complete?prefix=ALE&sex=F&source=ine&k=10``: most frequent names
+  starting with a prefix, from the index written by ``autocomplete build``
+- ``GET /health``: current build id and table sizes
+
+Usage::
+
+    python -m names_data_sources.lookup_service --port 8090
+    curl http://127.0.0.1:8090/names/Jose
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import polars as pl
+
+from names_data_sources.autocomplete import INDEX_PATH as AUTOCOMPLETE_INDEX
+from names_data_sources.autocomplete import PrefixIndex
+from names_data_sources.build_lookup_tables import LOOKUP_DIR, MANIFEST_FILENAME
+from names_data_sources.name_keys import normalize_name
+
+MAX_BATCH = 1000
+MAX_BODY_BYTES = 1 << 20
+RELOAD_INTERVAL_S = 2.0
+
+
+@dataclass(slots=True)
+class LookupTable:
+    frame: pl.DataFrame
+    index: Dict[str, Tuple[int, int]]
+
+    @classmethod
+    def load(cls, path: Path) -> "LookupTable":
+        frame = pl.read_ipc(path)
+        spans = (
+            frame.select("key")
+            .with_row_index("start")
+            .group_by("key", maintain_order=True)
+            .agg(pl.col("start").first(), pl.len().alias("length"))
+        )
+        index = {key: (start, length) for key, start, length in spans.iter_rows()}
+        return cls(frame=frame.drop("key"), index=index)
+
+    def rows(self, key: str) -> List[dict]:
+        span = self.index.get(key)
+        if span is None:
+            return []
+        return self.frame.slice(*span).to_dicts()
+
+
+@dataclass(slots=True)
+class LookupSnapshot:
+    build_id: str
+    manifest_mtime_ns: int
+    tables: Dict[str, LookupTable]
+
+    @classmethod
+    def load(cls, lookup_dir: Path) -> "LookupSnapshot":
+        manifest_path = lookup_dir / MANIFEST_FILENAME
+        mtime_ns = manifest_path.stat().st_mtime_ns
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        tables = {name: LookupTable.load(lookup_dir / info["file"]) for name, info in manifest["tables"].items()}
+        return cls(build_id=manifest["build_id"], manifest_mtime_ns=mtime_ns, tables=tables)
+
+    def lookup(self, name: str) -> dict:
+        key = normalize_name(name)
+        result: dict = {"query": name, "key": key, "found": False}
+        for table_name, table in self.tables.items():
+            rows = table.rows(key) if key else []
+            result[table_name] = rows
+            result["found"] = result["found"] or bool(rows)
+        return result
+
+    def describe(self) -> dict:
+        return {
+            "build_id": self.build_id,
+            "tables": {name: {"rows": table.frame.height, "names": len(table.index)} for name, table in self.tables.items()},
+        }
+
+
+class LookupService:
+    def __init__(
+        self,
+        lookup_dir: Path = LOOKUP_DIR,
+        reload_interval: float = RELOAD_INTERVAL_S,
+        autocomplete_index: Path = AUTOCOMPLETE_INDEX,
+    ) -> None:
+        self.lookup_dir = Path(lookup_dir)
+        self.reload_interval = reload_interval
+        self.snapshot = LookupSnapshot.load(self.lookup_dir)
+        self.autocomplete_index = Path(autocomplete_index)
+        self.autocomplete: Optional[PrefixIndex] = None
+        self.autocomplete_mtime_ns = 0
+        self._reload_autocomplete()
+        self.requests_served = 0
+
+    def _reload_autocomplete(self) -> None:
+        """Map the autocomplete index again if it was rebuilt (it is optional)."""
+        try:
+            mtime_ns = self.autocomplete_index.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime_ns != self.autocomplete_mtime_ns:
+            self.autocomplete = PrefixIndex(self.autocomplete_index)
+            self.autocomplete_mtime_ns = mtime_ns
+
+    async def watch_manifest(self) -> None:
+        """Reload in a worker thread whenever the manifest is replaced."""
+        manifest_path = self.lookup_dir / MANIFEST_FILENAME
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                self._reload_autocomplete()
+            except (OSError, ValueError) as exc:
+                print(f"Autocomplete reload failed, keeping the current index: {exc}")
+            try:
+                mtime_ns = manifest_path.stat().st_mtime_ns
+                if mtime_ns == self.snapshot.manifest_mtime_ns:
+                    continue
+                snapshot = await asyncio.to_thread(LookupSnapshot.load, self.lookup_dir)
+            except (OSError, ValueError, KeyError, pl.exceptions.PolarsError) as exc:
+                print(f"Reload failed, keeping build {self.snapshot.build_id}: {exc}")
+                continue
+            self.snapshot = snapshot
+            print(f"Loaded build {snapshot.build_id}")
+
+    def route(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, dict]:
+        snapshot = self.snapshot
+        url = urlsplit(target)
+        if url.path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok", "requests_served": self.requests_served, **snapshot.describe()}
+
+        if url.path == "/complete" and method == "GET":
+            return self.complete(parse_qs(url.query))
+
+        if url.path.startswith("/names/") and method == "GET":
+            result = snapshot.lookup(unquote(url.path[len("/names/"):]))
+            return (HTTPStatus.OK if result["found"] else HTTPStatus.NOT_FOUND), result
+
+        if url.path == "/names":
+            if method == "GET":
+                names = parse_qs(url.query).get("name", [])
+            elif method == "POST":
+                try:
+                    names = json.loads(body or b"{}").get("names", [])
+                except (ValueError, AttributeError):
+                    return HTTPStatus.BAD_REQUEST, {"error": 'Expected a JSON body like {"names": [...]}'}
+            else:
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} not allowed"}
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                return HTTPStatus.BAD_REQUEST, {"error": "names must be a list of strings"}
+            if len(names) > MAX_BATCH:
+                return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": f"At most {MAX_BATCH} names per request"}
+            return HTTPStatus.OK, {"build_id": snapshot.build_id, "results": [snapshot.lookup(name) for name in names]}
+
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {url.path}"}
+
+    def complete(self, query: Dict[str, List[str]]) -> Tuple[HTTPStatus, dict]:
+        index = self.autocomplete
+        if index is None:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Autocomplete index not built"}
+        prefix = query.get("prefix", [""])[0]
+        try:
+            completions = index.complete(
+                prefix,
+                source=query.get("source", ["ine"])[0],
+                sex=query.get("sex", [None])[0],
+                k=int(query.get("k", [index.top_k])[0]),
+            )
+        except ValueError as exc:
+            return HTTPStatus.BAD_REQUEST, {"error": str(exc)}
+        return HTTPStatus.OK, {"prefix": prefix, "results": [asdict(completion) for completion in completions]}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection, honouring keep-alive."""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                started = time.perf_counter()
+                status, payload = self.route(method, target, body)
+                self.requests_served += 1
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._write_response(writer, status, payload, keep_alive, time.perf_counter() - started)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as exc:
+            await self._write_response(writer, HTTPStatus.BAD_REQUEST, {"error": str(exc)}, False, 0.0)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[tuple]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise ValueError("Malformed request line") from None
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, version.upper(), headers, body
+
+    @staticmethod
+    async def _write_response(
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        payload: dict,
+        keep_alive: bool,
+        elapsed_s: float,
+    ) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"X-Lookup-Time-Us: {elapsed_s * 1e6:.0f}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        watcher = asyncio.create_task(self.watch_manifest())
+        print(f"Serving build {self.snapshot.build_id} on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve per-name statistics from the lookup build")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--lookup-dir", type=Path, default=LOOKUP_DIR, help="Directory holding manifest.json")
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=RELOAD_INTERVAL_S,
+        help="Seconds between manifest checks for hot reload",
+    )
+    parser.add_argument(
+        "--autocomplete-index",
+        type=Path,
+        default=AUTOCOMPLETE_INDEX,
+        help="Prefix index served on /complete (optional)",
+    )
+    args = parser.parse_args()
+
+    service = LookupService(args.lookup_dir, reload_interval=args.reload_interval, autocomplete_index=args.autocomplete_index)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Name normalization shared by the lookup tables and indexes.
+
+``normalize_name`` folds a raw label into the key every index is built on: accents
+and other combining marks are stripped, the result is upper-cased and any run
+of non-alphanumeric characters collapses into one space. "José María",
+"JOSE MARIA" and "jose-maria" therefore all map to ``"JOSE MARIA"``; SSA's
+"Mckenzie" maps to ``"MCKENZIE"``. The rules match the municipality/province
+normalization in ``Spain_names_ine/utils/population_lookup.py``.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Optional
+
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]+")
+
+SEX_CODES = {"F": "F", "M": "M", "FEMALE": "F", "MALE": "M"}
+
+
+def normalize_name(label: Optional[str]) -> Optional[str]:
+    if label is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", label.strip())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    normalized = _NON_ALNUM_RE.sub(" ", stripped.replace("’", "'").upper()).strip()
+    return normalized or None
+
+
+def normalize_sex(value: Optional[str]) -> Optional[str]:
+    """Map ``F``/``M``/``Female``/``Male`` (any case) to ``F``/``M``."""
+    if value is None:
+        return None
+    code = SEX_CODES.get(value.strip().upper())
+    if code is None:
+        raise ValueError(f"Unsupported sex: {value!r} (expected F/M or Female/Male)")
+    return code
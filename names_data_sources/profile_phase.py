@@ -0,0 +1,337 @@
+"""Run one pipeline phase under resource accounting.
+
+The phase script runs in this process (``runpy``) exactly as if it had been
+started directly, so the numbers cover the phase alone:
+
+- wall time, user and system CPU time (own process plus any children)
+- peak resident set size
+- rows in/out, counted at the pandas/polars readers and writers, polars
+  Parquet sinks and ``csv.DictReader``/``csv.DictWriter`` (lazy scans are
+  not counted as input)
+- bytes read/written through read/write syscalls (``/proc/self/io``: files,
+  sockets and pipes alike; Linux only)
+
+Each phase is appended as one record to a JSON report, and ``--cprofile-dir``
+also dumps a cProfile ``.prof`` file per phase (open it with ``snakeviz`` or
+``python -m pstats``). The pipeline mains route every phase through this
+script when run with ``--profile``; a single phase can be profiled the same
+way.
+
+Usage::
+
+    python names_data_sources/profile_phase.py --report profile.json \\
+        names_data_sources/Spain_names_ine/3_download_INE_names_details.py --names CARLOS
+    python names_data_sources/profile_phase.py --summary profile.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import csv
+import importlib
+import importlib.util
+import json
+import platform
+import resource
+import runpy
+import sys
+import time
+import traceback
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from unittest import mock
+
+PROC_IO = Path("/proc/self/io")
+# ru_maxrss is KiB on Linux and bytes on macOS.
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+SUMMARY_COLUMNS = [
+    ("phase", "Phase", "{}"),
+    ("wall_s", "Wall s", "{:.2f}"),
+    ("cpu_s", "CPU s", "{:.2f}"),
+    ("peak_rss_mb", "Peak RSS MB", "{:.0f}"),
+    ("rows_in", "Rows in", "{:,}"),
+    ("rows_out", "Rows out", "{:,}"),
+    ("bytes_read", "Read MB", "{:.1f}"),
+    ("bytes_written", "Written MB", "{:.1f}"),
+    ("status", "Status", "{}"),
+]
+
+
+class RowCounter:
+    """Count rows passing through the usual dataframe and csv entry points."""
+
+    READERS = {
+        "pandas": ["read_csv", "read_excel", "read_parquet"],
+        "polars": ["read_csv", "read_parquet", "read_ipc"],
+    }
+    WRITERS = {
+        "pandas": ("DataFrame", ["to_csv", "to_parquet", "to_excel"]),
+        "polars": ("DataFrame", ["write_csv", "write_parquet", "write_ipc"]),
+    }
+
+    def __init__(self) -> None:
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def install(self, stack: ExitStack) -> None:
+        for module_name, functions in self.READERS.items():
+            module = _optional_module(module_name)
+            if module is None:
+                continue
+            for function in functions:
+                if hasattr(module, function):
+                    stack.enter_context(mock.patch.object(module, function, self._reader(getattr(module, function))))
+        for module_name, (class_name, methods) in self.WRITERS.items():
+            module = _optional_module(module_name)
+            if module is None:
+                continue
+            frame_class = getattr(module, class_name)
+            for method in methods:
+                if hasattr(frame_class, method):
+                    stack.enter_context(mock.patch.object(frame_class, method, self._writer(getattr(frame_class, method))))
+
+        polars = _optional_module("polars")
+        if polars is not None:
+            stack.enter_context(mock.patch.object(polars.LazyFrame, "sink_parquet", self._parquet_sink(polars)))
+
+        counter = self
+        original_next = csv.DictReader.__next__
+        original_writerow = csv.DictWriter.writerow
+        original_writerows = csv.DictWriter.writerows
+
+        def __next__(reader):
+            row = original_next(reader)
+            counter.rows_in += 1
+            return row
+
+        def writerow(writer, rowdict):
+            counter.rows_out += 1
+            return original_writerow(writer, rowdict)
+
+        def writerows(writer, rowdicts):
+            # DictWriter.writerows does not go through writerow.
+            rowdicts = list(rowdicts)
+            counter.rows_out += len(rowdicts)
+            return original_writerows(writer, rowdicts)
+
+        stack.enter_context(mock.patch.object(csv.DictReader, "__next__", __next__))
+        stack.enter_context(mock.patch.object(csv.DictWriter, "writerow", writerow))
+        stack.enter_context(mock.patch.object(csv.DictWriter, "writerows", writerows))
+
+    def _reader(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            result = function(*args, **kwargs)
+            self.rows_in += _row_count(result)
+            return result
+
+        return wrapper
+
+    def _writer(self, method: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(frame: Any, *args: Any, **kwargs: Any) -> Any:
+            self.rows_out += _row_count(frame)
+            return method(frame, *args, **kwargs)
+
+        return wrapper
+
+    def _parquet_sink(self, polars: Any) -> Callable[..., Any]:
+        sink_parquet = polars.LazyFrame.sink_parquet
+
+        def wrapper(frame: Any, path: Any, *args: Any, **kwargs: Any) -> Any:
+            result = sink_parquet(frame, path, *args, **kwargs)
+            if isinstance(path, (str, Path)) and Path(path).is_file():
+                # Row count comes from the footer; no data pages are read.
+                self.rows_out += polars.scan_parquet(path).select(polars.len()).collect().item()
+            return result
+
+        return wrapper
+
+
+def _optional_module(name: str) -> Any:
+    if importlib.util.find_spec(name) is None:
+        return None
+    return importlib.import_module(name)
+
+
+def _row_count(value: Any) -> int:
+    if isinstance(value, dict):
+        # read_excel(sheet_name=[...]) returns one frame per sheet.
+        return sum(_row_count(item) for item in value.values())
+    height = getattr(value, "height", None)
+    if isinstance(height, int):
+        return height
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple) and shape:
+        return int(shape[0])
+    return 0
+
+
+def _io_counters() -> Optional[Dict[str, int]]:
+    try:
+        lines = PROC_IO.read_text().splitlines()
+    except OSError:
+        return None
+    counters = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        counters[key.strip()] = int(value)
+    return counters
+
+
+def _cpu_times() -> Dict[str, float]:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "user": own.ru_utime + children.ru_utime,
+        "system": own.ru_stime + children.ru_stime,
+    }
+
+
+def _peak_rss_mb() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * RSS_UNIT / 1024 / 1024
+
+
+def _exit_status(exc: SystemExit) -> int:
+    if exc.code is None:
+        return 0
+    return exc.code if isinstance(exc.code, int) else 1
+
+
+def run_phase(
+    script: Path,
+    args: Sequence[str] = (),
+    phase: Optional[str] = None,
+    cprofile_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Run ``script`` as ``__main__`` with ``args`` and return its resource record."""
+    script = script.resolve()
+    phase = phase or script.stem
+    counter = RowCounter()
+    profiler = cProfile.Profile() if cprofile_dir else None
+    status = 0
+    error = None
+
+    with ExitStack() as stack:
+        counter.install(stack)
+        stack.enter_context(mock.patch.object(sys, "argv", [str(script), *args]))
+        stack.enter_context(mock.patch.object(sys, "path", [str(script.parent), *sys.path[1:]]))
+        io_before = _io_counters()
+        cpu_before = _cpu_times()
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            runpy.run_path(str(script), run_name="__main__")
+        except SystemExit as exc:
+            status = _exit_status(exc)
+        except Exception as exc:
+            traceback.print_exc()
+            status = 1
+            error = f"{type(exc).__name__}: {exc}"
+        finally:
+            if profiler:
+                profiler.disable()
+        wall = time.perf_counter() - started
+        cpu_after = _cpu_times()
+        io_after = _io_counters()
+
+    profile_path = None
+    if profiler and cprofile_dir:
+        cprofile_dir.mkdir(parents=True, exist_ok=True)
+        profile_path = cprofile_dir / f"{phase}.prof"
+        profiler.dump_stats(profile_path)
+
+    user = cpu_after["user"] - cpu_before["user"]
+    system = cpu_after["system"] - cpu_before["system"]
+    return {
+        "phase": phase,
+        "script": str(script),
+        "args": list(args),
+        "status": status,
+        "error": error,
+        "wall_s": round(wall, 4),
+        "cpu_user_s": round(user, 4),
+        "cpu_system_s": round(system, 4),
+        "cpu_s": round(user + system, 4),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rows_in": counter.rows_in,
+        "rows_out": counter.rows_out,
+        "bytes_read": io_after["rchar"] - io_before["rchar"] if io_before and io_after else None,
+        "bytes_written": io_after["wchar"] - io_before["wchar"] if io_before and io_after else None,
+        "cprofile": str(profile_path) if profile_path else None,
+    }
+
+
+def append_record(report: Path, record: Dict[str, Any]) -> None:
+    if report.exists():
+        data = json.loads(report.read_text())
+    else:
+        data = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "phases": [],
+        }
+    data["phases"].append(record)
+    report.parent.mkdir(parents=True, exist_ok=True)
+    report.write_text(json.dumps(data, indent=2))
+
+
+def _format_cell(key: str, template: str, value: Any) -> str:
+    if value is None:
+        return "-"
+    if key.startswith("bytes_"):
+        value = value / 1024 / 1024
+    return template.format(value)
+
+
+def format_summary(records: List[Dict[str, Any]]) -> str:
+    header = [title for _, title, _ in SUMMARY_COLUMNS]
+    rows = [[_format_cell(key, template, record.get(key)) for key, _, template in SUMMARY_COLUMNS] for record in records]
+    widths = [max(len(cell) for cell in column) for column in zip(header, *rows)]
+    lines = ["  ".join(cell.ljust(width) if index == 0 else cell.rjust(width) for index, (cell, width) in enumerate(zip(line, widths))) for line in [header, *rows]]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def print_summary(report: Path) -> None:
+    records = json.loads(report.read_text())["phases"]
+    print(f"\nProfile report: {report}")
+    print(format_summary(records))
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a pipeline phase and record its resource usage.")
+    parser.add_argument("--report", type=Path, help="JSON report to append the phase record to")
+    parser.add_argument("--phase", help="Phase name in the report (default: script file name)")
+    parser.add_argument("--cprofile-dir", type=Path, help="Also dump a cProfile .prof file per phase here")
+    parser.add_argument("--summary", type=Path, metavar="REPORT", help="Print the summary table of a report and exit")
+    parser.add_argument("script", nargs="?", type=Path, help="Phase script to run")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="Arguments passed to the phase")
+    args = parser.parse_args(argv)
+    if args.summary is None and args.script is None:
+        parser.error("a phase script (or --summary REPORT) is required")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = _parse_args(argv)
+    if args.summary is not None:
+        print_summary(args.summary)
+        return
+
+    record = run_phase(args.script, args.script_args, phase=args.phase, cprofile_dir=args.cprofile_dir)
+    if args.report:
+        append_record(args.report, record)
+    else:
+        print(format_summary([record]))
+    sys.exit(record["status"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Name trend queries over the SSA and INE outputs.
+
+``name_history`` answers "how popular was name X over time" without loading
+whole files: each call is a lazy scan whose filters are pushed down to the
+Parquet row-group statistics (SSA, and INE once phase 3 has written its
+Parquet tables) or applied while streaming the legacy INE CSV.
+Names are matched on their ``name_keys.normalize_name`` key, so "José",
+"jose" and "JOSE" find the same rows: the stored spellings of each key are
+collected once per file version and the scan filters on them. Results are
+kept in an LRU cache keyed on the query and on the modification time of the
+files read, so repeated interactive lookups are served from memory
+and a refreshed dataset is picked up automatically.
+
+Usage::
+
+    from names_data_sources.query import name_history
+
+    name_history("Olivia", sex="F")                        # SSA, national
+    name_history("Olivia", states=["CA", "TX"], years=(2000, None))
+    name_history("Lucia", sex="F", source="ine")           # INE, per decade
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import polars as pl
+
+from names_data_sources.build_lookup_tables import phase_table
+from names_data_sources.name_keys import normalize_name, normalize_sex
+
+BASE_DIR = Path(__file__).resolve().parent
+SSA_OUTPUT_DIR = BASE_DIR / "USA_names_ssa" / "output_data"
+SSA_NATIONAL_LOOKUP = SSA_OUTPUT_DIR / "names_by_name.parquet"
+SSA_STATE_LOOKUP = SSA_OUTPUT_DIR / "state_names_by_name.parquet"
+INE_DECADES_CSV = (
+    BASE_DIR
+    / "Spain_names_ine"
+    / "output_data"
+    / "3_data_download_INE_names_details"
+    / "details"
+    / "details_decades.csv"
+)
+
+SOURCES = ("ssa", "ine")
+INE_GENDERS = {"F": "Female", "M": "Male"}
+INE_DECADES_SCHEMA = {"nombre": pl.Utf8, "gender": pl.Utf8, "decade": pl.Utf8, "persons": pl.Int64}
+CACHE_SIZE = 1024
+SPELLINGS_CACHE_SIZE = 4
+
+YearRange = Tuple[Optional[int], Optional[int]]
+
+
+def _file_stamp(path: Path) -> Tuple[str, int]:
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset not found: {path}")
+    return str(path), path.stat().st_mtime_ns
+
+
+def _scan(path: Path) -> pl.LazyFrame:
+    if path.suffix == ".parquet":
+        return pl.scan_parquet(path)
+    return pl.scan_csv(path, schema=INE_DECADES_SCHEMA)
+
+
+@lru_cache(maxsize=SPELLINGS_CACHE_SIZE)
+def _spellings_by_key(column: str, stamp: Tuple[str, int]) -> Dict[str, Tuple[str, ...]]:
+    """Stored spellings of every name in ``stamp``'s file, grouped by normalized key."""
+    names = _scan(Path(stamp[0])).select(pl.col(column).unique()).collect()[column]
+    grouped: Dict[str, List[str]] = {}
+    for stored in names.drop_nulls().to_list():
+        key = normalize_name(stored)
+        if key is not None:
+            grouped.setdefault(key, []).append(stored)
+    return {key: tuple(sorted(spellings)) for key, spellings in grouped.items()}
+
+
+def _ssa_history(names: Tuple[str, ...], sex: Optional[str], states: Optional[Tuple[str, ...]], years: YearRange) -> pl.DataFrame:
+    path = SSA_STATE_LOOKUP if states else SSA_NATIONAL_LOOKUP
+    frame = pl.scan_parquet(path).filter(pl.col("name").is_in(list(names)))
+    if sex is not None:
+        frame = frame.filter(pl.col("sex") == sex)
+    if states:
+        frame = frame.filter(pl.col("state").is_in(list(states)))
+    start, end = years
+    if start is not None:
+        frame = frame.filter(pl.col("year") >= start)
+    if end is not None:
+        frame = frame.filter(pl.col("year") <= end)
+
+    columns = ["name", "sex", "state", "year", "count"] if states else ["name", "sex", "year", "count"]
+    return frame.select(columns).sort(columns[:-1]).collect()
+
+
+def _ine_history(names: Tuple[str, ...], sex: Optional[str], years: YearRange) -> pl.DataFrame:
+    frame = _scan(phase_table(INE_DECADES_CSV)).filter(pl.col("nombre").is_in(list(names)))
+    if sex is not None:
+        frame = frame.filter(pl.col("gender") == INE_GENDERS[sex])
+
+    # Decades look like "1930-1940" (born 1930-1939); the open-ended "< 1930"
+    # has no start year.
+    first_year = pl.col("decade").str.extract(r"(\d{4})", 1).cast(pl.Int32)
+    open_ended = pl.col("decade").str.starts_with("<")
+    frame = frame.with_columns(
+        year=pl.when(open_ended).then(None).otherwise(first_year),
+        year_end=pl.when(open_ended).then(first_year - 1).otherwise(first_year + 9),
+    )
+    start, end = years
+    if start is not None:
+        frame = frame.filter(pl.col("year_end") >= start)
+    if end is not None:
+        frame = frame.filter(pl.col("year").is_null() | (pl.col("year") <= end))
+
+    return (
+        frame.select(
+            pl.col("nombre").alias("name"),
+            pl.col("gender").replace_strict({v: k for k, v in INE_GENDERS.items()}, default=None).alias("sex"),
+            "decade",
+            "year",
+            pl.col("persons").alias("count"),
+        )
+        .sort(["name", "sex", "year"], nulls_last=False)
+        .collect()
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_history(
+    names: Tuple[str, ...],
+    sex: Optional[str],
+    source: str,
+    states: Optional[Tuple[str, ...]],
+    years: YearRange,
+    stamp: Tuple[str, int],
+) -> pl.DataFrame:
+    if source == "ssa":
+        return _ssa_history(names, sex, states, years)
+    return _ine_history(names, sex, years)
+
+
+def name_history(
+    name: str,
+    sex: Optional[str] = None,
+    source: str = "ssa",
+    states: Optional[Iterable[str]] = None,
+    years: Optional[Sequence[Optional[int]]] = None,
+) -> pl.DataFrame:
+    """Yearly (SSA) or per-decade (INE) counts for one name.
+
+    Args:
+        name: Name to look up; case, accents and punctuation are ignored
+            (``name_keys.normalize_name``), so "José" also finds "JOSE".
+        sex: ``"F"``/``"M"`` (``"Female"``/``"Male"`` also accepted) or ``None``
+            for both.
+        source: ``"ssa"`` (USA, yearly) or ``"ine"`` (Spain, per decade of birth).
+        states: SSA only; two-letter state codes to get per-state counts
+            instead of national ones.
+        years: Optional inclusive ``(start, end)`` range; either bound may be
+            ``None``. INE decades are kept when they overlap the range.
+
+    Returns:
+        A DataFrame with ``name``, ``sex``, ``year`` and ``count`` columns, plus
+        ``state`` for SSA state queries and ``decade`` for INE.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"Unsupported source: {source!r} (expected one of {SOURCES})")
+    if states and source != "ssa":
+        raise ValueError("The states filter is only available for the SSA source")
+
+    sex = normalize_sex(sex)
+    state_key = tuple(sorted({state.strip().upper() for state in states})) if states else None
+    year_key: YearRange = (years[0], years[1]) if years else (None, None)
+    if source == "ssa":
+        stamp = _file_stamp(SSA_STATE_LOOKUP if state_key else SSA_NATIONAL_LOOKUP)
+    else:
+        stamp = _file_stamp(phase_table(INE_DECADES_CSV))
+    # Filter on the stored spellings ("Mckenzie" in SSA, "JOSÉ"/"JOSE" in INE)
+    # so that the scan stays eligible for row-group pruning.
+    spellings = _spellings_by_key("name" if source == "ssa" else "nombre", stamp)
+    names = spellings.get(normalize_name(name) or "", ())
+    return _cached_history(names, sex, source, state_key, year_key, stamp)
+
+
+def cache_info():
+    """Hit/miss statistics of the result cache."""
+    return _cached_history.cache_info()
+
+
+def clear_cache() -> None:
+    _cached_history.cache_clear()
+    _spellings_by_key.cache_clear()
+
+
+def _parse_years(value: str) -> YearRange:
+    match = re.fullmatch(r"(\d{4})?:(\d{4})?", value)
+    if not match:
+        raise argparse.ArgumentTypeError("Expected START:END, e.g. 1990:2010, 2000: or :1950")
+    start, end = match.groups()
+    return (int(start) if start else None, int(end) if end else None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the history of a name in the SSA or INE data")
+    parser.add_argument("name", help="Name to look up")
+    parser.add_argument("--sex", choices=["F", "M"], help="Restrict to one sex")
+    parser.add_argument("--source", choices=SOURCES, default="ssa", help="Data source (default: ssa)")
+    parser.add_argument("--states", nargs="+", help="SSA state codes for per-state counts")
+    parser.add_argument("--years", type=_parse_years, help="Inclusive year range START:END")
+    args = parser.parse_args()
+
+    with pl.Config(tbl_rows=-1):
+        print(name_history(args.name, sex=args.sex, source=args.source, states=args.states, years=args.years))
+
+
+if __name__ == "__main__":
+    main()